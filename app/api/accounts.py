@@ -5,46 +5,79 @@
 ------------------------------------
 职能：
 - 创建账户（保持原有行为与返回不变）
-- 列表账户：普通用户仅能看到自己的；管理员可查看全量（可按 site 过滤）
+- 列表账户：普通用户仅能看到自己的；管理员可查看全量（可按 site 过滤）；键集分页（limit / cursor）
+- 流式导出 GET /api/accounts/export?format=json|ndjson|csv：大量账户一次导出，逐批读、逐批写，不含密钥
+- 批量导入 POST /api/accounts/import：NDJSON / CSV，线程池加密 + 多行 INSERT，逐行流式返回结果
+  （created / conflict / invalid；conflict 即撞了 uq_user_site_acc），见 app.services.account_import
+- 修改凭据 PATCH /api/accounts/{id} / 删除 DELETE /api/accounts/{id}（仅本人；账户解析缓存随即失效）
 - 测试登录（保持原有行为与返回不变）
+- 批量测试登录 POST /api/accounts/test_login/bulk：按 site 或 selectors 选账户，作为 RQ 作业在 Worker 上跑，
+  按站点限并发，成功的会话写入 sessions 表；返回 job_id，进度与逐账户结果走 /api/jobs
 
 引用库说明：
-- FastAPI: APIRouter / Depends / HTTPException / Query
-- SQLAlchemy: Session + text（在管理员旁路分支里用 SQL 读取，避免改动 service 层）
+- FastAPI: APIRouter / Depends / HTTPException / Query / Response / StreamingResponse
+- SQLAlchemy: Session
 - Pydantic: 入参模型校验
 - 项目内模块：
   - app.core.context: get_context / Context（从 JWT 解析 user_id/role/username）
-  - app.infra.db: get_db（提供数据库会话）
+  - app.infra.db: get_db（主库会话）/ get_read_db（列表与导出走从库，写后窗口内读主库）
   - app.services.accounts / app.services.secrets: 账户创建、账户解析与密钥解密
   - app.connectors.registry.get_connector: 动态加载站点 connector
   - app.infra.logger.emit: 结构化日志，写控制台或 logs/app.log（取决于 LOG_TO_FILE）
 
 运行逻辑（列表接口）：
 1) 解析 ctx（user_id / role）
-2) 如果 role == "admin"：
-   - 直接用 SQL 查询 accounts（可选按 site 过滤）
-   - 记录日志 api_accounts_list_all（包含 count）
-3) 否则（普通用户）：
-   - 走原来的 service: acct_svc.list_accounts(db, ctx.user_id, site)
-   - 记录日志 api_accounts_list（包含 count）
+2) 两个分支都走 acct_svc.list_page：只查 id / site / account_name / created_at 四列（不读密钥密文），
+   按 (created_at DESC, id DESC) 键集分页，走 (site, created_at) / (user_id, site, created_at) 等索引
+   - role == "admin"：不按 owner 过滤（可选按 site），记录日志 api_accounts_list_all（包含 count）
+   - 否则（普通用户）：仅本人，记录日志 api_accounts_list（包含 count）
+3) 还有下一页时响应头 X-Next-Cursor 给出游标；非法游标 400
 4) 返回结构保持为 [{"id","site","account_name"}]
 
+环境变量：
+- ACCOUNTS_PAGE_SIZE：默认每页条数（默认 100）；ACCOUNTS_PAGE_MAX：limit 上限（默认 1000）
+- ACCOUNT_IMPORT_SPOOL_BYTES：导入请求体超过该字节数才落盘（默认 8 MiB）
+- TEST_LOGIN_BULK_MAX：一次批量测试登录最多账户数（默认 10000）
+
 与其他脚本/模块的关系：
-- 不改 services.accounts 的签名与行为；普通用户路径仍调用它
-- 不改 /api/accounts 的输入输出，前端/测试无感
+- services.accounts 原有函数签名不变；列表改走新增的 list_page / iter_accounts
+- /api/accounts 的返回结构不变；新增的 limit / cursor 都是可选参数，账户不超过一页的调用方无感
 - 不改 /api/accounts/test_login 的权限，仍按“只能解本人的账户”解析
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import tempfile
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 
 from app.core.context import get_context, Context
-from app.infra.db import get_db
-from app.services import accounts as acct_svc, secrets as sec_svc
+from app.infra.db import get_db, get_read_db, read_sessionmaker, dialect_insert, UnsupportedDialect
+from app.core.models import Job
+from app.services import accounts as acct_svc, secrets as sec_svc, account_import as import_svc, admission
+from app.workers import lanes
+from app.workers.queue import enqueue_test_login
 from app.connectors.registry import get_connector
 from app.infra.logger import emit
+from app.infra.metrics import CONNECTOR_SECONDS
+
+ACCOUNTS_PAGE_SIZE = int(os.getenv("ACCOUNTS_PAGE_SIZE", "100"))
+ACCOUNTS_PAGE_MAX = int(os.getenv("ACCOUNTS_PAGE_MAX", "1000"))
+ACCOUNT_IMPORT_SPOOL_BYTES = int(os.getenv("ACCOUNT_IMPORT_SPOOL_BYTES", str(8 << 20)))
+ACCOUNT_IMPORT_MAX_BYTES = int(os.getenv("ACCOUNT_IMPORT_MAX_BYTES", str(256 << 20)))
+TEST_LOGIN_BULK_MAX = int(os.getenv("TEST_LOGIN_BULK_MAX", "10000"))
+
+EXPORT_COLUMNS = ["id", "site", "account_name"]
+EXPORT_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 router = APIRouter()
 
@@ -71,45 +104,151 @@ def create_account(
 
 @router.get("/accounts")
 def list_accounts(
+    response: Response,
     site: str | None = Query(default=None),
-    db: Session = Depends(get_db),
+    limit: int = Query(default=ACCOUNTS_PAGE_SIZE, ge=1, le=ACCOUNTS_PAGE_MAX),
+    cursor: str | None = Query(default=None),
+    db: Session = Depends(get_read_db),
     ctx: Context = Depends(get_context),
 ):
     """
     列表账户（读侧隔离 + 管理员旁路）：
-    - 普通用户：仅返回自己名下账户（沿用 service 层）
+    - 普通用户：仅返回自己名下账户
     - 管理员：返回全量账户（可按 site 过滤）
+    - 按 (created_at DESC, id DESC) 键集分页，每页最多 limit 条；还有下一页时响应头带 X-Next-Cursor，
+      原样作为 ?cursor= 传回即可翻页
     返回结构： [{"id","site","account_name"}]
     """
-    # 管理员旁路：查询全量
-    if ctx.role == "admin":
-        if site:
-            rows = db.execute(
-                text("""
-                    SELECT id, site, account_name
-                    FROM accounts
-                    WHERE site = :site
-                    ORDER BY created_at DESC
-                """),
-                {"site": site},
-            ).mappings().all()
-        else:
-            rows = db.execute(
-                text("""
-                    SELECT id, site, account_name
-                    FROM accounts
-                    ORDER BY created_at DESC
-                """)
-            ).mappings().all()
+    owner = None if ctx.role == "admin" else ctx.user_id  # 管理员旁路：不按 owner 过滤
+    try:
+        rows, next_cursor = acct_svc.list_page(db, owner, site=site, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
+    if owner is None:
         emit("api_accounts_list_all", actor=ctx.user_id, role="admin", site=site or "*", count=len(rows))
-        return [{"id": r["id"], "site": r["site"], "account_name": r["account_name"]} for r in rows]
-
-    # 普通用户：仅本人
-    rows = acct_svc.list_accounts(db, ctx.user_id, site=site)
-    emit("api_accounts_list", user_id=ctx.user_id, site=site or "*", count=len(rows))
+    else:
+        emit("api_accounts_list", user_id=ctx.user_id, site=site or "*", count=len(rows))
     return [{"id": r.id, "site": r.site, "account_name": r.account_name} for r in rows]
 
+@router.get("/accounts/export")
+def export_accounts(
+    request: Request,
+    site: str | None = Query(default=None),
+    fmt: str = Query(default="json", alias="format", pattern="^(json|ndjson|csv)$"),
+    ctx: Context = Depends(get_context),
+):
+    """
+    流式导出（format=json 为 JSON 数组，结构同列表接口；ndjson / csv 可直接回灌 /api/accounts/import，
+    但不含密钥）：逐批键集分页读取、逐批写出，内存占用与总行数无关。
+    权限同列表接口（管理员全量，普通用户仅本人）。
+    """
+    owner = None if ctx.role == "admin" else ctx.user_id
+
+    def _format(rows, first: bool) -> str:
+        items = [{"id": r.id, "site": r.site, "account_name": r.account_name} for r in rows]
+        if fmt == "ndjson":
+            return "".join(json.dumps(i) + "\n" for i in items)
+        if fmt == "csv":
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+            writer.writerows(items)
+            return out.getvalue()
+        return ("" if first else ",") + ",".join(json.dumps(i) for i in items)
+
+    def _stream():
+        # 自己开会话：依赖注入的会话在响应体开始发送前就会关闭
+        count = 0
+        yield {"json": "[", "csv": ",".join(EXPORT_COLUMNS) + "\n"}.get(fmt, "")
+        with read_sessionmaker(request)() as db:
+            for rows in acct_svc.iter_accounts(db, owner, site=site):
+                yield _format(rows, first=not count)
+                count += len(rows)
+        if fmt == "json":
+            yield "]"
+        emit("api_accounts_export", actor=ctx.user_id, all=owner is None, site=site or "*", format=fmt, count=count)
+
+    return StreamingResponse(_stream(), media_type=EXPORT_MEDIA_TYPES[fmt])
+
+@router.post("/accounts/import")
+async def import_accounts(
+    request: Request,
+    fmt: str | None = Query(default=None, alias="format", pattern="^(ndjson|csv)$"),
+    ctx: Context = Depends(get_context),
+):
+    """
+    批量导入（账户归属当前用户）：请求体为 NDJSON 或 CSV（?format= 或按 Content-Type 判断，默认 NDJSON）。
+    - 请求体先落临时文件（写文件在线程池里做，不阻塞事件循环），再按批加密、多行 INSERT（见 app.services.account_import）
+    - 请求体超过 ACCOUNT_IMPORT_MAX_BYTES 返回 413；数据库方言不支持 ON CONFLICT 返回 501
+    - 响应为 NDJSON，每行一个结果（created / conflict / invalid），最后一行 summary；边导入边输出
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = fmt or ("csv" if "csv" in content_type else "ndjson")
+    try:
+        dialect_insert()
+    except UnsupportedDialect as e:
+        raise HTTPException(501, str(e))
+    too_large = HTTPException(413, f"request body larger than {ACCOUNT_IMPORT_MAX_BYTES} bytes")
+    if int(request.headers.get("content-length") or 0) > ACCOUNT_IMPORT_MAX_BYTES:
+        raise too_large
+    spool = tempfile.SpooledTemporaryFile(max_size=ACCOUNT_IMPORT_SPOOL_BYTES)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > ACCOUNT_IMPORT_MAX_BYTES:  # 没有 / 谎报 Content-Length 时按实际字节数截断
+                raise too_large
+            await run_in_threadpool(spool.write, chunk)  # 超过 SPOOL_BYTES 后是磁盘写
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    try:
+        records = import_svc.open_records(spool, fmt)
+    except import_svc.ImportFormatError as e:
+        spool.close()
+        raise HTTPException(400, str(e))
+    emit("api_accounts_import", user_id=ctx.user_id, format=fmt)
+
+    def _stream():
+        try:
+            yield from import_svc.run_import(ctx.user_id, records)
+        finally:
+            spool.close()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+class UpdateAccountIn(BaseModel):
+    secrets: dict
+
+@router.patch("/accounts/{account_id}")
+def update_account(
+    account_id: str,
+    inp: UpdateAccountIn,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    """更新本人账户的凭据（重新加密落库，解析缓存随即失效）；不存在或不属于本人 404。"""
+    acc = acct_svc.update_secrets(db, ctx.user_id, account_id, inp.secrets)
+    if acc is None:
+        raise HTTPException(404, "Account not found")
+    emit("api_accounts_update", user_id=ctx.user_id, account_id=account_id)
+    return {"id": acc.id, "site": acc.site, "account_name": acc.account_name}
+
+@router.delete("/accounts/{account_id}")
+def delete_account(
+    account_id: str,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    """删除本人账户及其缓存的站点会话；不存在或不属于本人 404。"""
+    if not acct_svc.delete_account(db, ctx.user_id, account_id):
+        raise HTTPException(404, "Account not found")
+    emit("api_accounts_delete", user_id=ctx.user_id, account_id=account_id)
+    return {"ok": True}
+
 class TestLoginIn(BaseModel):
     account_selector: dict  # {"site":"example","account_name":"acc1"}
 
@@ -130,14 +269,59 @@ def test_login(
 
     Connector = get_connector(acc.site)
     connector = Connector()
+    t0 = time.perf_counter()
     res = connector.login(
         {"id": acc.id, "user_id": acc.user_id, "site": acc.site, "account_name": acc.account_name},
         secrets,
         backend="httpx",
     )
+    CONNECTOR_SECONDS.labels(acc.site, "login", str(res.ok).lower()).observe(time.perf_counter() - t0)
     if not res.ok:
         emit("api_accounts_test_login", account_id=acc.id, ok=False, error=res.error)
         raise HTTPException(400, f"login_failed: {res.error}")
 
     emit("api_accounts_test_login", account_id=acc.id, ok=True)
     return {"ok": True}
+
+class BulkTestLoginIn(BaseModel):
+    site: str | None = None                     # 只给 site：本人在该站点的全部账户
+    selectors: List[dict] | None = None         # 或逐个指定 [{"site","account_name"}]（可再用 site 过滤）
+    priority: Literal["high", "normal", "low"] | None = None
+
+@router.post("/accounts/test_login/bulk")
+def test_login_bulk(
+    inp: BulkTestLoginIn,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    """
+    批量测试登录（异步）：
+    - 解析账户范围（仅本人），预建 Job（PENDING），入 RQ 由 Worker 跑 run_test_login_job，立即返回 job_id
+    - 同一站点的并发登录受 app.services.site_slots 限制（跨 Worker）；成功的会话缓存进 sessions 表
+    - 进度：GET /api/jobs/{job_id}；逐账户结果：GET /api/jobs/{job_id}/results（分页）
+      或 /api/jobs/{job_id}/results/stream（NDJSON，跟随到作业结束）
+    - 找不到的 selector 在 not_found 里返回，不进作业
+    """
+    if not inp.site and inp.selectors is None:
+        raise HTTPException(400, "site or selectors is required")
+    if inp.selectors is not None and not 0 < len(inp.selectors) <= TEST_LOGIN_BULK_MAX:
+        raise HTTPException(400, f"selectors must contain 1..{TEST_LOGIN_BULK_MAX} entries")
+    ids, not_found = acct_svc.select_ids(db, ctx.user_id, site=inp.site, selectors=inp.selectors,
+                                         limit=TEST_LOGIN_BULK_MAX + 1)
+    if len(ids) > TEST_LOGIN_BULK_MAX:
+        raise HTTPException(400, f"more than {TEST_LOGIN_BULK_MAX} accounts; narrow down with selectors")
+    if not ids:
+        raise HTTPException(404, "no matching accounts")
+
+    priority = lanes.resolve(inp.priority, ctx.role, bulk=True)
+    try:
+        admission.admit(ctx.user_id, low_priority=priority != "high")
+    except admission.AdmissionRejected as e:
+        raise HTTPException(e.status, "Too many requests, retry later", headers={"Retry-After": str(e.retry_after)})
+
+    job_id = str(uuid.uuid4())
+    Job.create_pending(db, job_id=job_id, user_id=ctx.user_id, job_type="accounts.test_login")
+    enqueue_test_login(job_id, ctx.user_id, ids, priority=priority)
+    emit("api_accounts_test_login_bulk", user_id=ctx.user_id, job_id=job_id, accounts=len(ids),
+         not_found=len(not_found), priority=priority)
+    return {"job_id": job_id, "status": "PENDING", "accounts": len(ids), "not_found": not_found}
@@ -0,0 +1,92 @@
+# app/api/admin.py
+"""
+管理员 API（仅 role == admin）
+------------------------------------
+职能：
+- PATCH /api/admin/users/{user_id}：启用 / 停用用户；停用后其 token 立即（pubsub）或
+  在一个刷新周期内（interval）失效，见 app.services.user_status
+- GET /api/admin/profile?seconds=N&format=collapsed|speedscope：对 API 进程做采样分析
+  （app.infra.profiler；异步等待，采样期间不占线程池线程；同一时刻只允许一个采样，忙时 409）
+- GET /api/admin/queues?window=N：各 RQ 队列的深度、最老作业等待时长、入队 / 出队速率、执行中与
+  在线 Worker 数，以及按站点的速率与积压（app.services.queue_stats；Redis 批量读取，不遍历作业）
+
+日志：
+- api_admin_user_status / api_admin_profile / api_admin_queues
+"""
+import os
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.api.deps.auth import require_admin
+from app.core.context import Context
+from app.infra.db import get_db
+from app.infra.logger import emit
+from app.infra.redis_client import get_redis
+from app.infra import profiler
+from app.services import queue_stats, user_status
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+_profile_lock = threading.Lock()
+
+router = APIRouter()
+
+
+class UserStatusIn(BaseModel):
+    is_active: bool
+
+
+@router.patch("/admin/users/{user_id}")
+def update_user_status(
+    user_id: str,
+    inp: UserStatusIn,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(require_admin),
+):
+    if not user_status.set_user_active(db, user_id, inp.is_active):
+        raise HTTPException(status_code=404, detail="User not found")
+    emit("api_admin_user_status", actor=ctx.user_id, user_id=user_id, is_active=inp.is_active)
+    return {"user_id": user_id, "is_active": inp.is_active}
+
+
+@router.get("/admin/profile")
+async def profile_process(
+    seconds: float = Query(default=5, gt=0),
+    interval_ms: float = Query(default=5, ge=1, le=100),
+    fmt: str = Query(default="collapsed", alias="format", pattern="^(collapsed|speedscope)$"),
+    ctx: Context = Depends(require_admin),
+):
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Profiler busy")
+    try:
+        prof = await profiler.profile_for_async(seconds, interval=interval_ms / 1000)
+    finally:
+        _profile_lock.release()
+
+    emit("api_admin_profile", actor=ctx.user_id, seconds=seconds, samples=prof.samples,
+         stacks=len(prof.counts), format=fmt)
+    filename = f"api-{os.getpid()}-{int(seconds)}s"
+    if fmt == "speedscope":
+        return JSONResponse(
+            prof.speedscope(filename),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+        )
+    return PlainTextResponse(
+        prof.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.collapsed.txt"'},
+    )
+
+
+@router.get("/admin/queues")
+def queue_overview(
+    window: int = Query(default=queue_stats.QUEUE_STATS_WINDOW_SECONDS, ge=60, le=3600),
+    ctx: Context = Depends(require_admin),
+):
+    rows = queue_stats.snapshot(get_redis(), window=window)
+    emit("api_admin_queues", actor=ctx.user_id, queues=len(rows),
+         depth=sum(r["depth"] for r in rows))
+    return {"window_s": window, "queues": rows}
@@ -6,15 +6,30 @@
 - auth_login_attempt：收到登录请求（不记录明文密码）
 - auth_login_failed：登录失败（原因：inactive / not_found_or_bad_password）
 - auth_login_success：登录成功（包含 user_id、role）
+- auth_login_busy：bcrypt 执行器饱和，返回 503
+- auth_password_rehashed：成本参数变化后透明重算哈希
+- auth_refresh_ok / auth_refresh_failed：刷新令牌换发 access token
+
+刷新令牌（app.services.refresh_tokens）：
+- /api/login 同时返回 refresh_token（原 access_token 字段不变）
+- POST /api/token/refresh：HMAC 校验 + 轮换，换发新的 access/refresh token，不走 bcrypt
+- POST /api/token/revoke：吊销该令牌所在的整条轮换链
+
+login 是 async 路由：bcrypt 在专用有界执行器上跑（app.core.security.password_hasher），
+短小的 DB 读写放到线程池，登录洪峰不会再占满公共线程池、拖慢其他同步路由。
 """
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.infra.db import get_db
 from app.infra.logger import emit
 from app.core.models_user import User
-from app.core.security import verify_password, create_access_token
+from app.core.security import create_access_token, password_hasher, HashingBusy
+from app.services import refresh_tokens, user_status
 
 # 注意：这里不要再写 prefix="/api"
 router = APIRouter(tags=["auth"])
@@ -27,11 +42,29 @@ class LoginInput(BaseModel):
 
 class LoginOutput(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshInput(BaseModel):
+    refresh_token: str
+
+
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _save_hash(db: Session, user: User, new_hash: str) -> None:
+    user.password_hash = new_hash
+    db.add(user); db.commit()
+
+
+def _token_payload(user: User) -> dict:
+    return {"sub": user.id, "username": user.username, "role": user.role.value}
 
 
 # 子路由路径只写 "/login"；最终会被主程序以 "/api" 前缀挂载为 "/api/login"
 @router.post("/login", response_model=LoginOutput)
-def login(body: LoginInput, request: Request, db: Session = Depends(get_db)):
+async def login(body: LoginInput, request: Request, db: Session = Depends(get_db)):
     # 1) 请求打点（不记录明文密码）
     emit(
         "auth_login_attempt",
@@ -40,22 +73,58 @@ def login(body: LoginInput, request: Request, db: Session = Depends(get_db)):
         ua=request.headers.get("user-agent"),
     )
 
-    user = db.query(User).filter(User.username == body.username).first()
-    if not user or not user.is_active or not verify_password(body.password, user.password_hash):
+    user = await run_in_threadpool(_find_user, db, body.username)
+    ok, new_hash = False, None
+    if user and user.is_active:
+        try:
+            ok, new_hash = await password_hasher.verify_and_update(body.password, user.password_hash)
+        except HashingBusy:
+            emit("auth_login_busy", username=body.username, pending=password_hasher.pending)
+            raise HTTPException(status_code=503, detail="Login busy, retry later", headers={"Retry-After": "1"})
+
+    if not ok:
         # 2) 失败打点（避免精确区分“用户不存在”和“口令错误”，以免信息泄露）
         reason = "inactive" if (user and not user.is_active) else "not_found_or_bad_password"
         emit("auth_login_failed", username=body.username, reason=reason)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # 3) 成功签发（JWT 负载包含 role；响应 JSON 结构不变）
-    payload = {
-        "sub": user.id,
-        "username": user.username,
-        "role": user.role.value,
-    }
+    payload = _token_payload(user)
     token = create_access_token(payload)
 
+    # 成本参数变化：透明写回新哈希（放在读取 user 字段之后，commit 会使 ORM 属性过期）
+    if new_hash:
+        await run_in_threadpool(_save_hash, db, user, new_hash)
+        emit("auth_password_rehashed", user_id=payload["sub"])
+
     # 4) 成功打点（不记录 token）
-    emit("auth_login_success", user_id=user.id, username=user.username, role=user.role.value)
+    emit("auth_login_success", user_id=payload["sub"], username=payload["username"], role=payload["role"])
+
+    refresh = await run_in_threadpool(refresh_tokens.issue, db, payload["sub"])
+    return {"access_token": token, "refresh_token": refresh}
+
+
+@router.post("/token/refresh", response_model=LoginOutput)
+def refresh_access_token(body: RefreshInput, db: Session = Depends(get_db)):
+    try:
+        user_id, new_refresh = refresh_tokens.rotate(db, body.refresh_token)
+    except refresh_tokens.RefreshTokenInvalid as e:
+        emit("auth_refresh_failed", reason=str(e))
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    user = db.get(User, user_id)
+    if not user or not user.is_active or not user_status.is_active(user_id):
+        refresh_tokens.revoke(db, new_refresh)
+        emit("auth_refresh_failed", user_id=user_id, reason="inactive")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    token = create_access_token(_token_payload(user))
+    emit("auth_refresh_ok", user_id=user_id)
+    return {"access_token": token, "refresh_token": new_refresh}
+
 
-    return {"access_token": token}
+@router.post("/token/revoke")
+def revoke_refresh_token(body: RefreshInput, db: Session = Depends(get_db)):
+    # 持有令牌即可吊销（登出）；不存在也返回 ok，避免探测
+    refresh_tokens.revoke(db, body.refresh_token)
+    return {"ok": True}
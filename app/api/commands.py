@@ -1,6 +1,7 @@
 """"模块职能：
 
 接收指令请求，按 idempotency_key 做幂等，生成 job_id，后台执行，并返回 PENDING
+（业务路径在 app.services.commands.submit，调度器 app.workers.scheduler 也走同一条路径）
 
 主要函数：
 
@@ -8,79 +9,47 @@ submit_command(inp, background, db, ctx)：
 
 ensure_request → 幂等 MISS/HIT
 
-仅支持 IMPORT_CUSTOMERS（示例）
+IMPORT_CUSTOMERS：流式 CSV 导入；IMPORT_CUSTOMERS_RUNNER=queue（默认，入 RQ 由 Worker 执行）
+| background（API 进程内后台线程，仅为兼容 Step3 的旧脚本保留，大文件会占住 API 的线程池）
 
 Job.create_pending 预创建任务
 
 link_job_id 绑定幂等请求与 job_id
 
-background.add_task 后台线程执行"""
+background.add_task 后台线程执行
+
+批量命令：site.action 且带 items（逐项 payload 列表，最多 BATCH_MAX_ITEMS 项）时，
+整批只建一个 Job、入队一个 run_batch_job，Worker 内分块并发执行（见 app.workers.dispatcher）
+
+扇出：带 chunk_size，或 items 超过 FANOUT_MIN_ITEMS 时，建父作业 + 每 chunk_size 项一个子作业，
+子作业在多个 Worker 上并行，父作业原子汇总进度与结果（见 app.services.fanout）
+
+优先级通道：priority = high | normal | low，对应不同的 RQ 队列，Worker 严格按优先级出队（见 app.workers.lanes）。
+不传时单条命令走 high、批量 / 扇出 / IMPORT_CUSTOMERS 走 normal；批量命令的通道按角色封顶（超过上限降级，不报错）
+
+准入控制：写任何库之前先过 app.services.admission——每用户 / 全局令牌桶（超限 429 + Retry-After），
+RQ 积压超过阈值时拒绝非 high 通道的命令、超过更高的阈值时 high 通道也拒绝（503 + Retry-After）；已绑定 job 的幂等键重试直接返回，不经准入"""
 # app/api/commands.py
-import uuid
-from typing import Optional, Dict
 from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
-from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from app.core.context import get_context, Context
 from app.infra.db import get_db
-from app.core.models import Job
-from app.services.idempotency import ensure_request, link_job_id
-from app.workers.jobs import import_customers
-from app.infra.logger import emit
-from app.workers.queue import enqueue
+from app.services import commands as cmd_svc
+from app.services.commands import CommandIn
+from app.infra.tracing import traced
 
 router = APIRouter()
 
-class CommandIn(BaseModel):
-    # Step4： "example.fetch_profile"；Step3： "IMPORT_CUSTOMERS"
-    type: str                 
-    payload: Dict = Field(default_factory=dict)
-    idempotency_key: str
-
-    # Step4 使用；为了兼容 Step3，设为可选
-    account_selector: Optional[Dict] = None  # 例：{"site":"example","account_name":"acc1"}
-
 @router.post("/commands")
+@traced("submit_command")
 def submit_command(
     inp: CommandIn,
     background: BackgroundTasks,
     db: Session = Depends(get_db),
     ctx: Context = Depends(get_context),
 ):
-    emit("cmd_submit", user_id=ctx.user_id, type=inp.type, key=inp.idempotency_key)
-
-    # 幂等：第一次创建记录；后续命中直接返回旧 job
-    existed = ensure_request(db, ctx.user_id, inp.idempotency_key, inp.type, inp.payload)
-    if not existed:
-        emit("idem_none_unexpected", user_id=ctx.user_id, key=inp.idempotency_key, type=inp.type)
-        raise HTTPException(500, "idempotency_record_create_failed")
-
-    if existed.job_id:
-        emit("idem_hit", user_id=ctx.user_id, key=inp.idempotency_key, job_id=existed.job_id)
-        return {"job_id": existed.job_id, "status": "PENDING"}
-
-    emit("idem_miss", user_id=ctx.user_id, key=inp.idempotency_key)
-
-    # 统一创建 Job（PENDING），并把 job_id 绑定到幂等记录
-    job_id = str(uuid.uuid4())
-    Job.create_pending(db, job_id=job_id, user_id=ctx.user_id, job_type=inp.type)
-    link_job_id(db, ctx.user_id, inp.idempotency_key, job_id)
-    emit("job_created_pending", user_id=ctx.user_id, job_id=job_id, type=inp.type)
-
-    # —— 分流执行 —— #
-    if "." in inp.type:
-        # Step4：队列化（需要 account_selector）
-        if not inp.account_selector:
-            raise HTTPException(400, "account_selector is required for Step4 commands (site.action)")
-        # 入队：dispatcher 在 Worker 里解析 site/action，拉账号、登录/复用会话、执行连接器动作
-        enqueue(job_id=job_id, user_id=ctx.user_id, type=inp.type,
-                account_selector=inp.account_selector, payload=inp.payload)
-    elif inp.type == "IMPORT_CUSTOMERS":
-        # Step3：保留老逻辑，方便兼容旧测试/脚本
-        background.add_task(import_customers, ctx.serialize(), inp.payload, job_id)
-    else:
-        # 不认识的老式类型
-        emit("cmd_unknown_type", user_id=ctx.user_id, type=inp.type)
-        raise HTTPException(400, "Unknown command type")
-
+    try:
+        job_id = cmd_svc.submit(db, ctx, inp, background=background)
+    except cmd_svc.CommandRejected as e:
+        raise HTTPException(e.status, e.detail, headers=e.headers)
     return {"job_id": job_id, "status": "PENDING"}
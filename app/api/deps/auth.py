@@ -1,37 +1,21 @@
 # app/api/deps/auth.py
-from typing import Optional
-
-import jwt
+"""
+鉴权依赖（统一入口）：
+- 真正的校验逻辑只有一份：app.core.context.get_context
+  （JWT 验签缓存 + 按 AUTH_REVOCATION 检查用户启用状态）
+- get_current_user：历史名称，保留为 get_context 的别名（返回 Context，不再每请求查 users 表）
+- require_admin：在 get_context 之上要求 role == admin，否则 403
+"""
 from fastapi import Depends, HTTPException
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
-
-from app.infra.db import get_db
-from app.core.models_user import User
-from app.core.security import get_secret_key
 
-bearer_scheme = HTTPBearer(auto_error=False)
+from app.core.context import get_context, Context
+from app.infra.logger import emit
 
+get_current_user = get_context
 
-def get_current_user(
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    """
-    从 Authorization: Bearer <token> 解析出当前用户，并查库返回 User。
-    若无凭证或无效，则 401。
-    """
-    if not creds or not creds.credentials:
-        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    try:
-        payload = jwt.decode(creds.credentials, get_secret_key(), algorithms=["HS256"])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()  # noqa: E712
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found or inactive")
-        return user
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+def require_admin(ctx: Context = Depends(get_context)) -> Context:
+    if ctx.role != "admin":
+        emit("auth_forbidden", user_id=ctx.user_id, role=ctx.role, need="admin")
+        raise HTTPException(status_code=403, detail="Admin only")
+    return ctx
@@ -6,13 +6,19 @@ Job 查询 API（读侧资源隔离版）
 职能：
 - 提供 GET /api/jobs/{job_id} 查询任务状态与错误信息
 - 非 admin 仅可查询自己名下（user_id）的 Job；admin 可查询全部
+- 扇出作业（app.services.fanout）：返回 parent_id / children 计数 / result 摘要；
+  GET /api/jobs/{job_id}/children 列出子作业，POST /api/jobs/{job_id}/retry 单独重试失败的子作业
+- 进度：processed / total / phase / last_heartbeat；GET /api/jobs/{job_id}/results 按游标分页读取
+  作业已追加的部分结果（作业运行中即可读，见 app.services.job_progress）；
+  GET /api/jobs/{job_id}/results/stream 以 NDJSON 跟随输出到作业结束
 
 引用库：
 - FastAPI: 定义路由与依赖注入
 - SQLAlchemy: 使用 Session + text 执行 SQL
 - 自有模块:
     - app.core.context.get_context: 从 Bearer Token 解析当前请求用户（user_id / role / username）
-    - app.infra.db.get_db: 提供数据库会话（与全局 engine 绑定）
+    - app.infra.db.get_db / get_read_db: 提供数据库会话；只读路由用 get_read_db（配置了 READ_DATABASE_URL 时读从库，
+      写后 READ_AFTER_WRITE_SECONDS 内读主库）
     - app.infra.logger.emit: 结构化日志，打印到控制台或 logs/app.log（取决于 LOG_TO_FILE）
 
 运行逻辑：
@@ -20,25 +26,37 @@ Job 查询 API（读侧资源隔离版）
 2) 读取 jobs 表中的记录（id, type, status, error, user_id）
 3) 若记录不存在 → 404（隐藏不存在）
 4) 若非 admin 且 row.user_id != ctx.user_id → 404（隐藏存在性，避免越权探测）
-5) 返回与历史版本一致的 JSON：{"job_id","type","status","error"}
+5) 返回与历史版本一致的 JSON：{"job_id","type","status","error"}，另附 parent_id / children / result / progress
 
 与其他脚本的关系：
 - Step2 已在写入路径（/api/commands 预创建 Job）将 user_id 落库到 jobs.user_id
 - workers/dispatcher.py 执行时沿用透传的 user_id（不受本文件影响）
 - 本文件仅加强“读侧”的校验与可观测性（结构化日志）
 """
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from app.core.context import get_context, Context
-from app.infra.db import get_db
+from app.core.state_machine import JobStatus
+from app.infra.db import get_db, get_read_db, read_sessionmaker
 from app.infra.logger import emit
+from app.services import fanout, job_progress
+
+JOB_RESULTS_POLL_SECONDS = float(os.getenv("JOB_RESULTS_POLL_SECONDS", "1"))
+JOB_RESULTS_STREAM_MAX_SECONDS = float(os.getenv("JOB_RESULTS_STREAM_MAX_SECONDS", "600"))
+_TERMINAL = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
 
 router = APIRouter()
 
 @router.get("/jobs/{job_id}", summary="Get Job", tags=["jobs"])
-def get_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depends(get_db)):
+def get_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depends(get_read_db)):
     """
     获取单个 Job 的状态（读侧隔离）：
     - admin：可查看任意 Job
@@ -48,7 +66,11 @@ def get_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depe
           "job_id": "<uuid>",
           "type": "<example.fetch_profile>",
           "status": "PENDING|RUNNING|SUCCEEDED|FAILED",
-          "error": ""   # 无错时为空串
+          "error": "",   # 无错时为空串
+          "parent_id": null,
+          "children": {"total","done","failed"} | null,   # 仅扇出父作业
+          "result": {...} | null,
+          "progress": {"processed","total","phase","last_heartbeat"}   # Worker 节流写入（约 1 次/秒）
         }
     """
     emit("job_fetch_attempt", job_id=job_id, actor=ctx.user_id, role=ctx.role)
@@ -61,13 +83,54 @@ def get_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depe
                 type,
                 status,
                 COALESCE(error, '') AS error,
-                user_id
+                user_id,
+                parent_id,
+                result,
+                children_total,
+                children_done,
+                children_failed,
+                processed,
+                total,
+                phase,
+                last_heartbeat
             FROM jobs
             WHERE id = :id
         """),
         {"id": job_id},
     ).mappings().first()
 
+    _check_visible(row, job_id, ctx)
+
+    emit("job_fetch_ok", job_id=job_id, owner=row["user_id"], status=row["status"])
+    return {
+        "job_id": row["id"],
+        "type": row["type"],
+        "status": row["status"],
+        "error": row["error"] or "",
+        "parent_id": row["parent_id"],
+        "children": {
+            "total": row["children_total"],
+            "done": row["children_done"],
+            "failed": row["children_failed"],
+        } if row["children_total"] else None,
+        "result": json.loads(row["result"]) if isinstance(row["result"], str) else row["result"],
+        "progress": {
+            "processed": row["processed"],
+            "total": row["total"],
+            "phase": row["phase"],
+            "last_heartbeat": _iso(row["last_heartbeat"]),
+        },
+    }
+
+
+def _iso(value) -> Optional[str]:
+    # Postgres 返回 datetime，SQLite 经 text() 读出的是字符串
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _check_visible(row, job_id: str, ctx: Context) -> None:
     if not row:
         emit("job_fetch_not_found", job_id=job_id)
         raise HTTPException(status_code=404, detail="Job not found")
@@ -77,10 +140,92 @@ def get_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depe
         emit("job_fetch_forbidden", job_id=job_id, actor=ctx.user_id, owner=row["user_id"])
         raise HTTPException(status_code=404, detail="Job not found")
 
-    emit("job_fetch_ok", job_id=job_id, owner=row["user_id"], status=row["status"])
-    return {
-        "job_id": row["id"],
-        "type": row["type"],
-        "status": row["status"],
-        "error": row["error"] or "",
-    }
+
+def _owner_row(db: Session, job_id: str):
+    return db.execute(
+        text("SELECT id, user_id, parent_id, status FROM jobs WHERE id = :id"), {"id": job_id},
+    ).mappings().first()
+
+
+@router.get("/jobs/{job_id}/children", summary="List child jobs", tags=["jobs"])
+def list_job_children(
+    job_id: str,
+    status: Optional[str] = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=1000),
+    ctx: Context = Depends(get_context),
+    db: Session = Depends(get_read_db),
+):
+    """扇出父作业的子作业列表（可按 status 过滤，例如只看 FAILED 以便逐块重试）。"""
+    _check_visible(_owner_row(db, job_id), job_id, ctx)
+    children = fanout.list_children(db, job_id, status=status, limit=limit)
+    emit("job_children_list", job_id=job_id, count=len(children))
+    return children
+
+
+@router.get("/jobs/{job_id}/results", summary="Page partial job results", tags=["jobs"])
+def list_job_results(
+    job_id: str,
+    after: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    ctx: Context = Depends(get_context),
+    db: Session = Depends(get_read_db),
+):
+    """
+    作业已追加的部分结果，按 id 升序；下一页用返回的 next_after 作为 after。
+    作业运行中 has_more 为 false 只表示暂时读到末尾，稍后用同一游标还能读到新追加的行。
+    """
+    _check_visible(_owner_row(db, job_id), job_id, ctx)
+    page = job_progress.page_results(db, job_id, after=after, limit=limit)
+    emit("job_results_page", job_id=job_id, after=after, count=len(page["items"]))
+    return page
+
+
+@router.get("/jobs/{job_id}/results/stream", summary="Stream job results", tags=["jobs"])
+def stream_job_results(
+    job_id: str,
+    request: Request,
+    after: int = Query(default=0, ge=0),
+    ctx: Context = Depends(get_context),
+    db: Session = Depends(get_read_db),
+):
+    """
+    NDJSON 跟随输出：先输出 after 之后已有的结果行，作业未结束时每 JOB_RESULTS_POLL_SECONDS 轮询新追加的行，
+    作业结束且读完后输出最后一行 {"job": {"status","error","processed","total"}} 并关闭；
+    最长跟随 JOB_RESULTS_STREAM_MAX_SECONDS 秒（超时后用最后的 id 作为 after 重新连接即可续读）。
+    """
+    _check_visible(_owner_row(db, job_id), job_id, ctx)
+    emit("job_results_stream", job_id=job_id, after=after)
+
+    def _stream():
+        cursor, deadline = after, time.monotonic() + JOB_RESULTS_STREAM_MAX_SECONDS
+        # 自己开会话：依赖注入的会话在响应体开始发送前就会关闭
+        with read_sessionmaker(request)() as sdb:
+            while True:
+                job = sdb.execute(text("SELECT status, error, processed, total FROM jobs WHERE id = :id"),
+                                  {"id": job_id}).mappings().first()
+                page = job_progress.page_results(sdb, job_id, after=cursor, limit=1000)
+                sdb.rollback()  # 结束读事务，下一轮能看到新提交的行
+                for item in page["items"]:
+                    yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+                cursor = page["next_after"]
+                if page["has_more"]:
+                    continue
+                # 先读状态再读结果：状态已是终态时，结果一定已经全部提交
+                if job is None or job["status"] in _TERMINAL or time.monotonic() >= deadline:
+                    yield json.dumps({"job": dict(job) if job else None}, default=str) + "\n"
+                    return
+                time.sleep(JOB_RESULTS_POLL_SECONDS)
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs/{job_id}/retry", summary="Retry a failed child job", tags=["jobs"])
+def retry_job(job_id: str, ctx: Context = Depends(get_context), db: Session = Depends(get_db)):
+    """只支持扇出子作业且状态为 FAILED；其余返回 409。"""
+    row = _owner_row(db, job_id)
+    _check_visible(row, job_id, ctx)
+    if not fanout.retry_child(db, job_id):
+        emit("job_retry_rejected", job_id=job_id, status=row["status"], parent_id=row["parent_id"])
+        raise HTTPException(status_code=409, detail="Only failed child jobs can be retried")
+    emit("job_retry", job_id=job_id, actor=ctx.user_id, parent_id=row["parent_id"])
+    return {"job_id": job_id, "status": "PENDING"}
@@ -0,0 +1,24 @@
+# app/api/metrics.py
+"""
+Prometheus 抓取端点：GET /metrics（挂在根路径，不带 /api 前缀）
+- 若设置了 METRICS_TOKEN，需携带 Authorization: Bearer <METRICS_TOKEN>
+- 指标定义见 app.infra.metrics
+"""
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from app.infra import metrics
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,106 @@
+# app/api/schedules.py
+"""
+定时命令 API（只能管理自己的计划）
+------------------------------------
+职能：
+- POST   /api/schedules：创建计划（cron 或 interval_seconds 二选一；command 同 POST /api/commands 的请求体，
+  不含 idempotency_key——每次触发由调度器按 schedule:<id>:<窗口> 生成）
+- GET    /api/schedules：列出自己的计划（含下次触发时间、上次作业与错误）
+- PATCH  /api/schedules/{id}：启用 / 停用；重新启用时从当前时间往后算下一个窗口
+- DELETE /api/schedules/{id}
+
+触发由独立的调度器进程完成（python -m app.workers.scheduler，见 app.services.schedules）。
+
+日志：
+- api_schedules_create / api_schedules_update / api_schedules_delete
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.core.context import get_context, Context
+from app.infra.db import get_db, get_read_db
+from app.infra.logger import emit
+from app.services import schedules as sched_svc
+from app.services.commands import CommandIn
+
+router = APIRouter()
+
+
+class ScheduleCommandIn(CommandIn):
+    idempotency_key: Optional[str] = None  # 忽略；触发时生成
+
+
+class ScheduleIn(BaseModel):
+    name: str = ""
+    command: ScheduleCommandIn
+    cron: Optional[str] = None
+    interval_seconds: Optional[int] = Field(default=None, ge=1)
+    jitter_seconds: Optional[int] = Field(default=None, ge=0)
+
+
+class ScheduleUpdateIn(BaseModel):
+    enabled: bool
+
+
+def _out(row) -> dict:
+    return {
+        "id": row.id, "name": row.name, "command": row.command, "cron": row.cron,
+        "interval_seconds": row.interval_seconds, "jitter_seconds": row.jitter_seconds,
+        "enabled": row.enabled,
+        "next_run_at": row.next_run_at.isoformat() if row.next_run_at else None,
+        "last_run_at": row.last_run_at.isoformat() if row.last_run_at else None,
+        "last_job_id": row.last_job_id, "last_error": row.last_error,
+    }
+
+
+@router.post("/schedules")
+def create_schedule(
+    inp: ScheduleIn,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    command = inp.command.model_dump(exclude={"idempotency_key"}, exclude_none=True)
+    try:
+        row = sched_svc.create_schedule(db, ctx.user_id, inp.name, command, cron=inp.cron,
+                                        interval_seconds=inp.interval_seconds, jitter_seconds=inp.jitter_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    emit("api_schedules_create", user_id=ctx.user_id, schedule_id=row.id)
+    return _out(row)
+
+
+@router.get("/schedules")
+def list_schedules(
+    db: Session = Depends(get_read_db),
+    ctx: Context = Depends(get_context),
+):
+    return [_out(r) for r in sched_svc.list_schedules(db, ctx.user_id)]
+
+
+@router.patch("/schedules/{schedule_id}")
+def update_schedule(
+    schedule_id: str,
+    inp: ScheduleUpdateIn,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    row = sched_svc.set_enabled(db, ctx.user_id, schedule_id, inp.enabled)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    emit("api_schedules_update", user_id=ctx.user_id, schedule_id=schedule_id, enabled=inp.enabled)
+    return _out(row)
+
+
+@router.delete("/schedules/{schedule_id}")
+def delete_schedule(
+    schedule_id: str,
+    db: Session = Depends(get_db),
+    ctx: Context = Depends(get_context),
+):
+    if not sched_svc.delete_schedule(db, ctx.user_id, schedule_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    emit("api_schedules_delete", user_id=ctx.user_id, schedule_id=schedule_id)
+    return {"ok": True}
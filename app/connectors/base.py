@@ -5,11 +5,13 @@
 函数/类：
 - SessionCtx：封装 httpx/Playwright 句柄与凭据片段。
 - LoginResult / ActionResult：统一返回。
-- BaseConnector：站点适配器基类（login/perform）。
+- BaseConnector：站点适配器基类（login/perform/perform_many）。
+  - perform_many(action, payloads, session)：批量执行，结果与 payloads 一一对应；默认逐个调用 perform，
+    单项异常转成 ok=False 不影响其余项。站点有批量接口时应覆盖为原生实现。
 """
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any, ClassVar, Literal, Optional, Dict
+from typing import Any, ClassVar, Literal, Optional, Dict, List
 
 class SessionCtx:
     def __init__(self, kind: Literal["httpx","playwright"], handle: Any=None, store: Optional[Dict]=None):
@@ -39,3 +41,11 @@ class BaseConnector(ABC):
     def login(self, account: dict, secrets: dict, *, backend: str="httpx") -> LoginResult: ...
     @abstractmethod
     def perform(self, action: str, payload: dict, session: SessionCtx) -> ActionResult: ...
+    def perform_many(self, action: str, payloads: List[dict], session: SessionCtx) -> List[ActionResult]:
+        results = []
+        for payload in payloads:
+            try:
+                results.append(self.perform(action, payload, session))
+            except Exception as e:
+                results.append(ActionResult(ok=False, error=str(e)))
+        return results
@@ -1,12 +1,14 @@
 """
 模块职能：
-- “示例站点”连接器：演示 login/perform。
+- “示例站点”连接器：演示 login/perform/perform_many。
+- perform_many 为原生批量实现：一次校验整批输入、一条日志，模拟站点的批量查询接口。
 - 不依赖外网，便于端到端打通。
 
 日志事件：
 - connector_example_login_ok / connector_example_login_need_action / connector_example_action
+- connector_example_action_batch
 """
-from typing import Dict
+from typing import Dict, List
 from app.connectors.base import BaseConnector, SessionCtx, LoginResult, ActionResult
 from app.infra.logger import emit
 from app.connectors.example_site.schemas import FetchProfileIn, FetchProfileOut
@@ -30,3 +32,19 @@ class ExampleConnector(BaseConnector):
             emit("connector_example_action", action=action, uid=data_in.uid)
             return ActionResult(ok=True, data=out.dict())
         return ActionResult(ok=False, error=f"unsupported action: {action}")
+
+    def perform_many(self, action: str, payloads: List[Dict], session: SessionCtx) -> List[ActionResult]:
+        if action != "fetch_profile":
+            return [ActionResult(ok=False, error=f"unsupported action: {action}") for _ in payloads]
+        results = []
+        for payload in payloads:
+            try:
+                data_in = FetchProfileIn(**payload)
+            except ValueError as e:
+                results.append(ActionResult(ok=False, error=str(e)))
+                continue
+            out = FetchProfileOut(uid=data_in.uid, name="Alice", level=3)
+            results.append(ActionResult(ok=True, data=out.model_dump()))
+        emit("connector_example_action_batch", action=action, count=len(payloads),
+             failed=sum(1 for r in results if not r.ok))
+        return results
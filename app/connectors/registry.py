@@ -1,14 +1,162 @@
 """
 模块职能：
-- 连接器注册表：site -> ConnectorClass
+- 连接器注册表：site -> ConnectorClass，按需（首次 get_connector(site)）才 import 对应模块，
+  API / Worker 启动成本不随站点数量增长。
+
+发现方式（只读目录 / 包元数据，不 import 连接器代码）：
+- 目录：app/connectors/<site>_site/client.py，模块里 site == <site> 的 BaseConnector 子类
+- entry point：组 CONNECTOR_ENTRYPOINT_GROUP（默认 saas_tools.connectors），name=site，
+  value="pkg.module:ConnectorClass"，供独立发布的站点插件包使用；与目录同名时以 entry point 为准
+
+函数：
+- get_connector(site)：返回连接器类；未知站点抛 KeyError
+- available_sites()：已发现的站点（不触发 import）
+- register(site, target)：手动登记（类或 "module:attr"），测试 / 插件用
+- preload(sites)：Worker 启动时预热自己服务的站点；返回每个站点的 import 耗时与内存
+- load_report()：已加载站点的 import 耗时与内存
+- parse_sites(value)：解析 "a,b" 形式的站点列表（CONNECTOR_PRELOAD / worker --sites）
+
+环境变量：
+- CONNECTOR_PRELOAD：API 启动时预热的站点，逗号分隔，"*" 为全部；默认空（全懒加载）
+- CONNECTOR_ENTRYPOINT_GROUP
+
+日志：
+- connector_loaded（site / module / import_ms / mem_kb）/ connector_preload_done
 """
-from typing import Dict, Type
+import os
+import time
+import pathlib
+import importlib
+import threading
+import tracemalloc
+from typing import Dict, Iterable, List, Type, Union
+
 from app.connectors.base import BaseConnector
-from app.connectors.example_site.client import ExampleConnector
+from app.infra.logger import emit
+
+ENTRYPOINT_GROUP = os.getenv("CONNECTOR_ENTRYPOINT_GROUP", "saas_tools.connectors")
+CONNECTOR_PRELOAD = os.getenv("CONNECTOR_PRELOAD", "")
+
+_DIR = pathlib.Path(__file__).resolve().parent
+_DIR_SUFFIX = "_site"
+
+# 已加载的连接器类（保留原名，兼容直接读 REGISTRY 的代码）
+REGISTRY: Dict[str, Type[BaseConnector]] = {}
+# site -> "module" 或 "module:attr"（尚未 import）
+_SPECS: Dict[str, str] = {}
+_REPORT: Dict[str, dict] = {}
+_discovered = False
+_lock = threading.RLock()
+
+
+def _discover_dirs() -> Dict[str, str]:
+    specs = {}
+    for d in sorted(_DIR.iterdir()):
+        if d.is_dir() and d.name.endswith(_DIR_SUFFIX) and (d / "client.py").exists():
+            specs[d.name[: -len(_DIR_SUFFIX)]] = f"{__package__}.{d.name}.client"
+    return specs
+
+
+def _discover_entry_points() -> Dict[str, str]:
+    from importlib.metadata import entry_points
+    try:
+        eps = entry_points(group=ENTRYPOINT_GROUP)
+    except Exception as e:  # 损坏的包元数据不应拖垮启动
+        emit("connector_entrypoints_error", group=ENTRYPOINT_GROUP, error=str(e))
+        return {}
+    return {ep.name: ep.value for ep in eps}
+
+
+def _ensure_discovered() -> None:
+    global _discovered
+    if _discovered:
+        return
+    with _lock:
+        if not _discovered:
+            found = _discover_dirs()
+            found.update(_discover_entry_points())
+            for site, target in found.items():
+                _SPECS.setdefault(site, target)  # register() 手动登记的优先
+            _discovered = True
+
+
+def _resolve(site: str, target: str) -> Type[BaseConnector]:
+    module_name, _, attr = target.partition(":")
+    module = importlib.import_module(module_name)
+    if attr:
+        return getattr(module, attr)
+    for obj in vars(module).values():
+        if (isinstance(obj, type) and issubclass(obj, BaseConnector) and obj is not BaseConnector
+                and getattr(obj, "site", None) == site):
+            return obj
+    raise KeyError(f"no connector for site {site!r} in {module_name}")
+
+
+def _load(site: str) -> Type[BaseConnector]:
+    target = _SPECS.get(site)
+    if target is None:
+        raise KeyError(site)
+    # tracemalloc 只在本次 import 期间开启，统计这次 import 新分配的内存
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    mem0 = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    try:
+        cls = _resolve(site, target)
+    finally:
+        import_ms = (time.perf_counter() - t0) * 1000
+        mem_kb = (tracemalloc.get_traced_memory()[0] - mem0) / 1024
+        if not tracing:
+            tracemalloc.stop()
+    REGISTRY[site] = cls
+    _REPORT[site] = {"site": site, "module": target, "import_ms": round(import_ms, 2), "mem_kb": round(mem_kb, 1)}
+    emit("connector_loaded", **_REPORT[site])
+    return cls
 
-REGISTRY: Dict[str, Type[BaseConnector]] = {
-    "example": ExampleConnector,
-}
 
 def get_connector(site: str) -> Type[BaseConnector]:
-    return REGISTRY[site]
+    cls = REGISTRY.get(site)
+    if cls is not None:
+        return cls
+    _ensure_discovered()
+    with _lock:
+        cls = REGISTRY.get(site)
+        return cls if cls is not None else _load(site)
+
+
+def available_sites() -> List[str]:
+    _ensure_discovered()
+    return sorted(set(_SPECS) | set(REGISTRY))
+
+
+def register(site: str, target: Union[str, Type[BaseConnector]]) -> None:
+    with _lock:
+        if isinstance(target, str):
+            _SPECS[site] = target
+            REGISTRY.pop(site, None)
+        else:
+            REGISTRY[site] = target
+
+
+def preload(sites: Iterable[str]) -> List[dict]:
+    """预热站点（含 "*" 表示全部已发现站点）；未知站点抛 KeyError，启动即失败。"""
+    sites = list(sites)
+    if "*" in sites:
+        sites = available_sites()
+    for site in sites:
+        get_connector(site)
+    report = [_REPORT[s] for s in sites if s in _REPORT]
+    emit("connector_preload_done", sites=sites,
+         import_ms=round(sum(r["import_ms"] for r in report), 2),
+         mem_kb=round(sum(r["mem_kb"] for r in report), 1))
+    return report
+
+
+def load_report() -> List[dict]:
+    return [dict(r) for r in _REPORT.values()]
+
+
+def parse_sites(value: str) -> List[str]:
+    """"a,b" -> ["a","b"]；空串 -> []（不预热）。"""
+    return [s.strip() for s in (value or "").split(",") if s.strip()]
@@ -5,29 +5,66 @@
 - 兼容头部：标准 Bearer / 裸 JWT
 - 兼容负载：sub / user_id / username
 - 事件打点：auth_missing_header / auth_token_invalid / auth_token_expired / auth_token_missing_sub
+  / auth_user_inactive
+
+这是唯一的鉴权依赖（app.api.deps.auth 只是别名与角色校验）：
+- 验签后再按 AUTH_REVOCATION 检查用户是否仍启用（见 app.services.user_status，
+  查的是进程内缓存表，不是每请求一次 SQL）
+
+性能：
+- 验签密钥在启动时（lifespan → load_signing_key）预计算一次，不再每请求读环境变量
+- 已验证的 token 进入有界 LRU 缓存（key = sha256(token)，到 token 的 exp 即失效），
+  命中时直接返回解析好的 Context，跳过 jwt.decode
+- AUTH_TOKEN_CACHE_SIZE=0 可关闭缓存
 """
 from __future__ import annotations
 
+import hashlib
 import os
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 import jwt
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from app.infra.logger import emit
+from app.services import user_status
 
 ALGO = "HS256"
 _bearer = HTTPBearer(auto_error=False)
 
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# 没有 exp 的 token 最多缓存多久（秒）
+TOKEN_CACHE_NOEXP_TTL = int(os.getenv("AUTH_TOKEN_CACHE_NOEXP_TTL", "300"))
+
+_signing_key: Optional[bytes] = None
+
 
-def _get_secret() -> str:
+def load_signing_key() -> bytes:
+    """
+    读取并预计算验签密钥（启动时调用一次；轮换 SECRET_KEY 后可再次调用）。
+    密钥变化时顺带清空 token 缓存，避免旧密钥签发的 token 继续命中。
+    """
+    global _signing_key
     # 与登录签发保持一致（SECRET_KEY）；老环境兼容 JWT_SECRET
-    return os.getenv("SECRET_KEY") or os.getenv("JWT_SECRET") or "dev-secret"
+    raw = os.getenv("SECRET_KEY") or os.getenv("JWT_SECRET") or "dev-secret"
+    _signing_key = raw.encode("utf-8")
+    token_cache.clear()
+    return _signing_key
+
+
+def _get_secret() -> bytes:
+    return _signing_key if _signing_key is not None else load_signing_key()
 
 
 class Context(BaseModel):
+    # 缓存命中时多个请求共享同一实例，因此设为不可变
+    model_config = ConfigDict(frozen=True)
+
     user_id: str
     role: str = "user"
     username: Optional[str] = None  # ★ 新增：携带用户名，便于 /api/me 返回
@@ -45,6 +82,54 @@ class Context(BaseModel):
         return cls(user_id=str(uid), role=str(role), username=uname)
 
 
+class TokenCache:
+    """
+    已验证 token 的有界 LRU 缓存（线程安全；同步依赖运行在线程池里）。
+    - key：sha256(token) 摘要，内存里不保留原始 token
+    - value：(过期时间戳, Context)
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Tuple[float, Context]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes, now: float) -> Optional[Context]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            exp, ctx = item
+            if exp <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return ctx
+
+    def put(self, key: bytes, exp: float, ctx: Context) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (exp, ctx)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
 def _extract_token(request: Request, creds: Optional[HTTPAuthorizationCredentials]) -> str:
     if creds and creds.credentials:
         return creds.credentials
@@ -56,11 +141,8 @@ def _extract_token(request: Request, creds: Optional[HTTPAuthorizationCredential
     raise HTTPException(status_code=401, detail="Missing Authorization header")
 
 
-def get_context(
-    request: Request,
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
-):
-    token = _extract_token(request, creds)
+def _decode(token: str) -> Tuple[float, Context]:
+    """完整验签并解析；返回 (缓存过期时间戳, Context)。"""
     try:
         payload = jwt.decode(
             token,
@@ -79,4 +161,24 @@ def get_context(
     if not ctx.user_id:
         emit("auth_token_missing_sub")
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    exp = payload.get("exp")
+    expires_at = float(exp) if exp is not None else time.time() + TOKEN_CACHE_NOEXP_TTL
+    return expires_at, ctx
+
+
+def get_context(
+    request: Request,
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+):
+    token = _extract_token(request, creds)
+    key = TokenCache.key(token)
+    ctx = token_cache.get(key, time.time())
+    if ctx is None:
+        expires_at, ctx = _decode(token)
+        token_cache.put(key, expires_at, ctx)
+    # 吊销检查放在缓存之后：停用用户的 token 即使仍在缓存里也会被拒
+    if not user_status.is_active(ctx.user_id):
+        emit("auth_user_inactive", user_id=ctx.user_id)
+        raise HTTPException(status_code=401, detail="User not found or inactive")
     return ctx
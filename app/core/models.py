@@ -13,18 +13,31 @@ CommandRequest：字段 user_id / key / cmd_type / payload / job_id
 
 Job：字段 id / user_id / type / status / error
 
+  扇出（app.services.fanout）：parent_id 指向父作业；父作业用 children_total / children_done /
+  children_failed 原子计数汇总子作业进度；payload 保存子作业输入（单块重试时重放）；result 为结果摘要
+
 Job.create_pending(db, job_id, user_id, job_type)：预创建 PENDING
 
-Job.start(db, job_id)：置 RUNNING
+Job.start(db, job_id, worker_id=None)：置 RUNNING，记录首个心跳 / 执行者 / 次数（attempts + 1）
+
+Job.finish(db, job_id, status, error="")：置 SUCCEEDED/FAILED
+
+  进度（app.services.job_progress）：processed / total / phase / last_heartbeat，由 Worker 节流写入
+  回收（app.workers.reaper）：last_heartbeat 过期的 RUNNING 作业按 attempts 与重试策略重新入队或置 FAILED
+
+JobResult：作业的追加式部分结果（每行一条），作业运行中即可按 id 游标分页读取
+
+Customer：IMPORT_CUSTOMERS 导入的客户；(user_id, external_id) 唯一，批量 upsert 的冲突键
 
-Job.finish(db, job_id, status, error="")：置 SUCCEEDED/FAILED"""
+Schedule：定时 / 周期命令（app.services.schedules）；command 为命令体（不含幂等键），cron 或 interval_seconds 二选一；
+  next_run_at 为下一次触发时间（窗口起点 slot_at + 抖动），调度器按 (enabled, next_run_at) 索引扫描到期行"""
 
 # app/core/models.py
 from sqlalchemy.orm import declarative_base, Session, relationship
-from sqlalchemy import Column, String, JSON, UniqueConstraint, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, JSON, UniqueConstraint, Text, DateTime, ForeignKey, Integer, Index, Boolean
 from sqlalchemy.sql import func
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from app.core.state_machine import JobStatus, can_transit
 
 
@@ -51,6 +64,23 @@ class Job(Base):
     error = Column(Text, default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    parent_id = Column(String, index=True, nullable=True)
+    payload = Column(JSON(none_as_null=True), nullable=True)
+    result = Column(JSON(none_as_null=True), nullable=True)
+    children_total = Column(Integer, nullable=False, default=0, server_default="0")
+    children_done = Column(Integer, nullable=False, default=0, server_default="0")
+    children_failed = Column(Integer, nullable=False, default=0, server_default="0")
+    processed = Column(Integer, nullable=False, default=0, server_default="0")   # 已处理条数（导入等长作业）
+    total = Column(Integer, nullable=True)                         # 总条数；未知（流式导入）为空
+    phase = Column(String, nullable=True)                          # 当前阶段，如 perform / upsert
+    last_heartbeat = Column(DateTime(timezone=True), nullable=True)  # Worker 最近一次心跳 / 写进度的时间
+    worker_id = Column(String, nullable=True)                      # 正在执行的 Worker（reaper 判活用）
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")   # 已开始执行的次数
+    # reaper 扫描心跳过期的 RUNNING / 过老的 PENDING 作业走这两个索引
+    __table_args__ = (
+        Index("ix_jobs_status_heartbeat", "status", "last_heartbeat"),
+        Index("ix_jobs_status_updated", "status", "updated_at"),
+    )
 
     @staticmethod
     def create_pending(db: Session, job_id: str, user_id: str, job_type: str):
@@ -58,10 +88,13 @@ class Job(Base):
         db.add(obj); db.commit()
 
     @staticmethod
-    def start(db: Session, job_id: str):
+    def start(db: Session, job_id: str, worker_id: str = None):
         job = db.get(Job, job_id)
         if job and can_transit(JobStatus(job.status), JobStatus.RUNNING):
             job.status = JobStatus.RUNNING
+            job.last_heartbeat = datetime.now(timezone.utc)
+            job.worker_id = worker_id
+            job.attempts = (job.attempts or 0) + 1
             db.add(job); db.commit()
         return job
 
@@ -75,6 +108,15 @@ class Job(Base):
         return job
 
 
+class JobResult(Base):
+    __tablename__ = "job_results"
+    id = Column(Integer, primary_key=True, autoincrement=True)    # 单调递增，兼作分页游标
+    job_id = Column(String, nullable=False)
+    data = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (Index("ix_job_results_job_id_id", "job_id", "id"),)
+
+
 class Account(Base):
     __tablename__ = "accounts"
     id = Column(String, primary_key=True, default=_uuid)
@@ -84,7 +126,13 @@ class Account(Base):
     secret_encrypted = Column(Text, nullable=False)                # 加密后的凭据 JSON
     meta_json = Column(Text, default="{}")
     created_at = Column(DateTime, default=datetime.utcnow)
-    __table_args__ = (UniqueConstraint("user_id","site","account_name", name="uq_user_site_acc"),)
+    __table_args__ = (
+        UniqueConstraint("user_id","site","account_name", name="uq_user_site_acc"),
+        # 账户列表的键集分页：管理员全量 / 按站点，普通用户按站点
+        Index("ix_accounts_created", "created_at"),
+        Index("ix_accounts_site_created", "site", "created_at"),
+        Index("ix_accounts_user_site_created", "user_id", "site", "created_at"),
+    )
     sessions = relationship("Session", back_populates="account")
 
 class Session(Base):
@@ -96,4 +144,37 @@ class Session(Base):
     expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    account = relationship("Account", back_populates="sessions")
\ No newline at end of file
+    account = relationship("Account", back_populates="sessions")
+
+
+class Customer(Base):
+    __tablename__ = "customers"
+    id = Column(String, primary_key=True, default=_uuid)
+    user_id = Column(String, nullable=False)
+    external_id = Column(String, nullable=False)                   # 源文件里的客户编号
+    name = Column(String, default="")
+    email = Column(String, default="")
+    phone = Column(String, default="")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (UniqueConstraint("user_id", "external_id", name="uq_customer_owner_ext"),)
+
+
+class Schedule(Base):
+    __tablename__ = "schedules"
+    id = Column(String, primary_key=True, default=_uuid)
+    user_id = Column(String, index=True, nullable=False)
+    name = Column(String, nullable=False, default="")
+    command = Column(JSON, nullable=False)                         # CommandIn 去掉 idempotency_key
+    cron = Column(String, nullable=True)                           # 5 段 cron，UTC
+    interval_seconds = Column(Integer, nullable=True)
+    jitter_seconds = Column(Integer, nullable=True)                # 空 = 取窗口长度与 SCHEDULE_DEFAULT_JITTER_SECONDS 的较小者
+    enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    slot_at = Column(DateTime(timezone=True), nullable=True)       # 下一次触发所属窗口的起点（幂等键的一部分）
+    next_run_at = Column(DateTime(timezone=True), nullable=True)   # slot_at + 抖动
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_job_id = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    __table_args__ = (Index("ix_schedules_enabled_next_run", "enabled", "next_run_at"),)
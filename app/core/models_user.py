@@ -2,6 +2,9 @@
 """"定义 UserRole（admin|ops|user）与 User ORM 实体：
 id/username/password_hash/role/is_active/created_at。
 
+RefreshToken：刷新令牌（只存 HMAC 摘要）；family_id 把一次登录派生出的轮换链串起来，
+旧令牌被重放时整条链一起吊销。
+
 只声明数据结构，不改变现有接口行为。"""
 from datetime import datetime
 from enum import Enum
@@ -30,3 +33,16 @@ class User(Base):
 
 # 便于查询与唯一性保障
 Index("ix_users_username_unique", User.username, unique=True)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id = Column(String(36), nullable=False, index=True)
+    family_id = Column(String(36), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)   # HMAC-SHA256(SECRET_KEY, token)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String(36), nullable=True)                # 轮换后的新令牌 id
@@ -2,17 +2,36 @@
 """"封装口令哈希/校验（passlib[bcrypt]）与 JWT 生成。
 
 create_access_token() 会把 sub/username/role/exp 写入 JWT 负载；
-响应 JSON 不变（仍只返回 access_token 字段）。"""
+响应 JSON 不变（仍只返回 access_token 字段）。
+
+bcrypt 专用执行器（password_hasher）：
+- bcrypt 每次校验 100ms+ CPU，不能占用 FastAPI 的公共线程池
+- PASSWORD_HASH_EXECUTOR=thread|process：process 模式用 spawn 子进程，真正吃满多核
+- PASSWORD_HASH_WORKERS：并发上限；PASSWORD_HASH_MAX_PENDING：执行中 + 排队上限，
+  超出直接抛 HashingBusy（登录接口转成 503 + Retry-After）
+- BCRYPT_ROUNDS：当前成本参数；低于它的旧哈希在登录成功时透明重算（verify_and_update）"""
 
 import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 import jwt  # PyJWT
 from passlib.context import CryptContext
 
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
 
 
 def get_secret_key() -> str:
@@ -29,6 +48,13 @@ def get_access_token_expire_minutes() -> int:
         return 60
 
 
+def get_refresh_token_expire_days() -> int:
+    try:
+        return int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    except Exception:
+        return 30
+
+
 def hash_password(plain: str) -> str:
     return pwd_context.hash(plain)
 
@@ -37,6 +63,62 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def _verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    # 模块级函数：process 模式下需要可 pickle
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class HashingBusy(Exception):
+    """口令哈希执行器已饱和（执行中 + 排队数达到上限）。"""
+
+
+class PasswordHasher:
+    """有界的 bcrypt 执行器：在事件循环里 await，不占用公共线程池。"""
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwd-hash")
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def verify_and_update(self, plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """返回 (是否匹配, 新哈希或 None)；饱和时抛 HashingBusy。"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingBusy()
+            self._pending += 1
+        try:
+            fut = self._get_executor().submit(_verify_and_update, plain, hashed)
+            return await asyncio.wrap_future(fut)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
 def create_access_token(payload: Dict[str, Any]) -> str:
     expire = datetime.utcnow() + timedelta(minutes=get_access_token_expire_minutes())
     to_encode = dict(payload)
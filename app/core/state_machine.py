@@ -3,6 +3,12 @@
 
 定义 Job 的状态与合法迁移，保障“PENDING→RUNNING→SUCCEEDED/FAILED”的有序性
 
+SUCCEEDED / FAILED 为终态：Job.start / Job.finish 只按本表迁移，重复投递的 RQ 作业不会把终态作业改回 RUNNING
+
+表外的迁移只在带条件的 UPDATE 里做，不经过 can_transit：
+- 回收 RUNNING→PENDING：reaper（status='RUNNING' 且心跳仍过期）
+- 重试 FAILED→PENDING（子作业）、FAILED→RUNNING（父作业重新打开）：fanout.retry_child（status='FAILED'）
+
 主要函数/枚举：
 
 JobStatus：状态枚举
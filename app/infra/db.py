@@ -1,34 +1,114 @@
 # app/infra/db.py
 """"模块职能：
 
-读取 DATABASE_URL，创建 SQLAlchemy 引擎
+读取 DATABASE_URL，创建 SQLAlchemy 引擎（主库，所有写入）
 
-暴露 SessionLocal、get_db()（FastAPI 依赖）
+读取 READ_DATABASE_URL，创建只读引擎（从库；未配置时与主库共用同一个引擎）
 
-init_db()：启动时统一建表
+暴露 SessionLocal、get_db()（FastAPI 依赖）；ReadSessionLocal、get_read_db()（只读路由用）
+
+init_db()：兼容旧入口（测试 / bench 脚本），执行全部待执行的版本化迁移（app.infra.migrator）
+
+读写分离与读己之写：
+
+只读路由（GET /api/jobs/*、GET /api/accounts、GET /api/schedules 等）依赖 get_read_db，默认走从库
+
+同一客户端写入后的 READ_AFTER_WRITE_SECONDS 秒内，读请求改走主库，避免从库复制延迟导致
+“刚提交的命令查不到”：写请求成功后由 app.middleware.read_after_write 下发 Cookie
+（同时以同名响应头返回，不用 Cookie 的客户端原样作为请求头带回即可）
+
+该标记只决定读哪个库，伪造它最多是多读一次主库，不涉及权限
 
 主要函数：
 
-init_db()：根据 Base.metadata 建表
+init_db()：等同 migrator.upgrade()；应用启动走 migrator.on_startup()
+
+get_db()：每请求/每任务创建并释放一个 Session（主库）
+
+get_read_db(request)：同上，按读己之写窗口选择从库或主库
+
+read_sessionmaker(request)：流式响应自己开会话时用，与 get_read_db 选择一致
+
+set_read_database_url(url)：运行时切换从库（测试用），返回旧地址
+
+dialect_insert(bind=None)：当前方言的 insert（支持 ON CONFLICT / RETURNING，批量导入用）；
+不支持的方言抛 UnsupportedDialect
 
-get_db()：每请求/每任务创建并释放一个 Session"""
+环境变量：
+
+READ_DATABASE_URL：从库地址（默认空 = 不做读写分离）
+
+READ_AFTER_WRITE_SECONDS：写后改读主库的秒数（默认 5，应大于从库的常见复制延迟）"""
 
 import os
-from typing import Generator
+import time
+from typing import Generator, Optional
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.models import Base
+from app.infra.tracing import instrument_engine
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+
+# Cookie 名与请求/响应头名：值为 Unix 时间戳，此前的读请求走主库
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+PRIMARY_UNTIL_HEADER = "X-DB-Primary-Until"
+
+
+def _create_engine(url: str) -> Engine:
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+    )
+    instrument_engine(eng)  # TRACE_EXPORTER 非 none 时记录 SQL span
+    return eng
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+read_engine = _create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+
+def has_replica() -> bool:
+    return read_engine is not engine
+
+
+def set_read_database_url(url: Optional[str]) -> str:
+    """切换从库（空值 = 回到主库）；旧的从库引擎随即释放连接池。"""
+    global READ_DATABASE_URL, read_engine
+    old, old_engine = READ_DATABASE_URL, read_engine
+    READ_DATABASE_URL = url or ""
+    read_engine = _create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+    ReadSessionLocal.configure(bind=read_engine)
+    if old_engine is not engine:
+        old_engine.dispose()
+    return old
+
+
+class UnsupportedDialect(RuntimeError):
+    """当前数据库方言不支持所需的语句（如 INSERT ... ON CONFLICT）。"""
+
+
+def dialect_insert(bind: Optional[Engine] = None):
+    name = (bind or engine).dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise UnsupportedDialect(f"INSERT ... ON CONFLICT is not supported for dialect {name}")
+    return insert
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    from app.infra import migrator  # 避免循环导入（migrator 默认用本模块的 engine）
+    migrator.upgrade(engine)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -38,3 +118,26 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def primary_until(request: Request) -> float:
+    raw = request.cookies.get(PRIMARY_UNTIL_COOKIE) or request.headers.get(PRIMARY_UNTIL_HEADER) or ""
+    try:
+        return float(raw)
+    except ValueError:
+        return 0.0
+
+
+def read_sessionmaker(request: Request) -> sessionmaker:
+    if not has_replica() or primary_until(request) > time.time():
+        return SessionLocal
+    return ReadSessionLocal
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """只读路由的依赖：默认从库；本客户端刚写过（读己之写窗口内）则走主库。"""
+    db = read_sessionmaker(request)()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,52 @@
+"""
+模块职能：
+- 进程内共享的 httpx.Client（连接池 + keep-alive），跨请求 / 跨作业复用 TCP 与 TLS 连接；
+  Worker 池模式下每个常驻子进程各自持有一份，作业之间不再重复握手。
+- fork 后子进程丢弃从父进程继承的客户端（socket 不能跨进程共享），首次使用时重建。
+
+函数：
+- get_http_client()：懒加载，线程安全（httpx.Client 本身可多线程共享）
+- close_http_client()
+
+环境变量：
+- HTTP_POOL_MAX_CONNECTIONS / HTTP_POOL_MAX_KEEPALIVE / HTTP_TIMEOUT_SECONDS
+"""
+import os
+import threading
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import httpx
+                _client = httpx.Client(
+                    limits=httpx.Limits(max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                                        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE),
+                    timeout=HTTP_TIMEOUT_SECONDS,
+                )
+    return _client
+
+
+def close_http_client() -> None:
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _forget_after_fork() -> None:
+    global _client, _lock
+    _client, _lock = None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
@@ -2,6 +2,7 @@
 模块职责：统一日志配置与结构化输出。
 - configure_logging(): 根据环境变量设置日志等级，兼容 uvicorn。
 - emit(event, **kwargs): 输出结构化日志（dict -> 一行），方便检索。
+  处于追踪上下文中时自动附带 trace_id / request_id（见 app.infra.tracing）。
 """
 """
 统一日志配置（控制台 + 文件），结构化输出（JSON 一行）。
@@ -11,6 +12,7 @@
 import logging, json, os, pathlib
 from logging.handlers import TimedRotatingFileHandler
 from datetime import datetime, timezone
+from app.infra.tracing import current_ids
 
 
 LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -67,12 +69,21 @@ def _now_iso():
     # 本地时区 + 毫秒，示例：2025-09-18T17:30:42.123+09:00
     return datetime.now().astimezone().isoformat(timespec="milliseconds")
 
+def _trace_fields(kwargs: dict) -> dict:
+    trace_id, request_id = current_ids()
+    out = {}
+    if trace_id and "trace_id" not in kwargs:
+        out["trace_id"] = trace_id
+    if request_id and "request_id" not in kwargs:
+        out["request_id"] = request_id
+    return out
+
 def emit(event: str, level: str = "INFO", **kwargs):
     """
     结构化日志：默认 INFO；每条都带时间戳 ts（本地时区）。
     用法：emit("request_start", request_id=..., method="GET", path="/health")
     """
-    rec = {"ts": _now_iso(), "level": level, "event": event, **kwargs}
+    rec = {"ts": _now_iso(), "level": level, "event": event, **_trace_fields(kwargs), **kwargs}
     try:
         _app_logger.info(json.dumps(rec, ensure_ascii=False))
     except Exception:
@@ -84,7 +95,7 @@ def emit_error(event: str, **kwargs):
     错误日志（level=ERROR），同样带 ts。
     用法：emit_error("db_error", request_id=..., err=str(e))
     """
-    rec = {"ts": _now_iso(), "level": "ERROR", "event": event, **kwargs}
+    rec = {"ts": _now_iso(), "level": "ERROR", "event": event, **_trace_fields(kwargs), **kwargs}
     try:
         _app_logger.error(json.dumps(rec, ensure_ascii=False))
     except Exception:
@@ -0,0 +1,97 @@
+"""
+模块职能：
+- 进程内指标注册表（prometheus_client），由 GET /metrics 以 Prometheus 文本格式暴露。
+- 与 emit() 并存：emit 记录单条事件，指标用于速率 / 分位数 / 水位。
+
+指标：
+- http_request_duration_seconds{method,route,status}：RequestLoggingMiddleware，route 用路由模板（/api/jobs/{job_id}）
+- job_queue_wait_seconds{site,action}：入队 → Worker 开始执行
+- job_lane_wait_seconds{lane=high|normal|low}：同上，按优先级通道（app.workers.lanes）
+- job_run_duration_seconds{site,action,status}：run_job 执行耗时
+- connector_call_duration_seconds{site,op,ok}：connector.login / perform
+- idempotency_requests_total{result=hit|miss}
+- session_lookups_total{result=hit|miss}
+- account_resolve_total{result=hit|negative_hit|miss}：账户解析缓存（app.services.account_cache）
+- admission_rejected_total{reason=user_rate|global_rate|backlog}：POST /api/commands 准入拒绝
+- db_pool_*：当前进程 SQLAlchemy 连接池水位（抓取时实时读取）
+
+多进程：
+- 设置 PROMETHEUS_MULTIPROC_DIR（需在进程启动前设置，且 API 与 Worker 指向同一目录）后，
+  各进程（含 RQ 每个作业 fork 出的 work horse）把数值写入该目录的 mmap 文件，
+  /metrics 用 MultiProcessCollector 聚合。目录应在部署启动时清空。
+"""
+import os
+from typing import Tuple
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+_JOB_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时", ["method", "route", "status"],
+)
+JOB_QUEUE_WAIT_SECONDS = Histogram(
+    "job_queue_wait_seconds", "作业入队到开始执行的等待时间", ["site", "action"], buckets=_JOB_BUCKETS,
+)
+JOB_LANE_WAIT_SECONDS = Histogram(
+    "job_lane_wait_seconds", "作业入队到开始执行的等待时间（按优先级通道）", ["lane"], buckets=_JOB_BUCKETS,
+)
+JOB_RUN_SECONDS = Histogram(
+    "job_run_duration_seconds", "作业执行耗时", ["site", "action", "status"], buckets=_JOB_BUCKETS,
+)
+CONNECTOR_SECONDS = Histogram(
+    "connector_call_duration_seconds", "站点连接器调用耗时", ["site", "op", "ok"], buckets=_JOB_BUCKETS,
+)
+IDEMPOTENCY_TOTAL = Counter(
+    "idempotency_requests_total", "幂等键命中 / 未命中次数", ["result"],
+)
+SESSION_LOOKUPS_TOTAL = Counter(
+    "session_lookups_total", "站点会话复用命中 / 未命中次数", ["result"],
+)
+ACCOUNT_RESOLVE_TOTAL = Counter(
+    "account_resolve_total", "账户解析缓存命中 / 负缓存命中 / 未命中次数", ["result"],
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "admission_rejected_total", "命令提交被准入控制拒绝的次数", ["reason"],
+)
+
+
+class _DBPoolCollector:
+    """抓取时读取本进程 engine.pool 的水位（QueuePool 才有这些方法，其他池类型跳过）。"""
+
+    def collect(self):
+        from app.infra.db import engine  # 延迟导入：避免 metrics ← db 的导入环
+        pool = engine.pool
+        for name, doc, attr in (
+            ("db_pool_size", "连接池容量", "size"),
+            ("db_pool_checked_out", "已借出的连接数", "checkedout"),
+            ("db_pool_checked_in", "池中空闲连接数", "checkedin"),
+            ("db_pool_overflow", "溢出连接数", "overflow"),
+        ):
+            fn = getattr(pool, attr, None)
+            if callable(fn):
+                g = GaugeMetricFamily(name, doc)
+                g.add_metric([], fn())
+                yield g
+
+
+_db_pool_collector = _DBPoolCollector()
+if not MULTIPROC_DIR:
+    REGISTRY.register(_db_pool_collector)
+
+
+def render() -> Tuple[bytes, str]:
+    """生成 /metrics 响应体与 Content-Type。"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_db_pool_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
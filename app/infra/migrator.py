@@ -0,0 +1,289 @@
+"""
+模块职能：版本化的数据库迁移执行器（SQLite / Postgres 通用），取代启动时的 create_all 与各个 scripts/migrate_* 脚本
+里的 PRAGMA / sqlite_master 判断。
+- 迁移定义在 app.migrations（每个版本一个模块：VERSION / NAME / upgrade(ctx)），按版本号顺序执行
+- 已执行的版本记在 schema_migrations 表；upgrade() 只跑未执行的版本，已是最新时只查一次这张表
+- 结构变更（加列 / 建索引 / 建表）通过 MigrationContext 执行：先用 SQLAlchemy inspect 判断，已存在就跳过，
+  因此中途失败后重跑、或没有 schema_migrations 的老库第一次接入，都是安全的
+- 数据回填（MigrationContext.backfill）是“在线”的：
+  1) 按主键范围分批：每批先取第 batch_size 个主键作为上界，再 UPDATE ... WHERE pk > 下界 AND pk <= 上界 AND <条件>，
+     一批一个短事务，不会在整张大表上长时间持锁（SQLite 整库锁 / Postgres 行锁都只持续一批）
+  2) 批间 sleep（节流），给线上写入让出空间
+  3) 断点：每批的上界与累计行数和本批 UPDATE 在同一个事务里写入 migration_checkpoints；
+     进程被杀后重跑，从最后一个已提交的批次之后继续
+  4) 进度：每批输出一行（已扫描 / 总数、已更新、速度），同时记 migrate_backfill_progress
+- Postgres 上多个实例同时启动时用 pg_advisory_lock 串行化（簿记表也在锁内创建，锁外的预检只读）；SQLite 依赖上面的幂等判断
+
+函数：
+- upgrade(engine=None, progress=emit_progress) -> 本次执行的版本列表（命令行 scripts/migrate.py 传 print）
+- status(engine=None) -> [{"version","name","applied_at"}]（applied_at 为空即待执行）；只读，不建簿记表，
+  没有 schema_migrations 表时全部视为待执行
+- pending(engine=None) -> 待执行的版本列表（只读）
+- on_startup(engine=None)：lifespan 调用，按 MIGRATE_ON_STARTUP 执行 / 检查 / 跳过；进度走结构化日志，不写 stdout
+
+环境变量：
+- MIGRATE_ON_STARTUP：upgrade（默认，启动时执行待执行的迁移）/ check（有待执行的迁移则拒绝启动，
+  适合由 scripts/migrate.py 单独发布迁移的部署）/ off
+- MIGRATE_BACKFILL_BATCH_SIZE：回填每批行数（默认 1000）
+- MIGRATE_BACKFILL_SLEEP_SECONDS：回填批间休眠秒数（默认 0.05）
+
+日志：
+- migrate_begin / migrate_version_applied / migrate_done / migrate_backfill_progress / migrate_backfill_done
+- migrate_progress（progress 回调的默认实现，message 即进度行）
+"""
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, select, text, update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.infra.logger import emit
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "upgrade").lower()
+MIGRATE_BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATE_BACKFILL_BATCH_SIZE", "1000"))
+MIGRATE_BACKFILL_SLEEP_SECONDS = float(os.getenv("MIGRATE_BACKFILL_SLEEP_SECONDS", "0.05"))
+
+_PG_LOCK_ID = 0x6D696772  # pg_advisory_lock 的键（任意常量）
+
+# 迁移自身的簿记表，不放进 Base.metadata（业务 create_all 不碰它们）
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", String(32), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+migration_checkpoints = Table(
+    "migration_checkpoints", _meta,
+    Column("name", String(255), primary_key=True),   # 回填名，如 0002.accounts.user_id
+    Column("last_key", String(255), nullable=True),  # 最后一个已提交批次的主键上界
+    Column("rows_scanned", Integer, nullable=False, default=0),
+    Column("rows_updated", Integer, nullable=False, default=0),
+    Column("done", Boolean, nullable=False, default=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def emit_progress(line: str) -> None:
+    emit("migrate_progress", message=line)
+
+
+class MigrationPending(RuntimeError):
+    """MIGRATE_ON_STARTUP=check 且有待执行的迁移。"""
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    upgrade: Callable[["MigrationContext"], None]
+
+
+def load(modules: List[ModuleType]) -> List[Migration]:
+    migrations = sorted((Migration(m.VERSION, m.NAME, m.upgrade) for m in modules), key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"duplicate migration versions: {versions}")
+    return migrations
+
+
+def _migrations() -> List[Migration]:
+    from app.migrations import MIGRATIONS
+    return MIGRATIONS
+
+
+class MigrationContext:
+    """传给每个迁移 upgrade(ctx) 的操作集合；结构变更全部“不存在才做”。"""
+
+    def __init__(self, engine: Engine, version: str, progress: Callable[[str], None] = emit_progress,
+                 batch_size: Optional[int] = None, sleep: Optional[float] = None):
+        self.engine = engine
+        self.dialect = engine.dialect
+        self.version = version
+        self.progress = progress
+        self.batch_size = batch_size or MIGRATE_BACKFILL_BATCH_SIZE
+        self.sleep = MIGRATE_BACKFILL_SLEEP_SECONDS if sleep is None else sleep
+
+    # —— 结构 ——
+    def has_table(self, table: str) -> bool:
+        with self.engine.connect() as conn:
+            return inspect(conn).has_table(table)
+
+    def columns(self, table: str) -> set:
+        with self.engine.connect() as conn:
+            return {c["name"] for c in inspect(conn).get_columns(table)}
+
+    def indexes(self, table: str) -> set:
+        with self.engine.connect() as conn:
+            return {i["name"] for i in inspect(conn).get_indexes(table)}
+
+    def create_tables(self, metadata: MetaData) -> None:
+        metadata.create_all(bind=self.engine)  # checkfirst：已有的表（连同其索引）跳过
+
+    def add_column(self, table: str, column: Column) -> bool:
+        if column.name in self.columns(table):
+            return False
+        quote = self.dialect.identifier_preparer.quote
+        ddl = f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=self.dialect)}"
+        if column.server_default is not None:
+            default = column.server_default.arg
+            ddl += f" DEFAULT {getattr(default, 'text', default)}"  # 字符串或 text("...")
+        if not column.nullable:
+            ddl += " NOT NULL"
+        with self.engine.begin() as conn:
+            conn.execute(text(ddl))
+        emit("migrate_add_column", version=self.version, table=table, column=column.name)
+        return True
+
+    def create_index(self, name: str, table: str, *columns: str) -> bool:
+        if name in self.indexes(table):
+            return False
+        with self.engine.begin() as conn:
+            t = Table(table, MetaData(), autoload_with=conn)
+            Index(name, *(t.c[c] for c in columns)).create(conn)
+        emit("migrate_add_index", version=self.version, table=table, index=name)
+        return True
+
+    # —— 数据 ——
+    def backfill(self, name: str, table: str, values: Dict, where: Callable[[Table], object], key: str = "id",
+                 batch_size: Optional[int] = None, sleep: Optional[float] = None) -> int:
+        """
+        按主键范围分批 UPDATE table SET values WHERE where(t)，每批一个事务并写断点；返回本次更新的行数。
+        name 全局唯一（建议带版本号前缀）；已完成的回填直接跳过。
+        """
+        batch_size = batch_size or self.batch_size
+        sleep = self.sleep if sleep is None else sleep
+        with self.engine.connect() as conn:
+            t = Table(table, MetaData(), autoload_with=conn)
+            total = conn.execute(select(func.count()).select_from(t)).scalar() or 0
+        pk = t.c[key]
+        cp = _checkpoint(self.engine, name)
+        if cp["done"]:
+            return 0
+        last, scanned, updated = cp["last_key"], cp["rows_scanned"], cp["rows_updated"]
+        if last is not None:
+            last = pk.type.python_type(last)  # 断点里存的是字符串
+        started, updated_now = time.perf_counter(), 0
+        while True:
+            with self.engine.begin() as conn:
+                lower = [pk > last] if last is not None else []
+                upper = conn.execute(select(pk).where(*lower).order_by(pk)
+                                     .offset(batch_size - 1).limit(1)).scalar()
+                bounds = lower + ([pk <= upper] if upper is not None else [])
+                n_scanned = conn.execute(select(func.count()).select_from(t).where(*bounds)).scalar() or 0
+                n_updated = conn.execute(update(t).where(*bounds, where(t)).values(**values)).rowcount or 0
+                scanned, updated, updated_now = scanned + n_scanned, updated + n_updated, updated_now + n_updated
+                last = upper if upper is not None else last
+                _save_checkpoint(conn, name, last, scanned, updated, done=upper is None)
+            rate = (scanned - cp["rows_scanned"]) / max(time.perf_counter() - started, 1e-6)
+            self.progress(f"[migrate] {name}: scanned {scanned}/{total}, updated {updated}, {rate:.0f} rows/s")
+            emit("migrate_backfill_progress", name=name, scanned=scanned, total=total, updated=updated, last_key=last)
+            if upper is None:
+                break
+            if sleep > 0:
+                time.sleep(sleep)
+        emit("migrate_backfill_done", name=name, scanned=scanned, updated=updated)
+        return updated_now
+
+
+def _checkpoint(engine: Engine, name: str) -> dict:
+    with engine.begin() as conn:
+        row = conn.execute(select(migration_checkpoints).where(migration_checkpoints.c.name == name)).mappings().first()
+        if row is None:
+            row = {"name": name, "last_key": None, "rows_scanned": 0, "rows_updated": 0, "done": False,
+                   "updated_at": datetime.utcnow()}
+            conn.execute(migration_checkpoints.insert().values(**row))
+        return dict(row)
+
+
+def _save_checkpoint(conn: Connection, name: str, last, scanned: int, updated: int, done: bool) -> None:
+    conn.execute(update(migration_checkpoints).where(migration_checkpoints.c.name == name).values(
+        last_key=None if last is None else str(last), rows_scanned=scanned, rows_updated=updated,
+        done=done, updated_at=datetime.utcnow()))
+
+
+def _applied(engine: Engine) -> Dict[str, datetime]:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return {}  # 从未迁移过的库：全部待执行
+        return {r.version: r.applied_at for r in conn.execute(select(schema_migrations))}
+
+
+@contextmanager
+def _lock(engine: Engine) -> Iterator[None]:
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_ID})
+
+
+def _engine(engine: Optional[Engine]) -> Engine:
+    if engine is not None:
+        return engine
+    from app.infra.db import engine as default_engine
+    return default_engine
+
+
+def status(engine: Optional[Engine] = None) -> List[dict]:
+    engine = _engine(engine)
+    applied = _applied(engine)
+    return [{"version": m.version, "name": m.name, "applied_at": applied.get(m.version)} for m in _migrations()]
+
+
+def pending(engine: Optional[Engine] = None) -> List[str]:
+    return [s["version"] for s in status(engine) if s["applied_at"] is None]
+
+
+def upgrade(engine: Optional[Engine] = None, progress: Callable[[str], None] = emit_progress,
+            batch_size: Optional[int] = None, sleep: Optional[float] = None) -> List[str]:
+    engine = _engine(engine)
+    todo = [m for m in _migrations() if m.version not in _applied(engine)]  # 只读预检，不建表
+    if not todo:
+        return []
+    done = []
+    with _lock(engine):
+        _meta.create_all(bind=engine)  # 记账表在锁内建：多实例同时启动不会撞 DuplicateTable
+        applied = _applied(engine)  # 拿到锁后再看一次：别的实例可能刚跑完
+        emit("migrate_begin", dialect=engine.dialect.name, pending=[m.version for m in todo])
+        for m in todo:
+            if m.version in applied:
+                continue
+            started = time.perf_counter()
+            progress(f"[migrate] {m.version} {m.name} ...")
+            m.upgrade(MigrationContext(engine, m.version, progress=progress, batch_size=batch_size, sleep=sleep))
+            try:
+                with engine.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(
+                        version=m.version, name=m.name, applied_at=datetime.utcnow()))
+            except IntegrityError:
+                pass  # SQLite 上另一个进程同时跑完了同一版本；迁移本身幂等
+            seconds = round(time.perf_counter() - started, 3)
+            emit("migrate_version_applied", version=m.version, name=m.name, seconds=seconds)
+            progress(f"[migrate] {m.version} {m.name} done in {seconds}s")
+            done.append(m.version)
+    emit("migrate_done", applied=done)
+    return done
+
+
+def on_startup(engine: Optional[Engine] = None) -> List[str]:
+    if MIGRATE_ON_STARTUP == "off":
+        return []
+    if MIGRATE_ON_STARTUP == "check":
+        todo = pending(engine)
+        if todo:
+            raise MigrationPending(f"pending migrations: {', '.join(todo)}; run scripts/migrate.py")
+        return []
+    return upgrade(engine, progress=emit_progress)
@@ -0,0 +1,148 @@
+"""
+模块职能：内置低开销采样分析器（纯标准库，不需要 py-spy 之类的外部工具）。
+- 后台线程按固定间隔读取 sys._current_frames()，把各线程调用栈聚合成“栈 → 次数”
+- 输出两种格式：
+  - collapsed：每行 "root;child;leaf count"，可直接喂 flamegraph.pl / speedscope
+  - speedscope：https://www.speedscope.app 的 JSON 文件格式（sampled profile）
+
+用途：
+- API：GET /api/admin/profile?seconds=N（app.api.admin，profile_for_async，采样期间不占线程池）对运行中的进程采样
+- Worker：python -m app.workers.worker_entry --profile 时，run_job 对超过阈值的慢作业
+  落盘 profile，并发出 job_profile_saved 事件（带 job_id / trace_id / 文件路径）
+
+环境变量（Worker 用；worker_entry --profile 会自动设置）：
+- JOB_PROFILE_DIR：profile 输出目录；为空表示关闭
+- JOB_PROFILE_THRESHOLD_MS：慢作业阈值（默认 1000）
+- JOB_PROFILE_INTERVAL_MS：采样间隔（默认 5）
+"""
+import os
+import sys
+import json
+import asyncio
+import time
+import pathlib
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+MAX_DEPTH = 128
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    # 只保留最后两级路径，压缩输出体积
+    short = "/".join(pathlib.PurePath(filename).parts[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids: Optional[Set[int]] = set(thread_ids) if thread_ids is not None else None
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self, own_tid: int) -> None:
+        for tid, frame in sys._current_frames().items():
+            if tid == own_tid or (self.thread_ids is not None and tid not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.counts[";".join(stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own)
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.counts.most_common()) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        frames: Dict[str, int] = {}
+        shared = []
+        samples, weights = [], []
+        for stack, n in self.counts.most_common():
+            idx = []
+            for label in stack.split(";"):
+                if label not in frames:
+                    frames[label] = len(shared)
+                    shared.append({"name": label})
+                idx.append(frames[label])
+            samples.append(idx)
+            weights.append(round(n * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "saas-tools-sampling-profiler",
+            "shared": {"frames": shared},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": round(sum(weights), 6),
+                "samples": samples, "weights": weights,
+            }],
+        }
+
+
+def profile_for(seconds: float, interval: float = 0.005) -> SamplingProfiler:
+    """阻塞采样 seconds 秒（调用线程本身在 sleep，也会被采到，便于确认采样正常）。"""
+    prof = SamplingProfiler(interval=interval).start()
+    time.sleep(seconds)
+    return prof.stop()
+
+
+async def profile_for_async(seconds: float, interval: float = 0.005) -> SamplingProfiler:
+    """profile_for 的异步版：等待期间不占线程池线程（API 端点用）。"""
+    prof = SamplingProfiler(interval=interval).start()
+    await asyncio.sleep(seconds)
+    return prof.stop()
+
+
+# —— Worker 慢作业 profile —— #
+
+def job_profile_dir() -> str:
+    return os.getenv("JOB_PROFILE_DIR", "")
+
+
+def start_job_profile() -> Optional[SamplingProfiler]:
+    if not job_profile_dir():
+        return None
+    interval = float(os.getenv("JOB_PROFILE_INTERVAL_MS", "5")) / 1000
+    return SamplingProfiler(interval=interval, thread_ids=[threading.get_ident()]).start()
+
+
+def finish_job_profile(prof: Optional[SamplingProfiler], job_id: str) -> Optional[str]:
+    """停止采样；作业超过阈值则写 speedscope 文件并返回路径，否则返回 None。"""
+    if prof is None:
+        return None
+    prof.stop()
+    threshold_ms = float(os.getenv("JOB_PROFILE_THRESHOLD_MS", "1000"))
+    if prof.duration * 1000 < threshold_ms:
+        return None
+    out_dir = pathlib.Path(job_profile_dir())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{job_id}.speedscope.json"
+    path.write_text(json.dumps(prof.speedscope(f"job {job_id}"), ensure_ascii=False), encoding="utf-8")
+    return str(path)
@@ -0,0 +1,85 @@
+"""
+模块职能：
+- 基于 Redis pub/sub 的进程间失效通知（例如用户停用后，各 API 进程立即刷新本地缓存）。
+
+函数/类：
+- publish(channel, message)：发布一条 JSON 消息；Redis 不可用时只打日志，不抛异常
+- subscribe(channel, handler)：注册处理函数（handler(message: dict)）
+- start() / stop()：后台守护线程监听已注册频道；断线自动重连
+
+日志：
+- pubsub_listen_start / pubsub_listen_error / pubsub_publish_failed / pubsub_handler_error
+"""
+import json
+import threading
+import time
+from typing import Callable, Dict, List
+
+from app.infra.logger import emit
+from app.infra.redis_client import get_redis
+
+_handlers: Dict[str, List[Callable[[dict], None]]] = {}
+_thread = None
+_stop = threading.Event()
+
+
+def publish(channel: str, message: dict) -> bool:
+    try:
+        get_redis().publish(channel, json.dumps(message, ensure_ascii=False))
+        return True
+    except Exception as e:
+        emit("pubsub_publish_failed", channel=channel, error=str(e))
+        return False
+
+
+def subscribe(channel: str, handler: Callable[[dict], None]) -> None:
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def _dispatch(msg: dict) -> None:
+    channel = msg.get("channel")
+    if isinstance(channel, bytes):
+        channel = channel.decode()
+    try:
+        data = json.loads(msg.get("data") or "{}")
+    except (TypeError, ValueError):
+        return
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(data)
+        except Exception as e:
+            emit("pubsub_handler_error", channel=channel, error=str(e))
+
+
+def _listen() -> None:
+    while not _stop.is_set():
+        try:
+            ps = get_redis().pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(*_handlers.keys())
+            emit("pubsub_listen_start", channels=list(_handlers.keys()))
+            while not _stop.is_set():
+                msg = ps.get_message(timeout=1.0)
+                if msg and msg.get("type") == "message":
+                    _dispatch(msg)
+            ps.close()
+        except Exception as e:
+            # 断线期间错过的消息由各缓存自身的定时刷新兜底
+            emit("pubsub_listen_error", error=str(e))
+            _stop.wait(2.0)
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None or not _handlers:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_listen, name="pubsub-listener", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=3)
+    _thread = None
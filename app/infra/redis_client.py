@@ -0,0 +1,33 @@
+"""
+模块职能：
+- 进程内共享的 Redis 连接（按 REDIS_URL 懒加载，首次使用时才 import redis）。
+- REDIS_URL=fakeredis:// 时使用进程内的 fakeredis（测试依赖，pip install -r requirements-dev.txt），
+  供基准 / 本地调试在没有 Redis 的环境里跑通入队 → Worker 链路。
+
+函数：
+- get_redis()：返回全局 Redis 客户端（自带连接池，线程安全）
+- set_redis_url(url)：切换 REDIS_URL 并丢弃已缓存的客户端，返回旧值（基准脚本用）
+"""
+import os
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_redis = None
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        if REDIS_URL.startswith("fakeredis://"):
+            import fakeredis
+            _redis = fakeredis.FakeRedis()
+        else:
+            from redis import from_url as redis_from_url
+            _redis = redis_from_url(REDIS_URL)
+    return _redis
+
+
+def set_redis_url(url: str) -> str:
+    global REDIS_URL, _redis
+    old, REDIS_URL, _redis = REDIS_URL, url, None
+    return old
@@ -0,0 +1,213 @@
+"""
+模块职能：轻量链路追踪（span），上下文传播兼容 OpenTelemetry / W3C Trace Context。
+- 一条链路：HTTP 请求 → submit_command → enqueue（traceparent 写进 RQ job.meta）
+  → Worker run_job → ensure_session → connector.login / perform → SQL 语句
+- 当前 span 与 request_id 存在 contextvars 里；emit() 会自动带上 trace_id / request_id，
+  于是 Worker 侧事件（job_dispatch / job_step / connector_*）可以和发起请求关联
+- traceparent 格式：00-<32 hex trace_id>-<16 hex span_id>-01，可直接对接 OTel Collector / Jaeger
+
+导出（无需在线 Collector）：
+- TRACE_EXPORTER=none（默认，只做传播不落盘）| console（stderr）| file（TRACE_FILE，JSON 一行一个 span）
+- span 字段沿用 OTel 命名：trace_id / span_id / parent_span_id / name / kind / start_time_unix_nano /
+  end_time_unix_nano / duration_ms / status / attributes
+- TRACE_SQL=false 可关闭 SQL 语句级 span
+
+函数：
+- start_span(name, parent=None, kind="internal", **attrs)：上下文管理器
+- traced(name)：装饰器版
+- inject() / extract(carrier)：跨进程传播
+- current_ids()：给 emit 用的 (trace_id, request_id)
+- current_span() / use_span(span)：把当前 span 带进线程池（contextvars 不会自动跨线程）
+- instrument_engine(engine)：挂 SQLAlchemy 事件，记录 SQL span
+"""
+import json
+import os
+import sys
+import time
+import secrets
+import pathlib
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.getenv("LOG_DIR", "logs"), "traces.jsonl"))
+TRACE_SQL = os.getenv("TRACE_SQL", "true").lower() == "true"
+SQL_MAX_LEN = 500
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attrs", "start_ns", "end_ns", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str, attrs: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attrs = attrs
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("trace_request_id", default=None)
+
+_file_lock = threading.Lock()
+_file = None
+
+
+def _export(rec: dict) -> None:
+    global _file
+    line = json.dumps(rec, ensure_ascii=False, default=str)
+    if TRACE_EXPORTER == "console":
+        sys.stderr.write(line + "\n")
+    elif TRACE_EXPORTER == "file":
+        with _file_lock:
+            if _file is None:
+                pathlib.Path(TRACE_FILE).parent.mkdir(parents=True, exist_ok=True)
+                _file = open(TRACE_FILE, "a", encoding="utf-8", buffering=1)
+            _file.write(line + "\n")
+
+
+def _record(trace_id, span_id, parent_id, name, kind, start_ns, end_ns, status, attrs) -> None:
+    if TRACE_EXPORTER == "none":
+        return
+    _export({
+        "trace_id": trace_id,
+        "span_id": span_id,
+        "parent_span_id": parent_id,
+        "name": name,
+        "kind": kind,
+        "start_time_unix_nano": start_ns,
+        "end_time_unix_nano": end_ns,
+        "duration_ms": round((end_ns - start_ns) / 1e6, 3),
+        "status": status,
+        "attributes": attrs,
+    })
+
+
+def extract(carrier) -> Optional[Tuple[str, str]]:
+    """从 headers / job.meta 中解析 traceparent，返回 (trace_id, parent_span_id)。"""
+    if not carrier:
+        return None
+    tp = carrier.get("traceparent")
+    if not tp:
+        return None
+    parts = tp.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def inject() -> dict:
+    """当前上下文的传播载荷（写进 RQ job.meta）。"""
+    carrier = {}
+    span = _current.get()
+    if span is not None:
+        carrier["traceparent"] = span.traceparent()
+    rid = _request_id.get()
+    if rid:
+        carrier["request_id"] = rid
+    return carrier
+
+
+def set_request_id(rid: Optional[str]):
+    return _request_id.set(rid)
+
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def current_ids() -> Tuple[Optional[str], Optional[str]]:
+    span = _current.get()
+    return (span.trace_id if span is not None else None), _request_id.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def use_span(span: Optional[Span]):
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[Tuple[str, str]] = None, kind: str = "internal", **attrs):
+    """
+    parent：远端上下文（extract 的结果）；不传则挂在当前 span 下，都没有则开启新 trace。
+    """
+    if parent is not None:
+        trace_id, parent_id = parent
+    else:
+        cur = _current.get()
+        trace_id, parent_id = (cur.trace_id, cur.span_id) if cur is not None else (secrets.token_hex(16), None)
+    span = Span(name, trace_id, parent_id, kind, attrs)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attrs["error"] = repr(e)
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current.reset(token)
+        _record(span.trace_id, span.span_id, span.parent_id, span.name, span.kind,
+                span.start_ns, span.end_ns, span.status, span.attrs)
+
+
+def traced(name: str):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def instrument_engine(engine) -> None:
+    """SQL span：只在有当前 span 且开启导出时记录，默认配置下零开销。"""
+    if not TRACE_SQL or TRACE_EXPORTER == "none":
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_trace_t0", []).append(time.time_ns())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_trace_t0")
+        if not stack:
+            return
+        start_ns = stack.pop()
+        cur = _current.get()
+        if cur is None:
+            return
+        _record(cur.trace_id, secrets.token_hex(8), cur.span_id, "sql", "client",
+                start_ns, time.time_ns(), "ok",
+                {"db.system": engine.dialect.name, "db.statement": statement[:SQL_MAX_LEN]})
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exc_ctx):
+        conn = exc_ctx.connection
+        stack = conn.info.get("_trace_t0") if conn is not None else None
+        if stack:
+            stack.pop()
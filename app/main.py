@@ -1,9 +1,12 @@
 """
 应用入口：
 - 加载 .env（先 .env.example 作默认，再用 .env 覆盖）
-- lifespan 启动阶段：配置日志 → 打印 logger_config → 初始化数据库
-- 装载请求日志中间件、路由
-- 提供 /health、/api/me
+- lifespan 启动阶段：配置日志 → 打印 logger_config → 预计算 JWT 验签密钥 → 数据库迁移
+  （app.infra.migrator，按 MIGRATE_ON_STARTUP 执行 / 只检查 / 跳过）
+- 装载请求日志中间件、读己之写中间件（READ_DATABASE_URL 读写分离，见 app.infra.db）、路由
+- 按 CONNECTOR_PRELOAD 预热站点连接器（默认全部懒加载，见 app.connectors.registry）
+- 鉴权吊销模型（AUTH_REVOCATION=pubsub 时启动 Redis 订阅线程）
+- 提供 /health、/api/me、/metrics（Prometheus）
 """
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,15 +24,22 @@ if ENV.exists():
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from app.middleware.logging import RequestLoggingMiddleware
+from app.middleware.read_after_write import ReadAfterWriteMiddleware
 from app.infra.logger import (
     configure_logging, emit,
     LOG_TO_FILE, LOG_DIR, LOG_FILE, LOG_ROTATE_WHEN, LOG_BACKUP_COUNT,
 )
-from app.infra.db import init_db
+from app.infra import migrator
 from app.api import auth as auth_api
 from app.api import commands as commands_api
 from app.api import jobs as jobs_api
-from app.core.context import get_context, Context
+from app.api import admin as admin_api
+from app.api import metrics as metrics_api
+from app.api import schedules as schedules_api
+from app.services import user_status
+from app.connectors import registry as connector_registry
+from app.core.security import password_hasher
+from app.core.context import get_context, Context, load_signing_key
 
 # 3) lifespan：替代 on_event（startup/shutdown）
 @asynccontextmanager
@@ -41,24 +51,36 @@ async def lifespan(app: FastAPI):
         to_file=LOG_TO_FILE, dir=LOG_DIR, file=LOG_FILE,
         when=LOG_ROTATE_WHEN, backup=LOG_BACKUP_COUNT,
     )
-    init_db()
-    emit("db_init_done")
+    load_signing_key()
+    applied = migrator.on_startup()
+    emit("db_init_done", applied=applied)
+    sites = connector_registry.parse_sites(connector_registry.CONNECTOR_PRELOAD)
+    if sites:
+        connector_registry.preload(sites)
+    user_status.start()
     yield
     # shutdown
+    user_status.stop()
+    password_hasher.shutdown()
     emit("app_shutdown")
 
 # 4) 创建应用并装配（lifespan 要在这里传入）
 app = FastAPI(title="Step3: Commands + Idempotency", lifespan=lifespan)
+app.add_middleware(ReadAfterWriteMiddleware)
 app.add_middleware(RequestLoggingMiddleware)
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+app.include_router(metrics_api.router, tags=["metrics"])
+
 # 路由
 app.include_router(auth_api.router,     prefix="/api", tags=["auth"])
 app.include_router(commands_api.router, prefix="/api", tags=["commands"])
 app.include_router(jobs_api.router,     prefix="/api", tags=["jobs"])
+app.include_router(admin_api.router,    prefix="/api", tags=["admin"])
+app.include_router(schedules_api.router, prefix="/api", tags=["schedules"])
 
 # 受保护示例：/api/me
 @app.get("/api/me")
@@ -2,7 +2,9 @@
 模块职责：请求级调试日志中间件。
 - 为每个请求生成 request_id；
 - 记录 request_start 与 request_end（含耗时、状态码）；
-- 捕获异常并输出 request_error，随后抛出让 FastAPI 处理。
+- 捕获异常并输出 request_error，随后抛出让 FastAPI 处理；
+- 按路由模板记录 http_request_duration_seconds 直方图（/metrics）；
+- 开启根 span（server），接受上游 traceparent，响应头带回 x-trace-id。
 """
 import time
 import uuid
@@ -10,10 +12,33 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 from app.infra.logger import emit
+from app.infra.metrics import HTTP_REQUEST_SECONDS
+from app.infra import tracing
+
+
+def _route_label(request: Request) -> str:
+    # 用路由模板而不是原始路径，避免 /api/jobs/<uuid> 这类高基数标签
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         rid = str(uuid.uuid4())
+        rid_token = tracing.set_request_id(rid)
+        try:
+            with tracing.start_span(
+                f"{request.method} {request.url.path}", parent=tracing.extract(request.headers),
+                kind="server", request_id=rid, **{"http.method": request.method},
+            ) as span:
+                response = await self._dispatch(request, call_next, rid)
+                span.name = f"{request.method} {_route_label(request)}"
+                span.set(**{"http.route": _route_label(request), "http.status_code": response.status_code})
+                response.headers["x-trace-id"] = span.trace_id
+                return response
+        finally:
+            tracing.reset_request_id(rid_token)
+
+    async def _dispatch(self, request: Request, call_next, rid: str):
         start = time.perf_counter()
         emit(
             "request_start",
@@ -23,7 +48,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         )
         try:
             response: Response = await call_next(request)
-            dur_ms = round((time.perf_counter() - start) * 1000, 2)
+            elapsed = time.perf_counter() - start
+            dur_ms = round(elapsed * 1000, 2)
+            HTTP_REQUEST_SECONDS.labels(request.method, _route_label(request), str(response.status_code)).observe(elapsed)
             emit(
                 "request_end",
                 request_id=rid,
@@ -36,7 +63,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             response.headers["x-request-id"] = rid
             return response
         except Exception as e:
-            dur_ms = round((time.perf_counter() - start) * 1000, 2)
+            elapsed = time.perf_counter() - start
+            dur_ms = round(elapsed * 1000, 2)
+            HTTP_REQUEST_SECONDS.labels(request.method, _route_label(request), "500").observe(elapsed)
             emit(
                 "request_error",
                 request_id=rid,
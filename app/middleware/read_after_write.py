@@ -0,0 +1,25 @@
+"""
+模块职责：读己之写标记（配合 app.infra.db.get_read_db）。
+- 写请求（POST / PUT / PATCH / DELETE）成功（状态码 < 400）后，下发 Cookie db_primary_until
+  = 当前时间 + READ_AFTER_WRITE_SECONDS，并以响应头 X-DB-Primary-Until 返回同一个值；
+- 此后的读请求带着它（Cookie 自动带回，或客户端把响应头原样作为请求头）就在窗口内读主库；
+- 未配置 READ_DATABASE_URL 时不做任何事。
+"""
+import time
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from app.infra import db as db_mod
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReadAfterWriteMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if request.method in WRITE_METHODS and response.status_code < 400 and db_mod.has_replica():
+            window = db_mod.READ_AFTER_WRITE_SECONDS
+            until = f"{time.time() + window:.3f}"
+            response.set_cookie(db_mod.PRIMARY_UNTIL_COOKIE, until, max_age=max(1, int(window + 0.999)),
+                                httponly=True, samesite="lax")
+            response.headers[db_mod.PRIMARY_UNTIL_HEADER] = until
+        return response
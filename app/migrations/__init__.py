@@ -0,0 +1,20 @@
+"""
+版本化迁移（由 app.infra.migrator 执行，记录在 schema_migrations 表）。
+
+新增迁移：
+- 新建模块 vNNNN_<说明>.py，定义 VERSION = "NNNN"、NAME、upgrade(ctx)，并加入下面的列表
+- upgrade 里只用 ctx 的操作（create_tables / add_column / create_index / backfill），它们都是“不存在才做”，
+  中途失败后重跑安全；大表数据修改一律走 ctx.backfill（分批、节流、可断点续跑），不要写整表 UPDATE
+- 已发布的迁移不要再改；模型里新增的列 / 索引要同时写一个新迁移（create_all 不会给已存在的表加列）
+- 0001 基线的表定义是冻结副本，不引用 app.core.models：改模型不会改变 0001 建出来的表，
+  新库和老库都靠新迁移得到新列 / 索引（tests/test_migrations.py 会比对迁移后的结构与模型）
+- 迁移里不 import 模型类：要查的表用 sqlalchemy.table() / column() 就地声明（见 0002）
+"""
+from app.infra.migrator import load
+from app.migrations import v0001_baseline, v0002_owner_user_id, v0003_jobs_progress_and_indexes
+
+MIGRATIONS = load([
+    v0001_baseline,
+    v0002_owner_user_id,
+    v0003_jobs_progress_and_indexes,
+])
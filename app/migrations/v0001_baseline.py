@@ -0,0 +1,146 @@
+"""
+基线：0001 发布时的全部表（新库一步建齐；老库里已有的表跳过，由 0002 / 0003 补列 / 索引）。
+
+表定义是冻结的副本，不引用 app.core.models：模型以后新增的列 / 索引必须写新的迁移，
+不能让新库在 0001 里“顺带”建出来、再让后面的迁移因为“已存在”而悄悄跳过。
+"""
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    UniqueConstraint, func,
+)
+
+VERSION = "0001"
+NAME = "baseline"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("username", String(64), nullable=False, unique=True, index=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("role", Enum("admin", "ops", "user", name="userrole"), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_users_username_unique", "username", unique=True),
+)
+
+Table(
+    "refresh_tokens", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("user_id", String(36), nullable=False, index=True),
+    Column("family_id", String(36), nullable=False, index=True),
+    Column("token_hash", String(64), nullable=False, unique=True),
+    Column("expires_at", DateTime, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("revoked_at", DateTime, nullable=True),
+    Column("replaced_by", String(36), nullable=True),
+)
+
+Table(
+    "command_requests", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False, index=True),
+    Column("key", String, nullable=False),
+    Column("cmd_type", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("job_id", String, nullable=True),
+    UniqueConstraint("user_id", "key", name="uq_idem"),
+)
+
+Table(
+    "jobs", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False, index=True),
+    Column("type", String, nullable=False),
+    Column("status", String),
+    Column("error", Text),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Column("parent_id", String, nullable=True, index=True),
+    Column("payload", JSON(none_as_null=True), nullable=True),
+    Column("result", JSON(none_as_null=True), nullable=True),
+    Column("children_total", Integer, nullable=False, server_default="0"),
+    Column("children_done", Integer, nullable=False, server_default="0"),
+    Column("children_failed", Integer, nullable=False, server_default="0"),
+    Column("processed", Integer, nullable=False, server_default="0"),
+    Column("total", Integer, nullable=True),
+    Column("phase", String, nullable=True),
+    Column("last_heartbeat", DateTime(timezone=True), nullable=True),
+    Column("worker_id", String, nullable=True),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Index("ix_jobs_status_heartbeat", "status", "last_heartbeat"),
+    Index("ix_jobs_status_updated", "status", "updated_at"),
+)
+
+Table(
+    "job_results", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("job_id", String, nullable=False),
+    Column("data", JSON, nullable=False),
+    Column("created_at", DateTime),
+    Index("ix_job_results_job_id_id", "job_id", "id"),
+)
+
+Table(
+    "accounts", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False, index=True),
+    Column("site", String, nullable=False, index=True),
+    Column("account_name", String, nullable=False),
+    Column("secret_encrypted", Text, nullable=False),
+    Column("meta_json", Text),
+    Column("created_at", DateTime),
+    UniqueConstraint("user_id", "site", "account_name", name="uq_user_site_acc"),
+    Index("ix_accounts_created", "created_at"),
+    Index("ix_accounts_site_created", "site", "created_at"),
+    Index("ix_accounts_user_site_created", "user_id", "site", "created_at"),
+)
+
+Table(
+    "sessions", metadata,
+    Column("id", String, primary_key=True),
+    Column("account_id", String, ForeignKey("accounts.id"), nullable=False, index=True),
+    Column("data_encrypted", Text, nullable=False),
+    Column("status", String),
+    Column("expires_at", DateTime, nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "customers", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False),
+    Column("external_id", String, nullable=False),
+    Column("name", String),
+    Column("email", String),
+    Column("phone", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    UniqueConstraint("user_id", "external_id", name="uq_customer_owner_ext"),
+)
+
+Table(
+    "schedules", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False, index=True),
+    Column("name", String, nullable=False),
+    Column("command", JSON, nullable=False),
+    Column("cron", String, nullable=True),
+    Column("interval_seconds", Integer, nullable=True),
+    Column("jitter_seconds", Integer, nullable=True),
+    Column("enabled", Boolean, nullable=False, server_default="1"),
+    Column("slot_at", DateTime(timezone=True), nullable=True),
+    Column("next_run_at", DateTime(timezone=True), nullable=True),
+    Column("last_run_at", DateTime(timezone=True), nullable=True),
+    Column("last_job_id", String, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_schedules_enabled_next_run", "enabled", "next_run_at"),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(metadata)
@@ -0,0 +1,31 @@
+"""
+Step2 资源归属：accounts / jobs / command_requests 的 user_id 列与索引，
+历史数据回填为 admin（没有 admin 则为首个用户；一个用户都没有则留空）。
+取代 scripts/migrate_step5_step2.py 里的 PRAGMA / sqlite_master 判断与整表 UPDATE。
+"""
+from sqlalchemy import Column, String, column, or_, select, table
+
+VERSION = "0002"
+NAME = "owner_user_id"
+
+TABLES = ("accounts", "jobs", "command_requests")
+
+users = table("users", column("id"), column("role"))
+
+
+def _default_user_id(ctx):
+    with ctx.engine.connect() as conn:
+        uid = conn.execute(select(users.c.id).where(users.c.role == "admin").limit(1)).scalar()
+        return uid or conn.execute(select(users.c.id).limit(1)).scalar()
+
+
+def upgrade(ctx):
+    for table in TABLES:
+        ctx.add_column(table, Column("user_id", String, nullable=True))
+        ctx.create_index(f"ix_{table}_user_id", table, "user_id")
+    uid = _default_user_id(ctx)
+    if not uid:
+        return
+    for table in TABLES:
+        ctx.backfill(f"{VERSION}.{table}.user_id", table, {"user_id": uid},
+                     where=lambda t: or_(t.c.user_id.is_(None), t.c.user_id == ""))
@@ -0,0 +1,44 @@
+"""
+Step6 起新增的列与索引（原 scripts/migrate_step6.py）：
+- jobs：扇出（parent_id / children_*）、载荷与结果、进度（processed / total / phase / last_heartbeat）、
+  reaper（worker_id / attempts）
+- 索引：ix_jobs_parent_id / ix_jobs_status_heartbeat / ix_jobs_status_updated；
+  accounts 列表键集分页用的 ix_accounts_created / ix_accounts_site_created / ix_accounts_user_site_created
+- job_results / customers / schedules 是新表，基线（0001）已经建好
+"""
+from sqlalchemy import JSON, Column, DateTime, Integer, String
+
+VERSION = "0003"
+NAME = "jobs_progress_and_indexes"
+
+COLUMNS = [
+    ("jobs", Column("parent_id", String, nullable=True)),
+    ("jobs", Column("payload", JSON, nullable=True)),
+    ("jobs", Column("result", JSON, nullable=True)),
+    ("jobs", Column("children_total", Integer, nullable=False, server_default="0")),
+    ("jobs", Column("children_done", Integer, nullable=False, server_default="0")),
+    ("jobs", Column("children_failed", Integer, nullable=False, server_default="0")),
+    ("jobs", Column("processed", Integer, nullable=False, server_default="0")),
+    ("jobs", Column("total", Integer, nullable=True)),
+    ("jobs", Column("phase", String, nullable=True)),
+    ("jobs", Column("last_heartbeat", DateTime(timezone=True), nullable=True)),
+    ("jobs", Column("worker_id", String, nullable=True)),
+    ("jobs", Column("attempts", Integer, nullable=False, server_default="0")),
+]
+
+# (索引名, 表, 列...)
+INDEXES = [
+    ("ix_jobs_parent_id", "jobs", "parent_id"),
+    ("ix_jobs_status_heartbeat", "jobs", "status", "last_heartbeat"),
+    ("ix_jobs_status_updated", "jobs", "status", "updated_at"),
+    ("ix_accounts_created", "accounts", "created_at"),
+    ("ix_accounts_site_created", "accounts", "site", "created_at"),
+    ("ix_accounts_user_site_created", "accounts", "user_id", "site", "created_at"),
+]
+
+
+def upgrade(ctx):
+    for table, column in COLUMNS:
+        ctx.add_column(table, column)
+    for name, table, *columns in INDEXES:
+        ctx.create_index(name, table, *columns)
@@ -0,0 +1,127 @@
+"""
+模块职能：
+- 账户解析缓存：acct_svc.resolve 按 (user_id, site, account_name) 查账户，每个作业、每次 test_login 都要一次；
+  结果缓存进 Redis（所有 API / Worker 进程共用，RQ 每个作业 fork 出的 work horse 也能命中），
+  TTL 到期或显式失效后才回库。
+- 负缓存：查不到的 selector 也缓存（ACCOUNT_CACHE_NEGATIVE_TTL，较短），有 bug 的客户端反复提交
+  不存在的账户时不会每次打到数据库。
+- 显式失效：账户创建（含批量导入）、修改、删除后删除对应键；因为是共享缓存，失效对所有进程立即生效。
+- 回填与失效的竞态：resolve 未命中 → 查库 → put 之间，若另一个请求提交了创建 / 改密 / 删除并已失效，
+  put 会把查到的旧值（负缓存或旧密文）写回去。为此每个键带一个代数 acct:gen:<selector>：
+  get 未命中时顺带读出当前代数，invalidate 把代数 +1，put 用 Lua 比较代数，不一致（期间发生过失效）就不写。
+  代数键保留 _GEN_TTL 秒，远长于一次查库；过期后代数回到 0，同样与读出的旧代数不等，不会误写。
+- 缓存的是 id / user_id / site / account_name / secret_encrypted（密文，与库里一致；明文从不入缓存）。
+- Redis 不可用时按未命中处理（回库），记 account_cache_error。
+
+函数：
+- get(user_id, site, account_name) -> (命中?, dict | None, 代数)：命中且值为 None 即负缓存；Redis 出错时代数为 None
+- put(user_id, site, account_name, row | None, gen) -> bool：代数未变才写入
+- invalidate(keys)：keys 为 (user_id, site, account_name) 列表，分批 INCR 代数 + DEL
+
+环境变量：
+- ACCOUNT_CACHE_TTL：正缓存秒数（默认 300；<= 0 关闭缓存）
+- ACCOUNT_CACHE_NEGATIVE_TTL：负缓存秒数（默认 30；<= 0 不做负缓存）
+
+指标：
+- account_resolve_total{result=hit|negative_hit|miss}
+
+日志：
+- account_cache_error
+"""
+import os
+import json
+from typing import Iterable, Optional, Tuple
+
+from app.infra.logger import emit
+from app.infra.metrics import ACCOUNT_RESOLVE_TOTAL
+from app.infra.redis_client import get_redis
+
+ACCOUNT_CACHE_TTL = int(os.getenv("ACCOUNT_CACHE_TTL", "300"))
+ACCOUNT_CACHE_NEGATIVE_TTL = int(os.getenv("ACCOUNT_CACHE_NEGATIVE_TTL", "30"))
+
+FIELDS = ("id", "user_id", "site", "account_name", "secret_encrypted")
+_MISSING = "-"  # 负缓存的值
+_GEN_TTL = 86400  # 代数键保留秒数
+
+# KEYS[1]：缓存键，KEYS[2]：代数键；ARGV：读到的代数, 值, TTL 秒。返回 1 = 已写入
+_PUT_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+_script = None
+_script_conn = None
+
+
+def _key(user_id: str, site: str, account_name: str) -> str:
+    # JSON 编码：site / account_name 里带冒号也不会撞键
+    return "acct:resolve:" + _selector(user_id, site, account_name)
+
+
+def _gen_key(user_id: str, site: str, account_name: str) -> str:
+    return "acct:gen:" + _selector(user_id, site, account_name)
+
+
+def _selector(user_id: str, site: str, account_name: str) -> str:
+    return json.dumps([user_id, site, account_name], ensure_ascii=False, separators=(",", ":"))
+
+
+def _put_script(conn):
+    global _script, _script_conn
+    if _script is None or _script_conn is not conn:
+        _script, _script_conn = conn.register_script(_PUT_LUA), conn
+    return _script
+
+
+def get(user_id: str, site: str, account_name: str) -> Tuple[bool, Optional[dict], Optional[str]]:
+    if ACCOUNT_CACHE_TTL <= 0:
+        return False, None, None
+    try:
+        raw, gen = get_redis().mget(_key(user_id, site, account_name), _gen_key(user_id, site, account_name))
+        gen = (gen.decode() if isinstance(gen, bytes) else gen) or "0"
+    except Exception as e:
+        emit("account_cache_error", op="get", error=str(e))
+        raw, gen = None, None
+    if raw is None:
+        ACCOUNT_RESOLVE_TOTAL.labels("miss").inc()
+        return False, None, gen
+    raw = raw.decode() if isinstance(raw, bytes) else raw
+    if raw == _MISSING:
+        ACCOUNT_RESOLVE_TOTAL.labels("negative_hit").inc()
+        return True, None, gen
+    ACCOUNT_RESOLVE_TOTAL.labels("hit").inc()
+    return True, json.loads(raw), gen
+
+
+def put(user_id: str, site: str, account_name: str, row: Optional[dict], gen: Optional[str]) -> bool:
+    ttl = ACCOUNT_CACHE_TTL if row is not None else ACCOUNT_CACHE_NEGATIVE_TTL
+    if ACCOUNT_CACHE_TTL <= 0 or ttl <= 0 or gen is None:
+        return False
+    value = _MISSING if row is None else json.dumps({k: row[k] for k in FIELDS}, ensure_ascii=False)
+    try:
+        conn = get_redis()
+        keys = [_key(user_id, site, account_name), _gen_key(user_id, site, account_name)]
+        return bool(int(_put_script(conn)(keys=keys, args=[gen, value, ttl])))
+    except Exception as e:
+        emit("account_cache_error", op="put", error=str(e))
+        return False
+
+
+def invalidate(keys: Iterable[Tuple[str, str, str]]) -> None:
+    keys = list(keys)
+    if not keys:
+        return
+    try:
+        conn = get_redis()
+        for i in range(0, len(keys), 500):
+            pipe = conn.pipeline(transaction=True)
+            for k in keys[i:i + 500]:
+                pipe.incr(_gen_key(*k))
+                pipe.expire(_gen_key(*k), _GEN_TTL)
+                pipe.delete(_key(*k))
+            pipe.execute()
+    except Exception as e:
+        emit("account_cache_error", op="invalidate", error=str(e))
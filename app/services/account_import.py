@@ -0,0 +1,179 @@
+"""
+模块职能：批量导入账户（POST /api/accounts/import），取代逐个 POST /api/accounts。
+1) 请求体先落到临时文件（SpooledTemporaryFile，小文件留在内存），再逐行读取：内存占用与文件大小无关
+2) open_records：NDJSON（每行 {"site","account_name","secrets":{...}}）或 CSV（site, account_name 列，
+   其余非空列作为 secrets，例如 password）；CSV 缺列在开始前就报错
+3) 每 ACCOUNT_IMPORT_BATCH_SIZE 行一批：密钥在线程池里并行 Fernet 加密（ACCOUNT_IMPORT_WORKERS），
+   然后一条多行 INSERT ... ON CONFLICT (user_id, site, account_name) DO NOTHING RETURNING id，一批一个事务
+4) 新建账户的解析缓存键（含负缓存）随即失效（app.services.account_cache）
+5) 逐行结果：RETURNING 里有的是 created，没有的就是撞了 uq_user_site_acc（conflict）；
+   同一文件里重复的 (site, account_name) 只导第一条，后面的记 conflict
+
+输出（NDJSON，边导边写）：
+- {"line": n, "status": "created", "id", "site", "account_name"}
+- {"line": n, "status": "conflict" | "invalid", "site", "account_name", "error"}
+- 最后一行 {"summary": {"rows", "created", "conflicts", "invalid", "seconds"}}
+- invalid 行立即输出、其余行随所在批次输出，顺序不保证与行号一致，按 line 对应
+
+函数：
+- open_records(f, fmt) -> 迭代器 (line, record | None, error)；格式错误抛 ImportFormatError
+- run_import(user_id, records, batch_size=None) -> NDJSON 行的迭代器
+
+环境变量：
+- ACCOUNT_IMPORT_BATCH_SIZE：每批行数（默认 500）
+- ACCOUNT_IMPORT_WORKERS：加密线程数（默认 4）
+
+日志：
+- acct_import_done
+"""
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from app.core.models import Account
+from app.infra.db import dialect_insert, engine
+from app.infra.logger import emit
+from app.services import account_cache
+from app.services.secrets import encrypt_dict
+
+ACCOUNT_IMPORT_BATCH_SIZE = int(os.getenv("ACCOUNT_IMPORT_BATCH_SIZE", "500"))
+ACCOUNT_IMPORT_WORKERS = int(os.getenv("ACCOUNT_IMPORT_WORKERS", "4"))
+
+REQUIRED = ("site", "account_name")
+MAX_LEN = 255
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class ImportFormatError(ValueError):
+    """文件本身不可导入（格式未知、CSV 缺列），整个请求 400。"""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, ACCOUNT_IMPORT_WORKERS), thread_name_prefix="acct-encrypt")
+        return _executor
+
+
+def _ndjson(text: io.TextIOBase) -> Iterator[Tuple[int, Optional[dict], str]]:
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"invalid json: {e}"
+            continue
+        if not isinstance(rec, dict):
+            yield line_no, None, "each line must be a JSON object"
+            continue
+        yield line_no, rec, ""
+
+
+def _csv(reader: csv.DictReader) -> Iterator[Tuple[int, Optional[dict], str]]:
+    for row in reader:
+        secrets = {k: v for k, v in row.items() if k and k not in REQUIRED and v not in (None, "")}
+        yield reader.line_num, {"site": row.get("site"), "account_name": row.get("account_name"), "secrets": secrets}, ""
+
+
+def open_records(f: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], str]]:
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    if fmt == "ndjson":
+        return _ndjson(text)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        missing = [c for c in REQUIRED if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ImportFormatError(f"missing column {', '.join(missing)}")
+        return _csv(reader)
+    raise ImportFormatError(f"unsupported format: {fmt}")
+
+
+def validate(rec: dict) -> Tuple[Optional[dict], str]:
+    site = str(rec.get("site") or "").strip()
+    name = str(rec.get("account_name") or "").strip()
+    secrets = rec.get("secrets")
+    if not site or not name:
+        return None, "site and account_name are required"
+    if len(site) > MAX_LEN or len(name) > MAX_LEN:
+        return None, f"site / account_name longer than {MAX_LEN}"
+    if not isinstance(secrets, dict) or not secrets:
+        return None, "secrets must be a non-empty object"
+    return {"site": site, "account_name": name, "secrets": secrets}, ""
+
+
+def insert_batch(conn, user_id: str, rows: List[dict]) -> set:
+    """rows 已去重并带 id / secret_encrypted；返回实际插入的 id（其余撞了唯一约束）。"""
+    insert = dialect_insert()
+    now = datetime.utcnow()
+    stmt = (insert(Account.__table__)
+            .on_conflict_do_nothing(index_elements=["user_id", "site", "account_name"])
+            .returning(Account.__table__.c.id))
+    params = [{"id": r["id"], "user_id": user_id, "site": r["site"], "account_name": r["account_name"],
+               "secret_encrypted": r["secret_encrypted"], "meta_json": "{}", "created_at": now} for r in rows]
+    return {row.id for row in conn.execute(stmt, params)}
+
+
+def _flush(user_id: str, batch: List[Tuple[int, dict]], counts: dict) -> Iterator[dict]:
+    seen, unique, results = set(), [], {}
+    for line, rec in batch:
+        key = (rec["site"], rec["account_name"])
+        if key in seen:
+            results[line] = {"status": "conflict", "error": "duplicate in file"}
+        else:
+            seen.add(key)
+            unique.append((line, rec))
+    encrypted = list(_get_executor().map(encrypt_dict, [rec["secrets"] for _, rec in unique]))
+    rows = [{"id": str(uuid.uuid4()), "site": rec["site"], "account_name": rec["account_name"], "secret_encrypted": enc}
+            for (_, rec), enc in zip(unique, encrypted)]
+    inserted = set()
+    if rows:
+        with engine.begin() as conn:
+            inserted = insert_batch(conn, user_id, rows)
+        account_cache.invalidate([(user_id, r["site"], r["account_name"]) for r in rows if r["id"] in inserted])
+    for (line, _), row in zip(unique, rows):
+        results[line] = ({"status": "created", "id": row["id"]} if row["id"] in inserted
+                         else {"status": "conflict", "error": "account already exists"})
+    for line, rec in batch:
+        res = results[line]
+        counts["created" if res["status"] == "created" else "conflicts"] += 1
+        yield {"line": line, "site": rec["site"], "account_name": rec["account_name"], **res}
+
+
+def run_import(user_id: str, records: Iterator[Tuple[int, Optional[dict], str]],
+               batch_size: Optional[int] = None) -> Iterator[str]:
+    batch_size = batch_size or ACCOUNT_IMPORT_BATCH_SIZE
+    started = time.perf_counter()
+    counts = {"rows": 0, "created": 0, "conflicts": 0, "invalid": 0}
+    batch: List[Tuple[int, dict]] = []
+    for line, rec, err in records:
+        counts["rows"] += 1
+        clean, err = validate(rec) if rec is not None else (None, err)
+        if clean is None:
+            counts["invalid"] += 1
+            rec = rec or {}
+            yield json.dumps({"line": line, "status": "invalid", "site": rec.get("site"),
+                              "account_name": rec.get("account_name"), "error": err}, ensure_ascii=False) + "\n"
+            continue
+        batch.append((line, clean))
+        if len(batch) >= batch_size:
+            for res in _flush(user_id, batch, counts):
+                yield json.dumps(res, ensure_ascii=False) + "\n"
+            batch = []
+    if batch:
+        for res in _flush(user_id, batch, counts):
+            yield json.dumps(res, ensure_ascii=False) + "\n"
+    summary = {**counts, "seconds": round(time.perf_counter() - started, 3)}
+    emit("acct_import_done", user_id=user_id, **summary)
+    yield json.dumps({"summary": summary}) + "\n"
@@ -1,34 +1,149 @@
 """
 模块职能：
 - 账户 CRUD 与选择器解析（{"site":"...", "account_name":"..."}）。
+- resolve 走 app.services.account_cache（Redis，含负缓存）；创建 / 修改 / 删除后显式失效对应键。
+- 列表按 (created_at DESC, id DESC) 键集分页，只取 id / site / account_name / created_at 四列
+  （不读 secret_encrypted）；走 ix_accounts_user_site_created / ix_accounts_site_created / ix_accounts_created。
+  游标是上一页最后一行的 (created_at, id)，base64 编码，对调用方不透明。
+
+函数：
+- list_page(db, user_id, site=None, limit=100, cursor=None) -> (rows, next_cursor)：user_id 为空即全量（管理员）
+- iter_accounts(db, user_id, site=None, batch=ACCOUNTS_EXPORT_BATCH)：逐批产出，供流式导出
+- encode_cursor / decode_cursor（非法游标抛 ValueError）
+- resolve(db, user_id, selector) -> ResolvedAccount（id / user_id / site / account_name / secret_encrypted）；
+  找不到抛 ValueError("account_not_found")
+- update_secrets(db, user_id, account_id, secrets) / delete_account(db, user_id, account_id)：不存在返回 None / False
+- select_ids(db, user_id, site=None, selectors=None, limit=None) -> (ids, not_found)：批量测试登录的账户范围
+- load_many(db, user_id, ids)：按 id 批量取（含 secret_encrypted），只返回本人的账户
+
+环境变量：
+- ACCOUNTS_EXPORT_BATCH：流式导出每批行数（默认 1000）
 
 日志：
-- acct_create / acct_resolve
+- acct_create / acct_resolve（cached=true 表示未查库）/ acct_update / acct_delete
 """
-from typing import Optional, Dict, List
+import os
+import json
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, List, Iterator, Tuple
+from sqlalchemy import select, and_, or_, tuple_, delete
 from sqlalchemy.orm import Session
-from app.core.models import Account
+from app.core.models import Account, Session as SessionModel
+from app.services import account_cache
 from app.services.secrets import encrypt_dict
 from app.infra.logger import emit
 
+ACCOUNTS_EXPORT_BATCH = int(os.getenv("ACCOUNTS_EXPORT_BATCH", "1000"))
+
+@dataclass(frozen=True)
+class ResolvedAccount:
+    id: str
+    user_id: str
+    site: str
+    account_name: str
+    secret_encrypted: str
+
 def create_account(db: Session, user_id: str, site: str, account_name: str,
                    secrets: Dict, meta: Optional[Dict]=None) -> Account:
     acc = Account(user_id=user_id, site=site, account_name=account_name,
                   secret_encrypted=encrypt_dict(secrets), meta_json=(meta or {}).__str__())
     db.add(acc); db.commit(); db.refresh(acc)
+    account_cache.invalidate([(user_id, site, account_name)])  # 清掉可能存在的负缓存
     emit("acct_create", user_id=user_id, site=site, account_id=acc.id)
     return acc
 
-def list_accounts(db: Session, user_id: str, site: Optional[str]=None) -> List[Account]:
-    q = db.query(Account).filter(Account.user_id==user_id)
+def update_secrets(db: Session, user_id: str, account_id: str, secrets: Dict) -> Optional[Account]:
+    acc = db.get(Account, account_id)
+    if acc is None or acc.user_id != user_id:
+        return None
+    acc.secret_encrypted = encrypt_dict(secrets)
+    db.commit()
+    account_cache.invalidate([(user_id, acc.site, acc.account_name)])
+    emit("acct_update", user_id=user_id, site=acc.site, account_id=acc.id)
+    return acc
+
+def delete_account(db: Session, user_id: str, account_id: str) -> bool:
+    acc = db.get(Account, account_id)
+    if acc is None or acc.user_id != user_id:
+        return False
+    key = (user_id, acc.site, acc.account_name)
+    db.execute(delete(SessionModel).where(SessionModel.account_id==account_id))
+    db.delete(acc); db.commit()
+    account_cache.invalidate([key])
+    emit("acct_delete", user_id=user_id, site=key[1], account_id=account_id)
+    return True
+
+def list_accounts(db: Session, user_id: str, site: Optional[str]=None) -> List:
+    q = db.query(Account.id, Account.site, Account.account_name, Account.created_at).filter(Account.user_id==user_id)
     if site: q = q.filter(Account.site==site)
-    return q.order_by(Account.created_at.desc()).all()
+    return q.order_by(Account.created_at.desc(), Account.id.desc()).all()
 
-def resolve(db: Session, user_id: str, selector: Dict) -> Account:
+def encode_cursor(created_at: datetime, account_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), account_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, account_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(account_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def list_page(db: Session, user_id: Optional[str], site: Optional[str]=None, limit: int=100,
+              cursor: Optional[str]=None) -> Tuple[List, Optional[str]]:
+    q = select(Account.id, Account.site, Account.account_name, Account.created_at)
+    if user_id is not None: q = q.where(Account.user_id==user_id)
+    if site: q = q.where(Account.site==site)
+    if cursor:
+        created_at, account_id = decode_cursor(cursor)
+        q = q.where(or_(Account.created_at < created_at,
+                        and_(Account.created_at == created_at, Account.id < account_id)))
+    # 多取一行判断是否还有下一页
+    rows = db.execute(q.order_by(Account.created_at.desc(), Account.id.desc()).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+def iter_accounts(db: Session, user_id: Optional[str], site: Optional[str]=None,
+                  batch: int=ACCOUNTS_EXPORT_BATCH) -> Iterator[List]:
+    cursor = None
+    while True:
+        rows, cursor = list_page(db, user_id, site=site, limit=batch, cursor=cursor)
+        if rows: yield rows
+        if cursor is None: return
+
+def resolve(db: Session, user_id: str, selector: Dict) -> ResolvedAccount:
     site, name = selector.get("site"), selector.get("account_name")
-    acc = (db.query(Account)
-           .filter(Account.user_id==user_id, Account.site==site, Account.account_name==name)
-           .first())
-    if not acc: raise ValueError("account_not_found")
-    emit("acct_resolve", user_id=user_id, site=site, account_id=acc.id)
-    return acc
+    cached, row, gen = account_cache.get(user_id, site, name)
+    if not cached:
+        found = db.execute(select(Account.id, Account.user_id, Account.site, Account.account_name,
+                                  Account.secret_encrypted)
+                           .where(Account.user_id==user_id, Account.site==site, Account.account_name==name)
+                           .limit(1)).first()
+        row = dict(found._mapping) if found else None
+        account_cache.put(user_id, site, name, row, gen)  # 查库期间被失效过则不写回
+    if not row: raise ValueError("account_not_found")
+    emit("acct_resolve", user_id=user_id, site=site, account_id=row["id"], cached=cached)
+    return ResolvedAccount(**row)
+
+def select_ids(db: Session, user_id: str, site: Optional[str]=None, selectors: Optional[List[Dict]]=None,
+               limit: Optional[int]=None) -> Tuple[List[str], List[Dict]]:
+    q = select(Account.id, Account.site, Account.account_name).where(Account.user_id==user_id)
+    if site: q = q.where(Account.site==site)
+    if selectors is None:
+        if limit: q = q.limit(limit)
+        return [r.id for r in db.execute(q.order_by(Account.site, Account.created_at, Account.id))], []
+    found, wanted = {}, [(s.get("site"), s.get("account_name")) for s in selectors]
+    for i in range(0, len(wanted), 500):  # IN 列表分块，避免超出参数上限
+        for r in db.execute(q.where(tuple_(Account.site, Account.account_name).in_(wanted[i:i + 500]))):
+            found[(r.site, r.account_name)] = r.id
+    ids = list(dict.fromkeys(found[k] for k in wanted if k in found))
+    not_found = [{"site": k[0], "account_name": k[1]} for k in dict.fromkeys(wanted) if k not in found]
+    return ids, not_found
+
+def load_many(db: Session, user_id: str, ids: List[str]) -> List:
+    return db.execute(select(Account.id, Account.user_id, Account.site, Account.account_name, Account.secret_encrypted)
+                      .where(Account.user_id==user_id, Account.id.in_(ids))).all()
@@ -0,0 +1,141 @@
+"""
+模块职能：
+- POST /api/commands 的准入控制（在幂等记录 / jobs 写库之前执行，过载时不放大 command_requests 与 jobs；
+  幂等键已绑定 job 的重试在此之前直接返回，见 app.services.commands）：
+  1) 积压削峰：各优先级通道的 RQ 队列总深度超过 ADMISSION_SHED_DEPTH 时拒绝低优先级命令（非 high 通道，
+     见 app.workers.lanes），交互命令照常接收；超过更高的 ADMISSION_SHED_DEPTH_HIGH 时 high 通道也拒绝
+     （单条命令任何角色都走 high，外部 cron 定点打来的大量单条命令靠这一档削掉）。深度按进程缓存 ADMISSION_DEPTH_CACHE_SECONDS 秒，
+     不给每个请求多加一次往返。先于令牌桶检查，被削掉的请求不扣令牌。
+     拒绝 → AdmissionRejected(503, retry_after = ADMISSION_SHED_RETRY_AFTER)
+  2) 令牌桶限流：每用户一个桶 + 全局一个桶，一次 Lua 调用同时检查（两个桶都有令牌才同时扣减，
+     被全局桶拒绝时不会白扣用户桶）；时间取 Redis TIME，多个 API 进程共用同一个桶。
+     拒绝 → AdmissionRejected(429, retry_after = 补足 1 个令牌所需秒数)
+- Redis 不可用时放行（fail-open，记 admission_error）：准入是保护手段，不能成为新的单点。
+
+函数 / 类型：
+- AdmissionRejected(status, reason, retry_after)：reason = user_rate | global_rate | backlog
+- admit(user_id, low_priority=False, conn=None)：通过返回 None，否则抛 AdmissionRejected
+
+环境变量（<= 0 关闭对应检查）：
+- ADMISSION_USER_RATE / ADMISSION_USER_BURST：每用户每秒令牌数 / 桶容量
+- ADMISSION_GLOBAL_RATE / ADMISSION_GLOBAL_BURST：全局
+- ADMISSION_SHED_DEPTH / ADMISSION_SHED_DEPTH_HIGH / ADMISSION_SHED_RETRY_AFTER / ADMISSION_DEPTH_CACHE_SECONDS
+
+日志：
+- admission_rejected / admission_error
+"""
+import os
+import math
+import time
+import threading
+from typing import Optional
+
+from app.infra.logger import emit
+from app.infra.metrics import ADMISSION_REJECTED_TOTAL
+from app.infra.redis_client import get_redis
+
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "20"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "100"))
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "500"))
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "2000"))
+ADMISSION_SHED_DEPTH = int(os.getenv("ADMISSION_SHED_DEPTH", "50000"))
+ADMISSION_SHED_DEPTH_HIGH = int(os.getenv("ADMISSION_SHED_DEPTH_HIGH", "200000"))
+ADMISSION_SHED_RETRY_AFTER = int(os.getenv("ADMISSION_SHED_RETRY_AFTER", "30"))
+ADMISSION_DEPTH_CACHE_SECONDS = float(os.getenv("ADMISSION_DEPTH_CACHE_SECONDS", "1"))
+
+# KEYS：各桶；ARGV：每个桶的 rate, burst 依次排列。
+# 返回 {0, 通过} 或 {被拒的桶序号(1 起), 等待秒数(字符串，Lua 数字回传会被截成整数)}
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = {}
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  local v = redis.call('HMGET', key, 't', 'ts')
+  local n = tonumber(v[1]) or burst
+  local ts = tonumber(v[2]) or now
+  n = math.min(burst, n + math.max(0, now - ts) * rate)
+  if n < 1 then
+    return {i, tostring((1 - n) / rate)}
+  end
+  tokens[i] = n
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  redis.call('HSET', key, 't', tostring(tokens[i] - 1), 'ts', tostring(now))
+  redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {0, '0'}
+"""
+
+_script = None
+_script_conn = None
+_depth_lock = threading.Lock()
+_depth_cache = {"at": 0.0, "depth": 0, "conn": None}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _bucket_script(conn):
+    global _script, _script_conn
+    if _script is None or _script_conn is not conn:
+        _script, _script_conn = conn.register_script(_TOKEN_BUCKET_LUA), conn
+    return _script
+
+
+def _check_rate(conn, user_id: str) -> None:
+    buckets = []
+    if ADMISSION_USER_RATE > 0:
+        buckets.append(("user_rate", f"admission:user:{user_id}", ADMISSION_USER_RATE, ADMISSION_USER_BURST))
+    if ADMISSION_GLOBAL_RATE > 0:
+        buckets.append(("global_rate", "admission:global", ADMISSION_GLOBAL_RATE, ADMISSION_GLOBAL_BURST))
+    if not buckets:
+        return
+    args = []
+    for _, _, rate, burst in buckets:
+        args += [rate, max(1.0, burst)]
+    idx, wait = _bucket_script(conn)(keys=[b[1] for b in buckets], args=args)
+    if int(idx):
+        wait = float(wait.decode() if isinstance(wait, bytes) else wait)
+        raise AdmissionRejected(429, buckets[int(idx) - 1][0], max(1, math.ceil(wait)))
+
+
+def _queue_depth(conn) -> int:
+    now = time.monotonic()
+    with _depth_lock:
+        if _depth_cache["conn"] is conn and now - _depth_cache["at"] < ADMISSION_DEPTH_CACHE_SECONDS:
+            return _depth_cache["depth"]
+    from app.workers.lanes import worker_queue_names
+    pipe = conn.pipeline(transaction=False)
+    for name in worker_queue_names():
+        pipe.llen(f"rq:queue:{name}")
+    depth = sum(int(n) for n in pipe.execute())
+    with _depth_lock:
+        _depth_cache.update(at=now, depth=depth, conn=conn)
+    return depth
+
+
+def admit(user_id: str, low_priority: bool = False, conn=None) -> None:
+    try:
+        conn = conn or get_redis()
+        shed_depth = ADMISSION_SHED_DEPTH if low_priority else ADMISSION_SHED_DEPTH_HIGH
+        if shed_depth > 0:
+            depth = _queue_depth(conn)
+            if depth >= shed_depth:
+                raise AdmissionRejected(503, "backlog", ADMISSION_SHED_RETRY_AFTER)
+        _check_rate(conn, user_id)
+    except AdmissionRejected as e:
+        ADMISSION_REJECTED_TOTAL.labels(e.reason).inc()
+        emit("admission_rejected", user_id=user_id, reason=e.reason, retry_after=e.retry_after,
+             low_priority=low_priority)
+        raise
+    except Exception as e:  # Redis 不可用：放行
+        emit("admission_error", user_id=user_id, error=str(e))
@@ -0,0 +1,153 @@
+""""模块职能：
+
+命令提交的业务路径（POST /api/commands 与调度器 app.workers.scheduler 共用）：
+校验（validate：类型、site.action 的 account_selector、items、IMPORT_CUSTOMERS 的 file_url / batch_size）→ 幂等只读回查（find_job_id）→ 准入 → 幂等（ensure_request）→ 预建 Job（PENDING）→ 绑定 job_id → 按类型入队 / 扇出 / 后台执行
+
+主要类型 / 函数：
+
+CommandIn：命令请求体（API 直接用作 body；调度器从 schedules.command 还原）
+
+CommandRejected(status, detail, headers=None)：校验 / 准入失败，API 原样转成 HTTPException
+
+validate(inp)：只校验命令本身，不碰库；被拒的命令不留下 command_requests / jobs 行
+
+submit(db, ctx, inp, background=None, admit=True) -> job_id
+- 幂等命中直接返回已有 job_id，不重复入队，也不经过准入（客户端重试不扣令牌、不被 429）
+- admit=False 跳过准入控制（调度器自己做抖动削峰，不与交互请求抢令牌桶）
+- IMPORT_CUSTOMERS 默认入 RQ 队列；IMPORT_CUSTOMERS_RUNNER=background 且有 BackgroundTasks 时才在 API 进程内执行（兼容模式）
+
+批量 / 扇出 / 优先级通道 / 准入的细节见 app.api.commands 模块说明"""
+# app/services/commands.py
+import os
+import uuid
+from typing import Optional, Dict, List, Literal
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from app.core.context import Context
+from app.core.models import Job
+from app.services.idempotency import ensure_request, find_job_id, link_job_id
+from app.infra.logger import emit
+from app.workers.queue import enqueue, enqueue_batch, enqueue_import
+from app.workers import lanes
+from app.services import admission, customer_import, fanout
+from app.infra.metrics import IDEMPOTENCY_TOTAL
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+FANOUT_MIN_ITEMS = int(os.getenv("FANOUT_MIN_ITEMS", "2000"))
+FANOUT_CHUNK_SIZE = int(os.getenv("FANOUT_CHUNK_SIZE", "500"))
+IMPORT_CUSTOMERS_RUNNER = os.getenv("IMPORT_CUSTOMERS_RUNNER", "queue").lower()
+
+class CommandIn(BaseModel):
+    # Step4： "example.fetch_profile"；Step3： "IMPORT_CUSTOMERS"
+    type: str
+    payload: Dict = Field(default_factory=dict)
+    idempotency_key: str
+
+    # Step4 使用；为了兼容 Step3，设为可选
+    account_selector: Optional[Dict] = None  # 例：{"site":"example","account_name":"acc1"}
+
+    # 批量：逐项 payload（例：[{"uid":"1"},{"uid":"2"}]）；给了 items 时忽略 payload
+    items: Optional[List[Dict]] = None
+    # 扇出：每个子作业的项数；不传时 items 超过 FANOUT_MIN_ITEMS 才按 FANOUT_CHUNK_SIZE 扇出
+    chunk_size: Optional[int] = Field(default=None, ge=1)
+    # 优先级通道；不传按命令形态取默认（单条 high，批量 normal），批量命令按角色封顶
+    priority: Optional[Literal["high", "normal", "low"]] = None
+
+
+class CommandRejected(Exception):
+    def __init__(self, status: int, detail: str, headers: Optional[dict] = None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.headers = headers
+
+
+def validate(inp: CommandIn) -> None:
+    """命令本身的校验（不读写库）：不通过抛 CommandRejected(400)。submit 与创建定时任务共用。"""
+    if "." in inp.type:
+        if not inp.account_selector:
+            raise CommandRejected(400, "account_selector is required for Step4 commands (site.action)")
+    elif inp.type != "IMPORT_CUSTOMERS":
+        # 不认识的老式类型
+        emit("cmd_unknown_type", type=inp.type)
+        raise CommandRejected(400, "Unknown command type")
+    if inp.items is not None:
+        if "." not in inp.type:
+            raise CommandRejected(400, "items is only supported for site.action commands")
+        if not inp.items or len(inp.items) > BATCH_MAX_ITEMS:
+            raise CommandRejected(400, f"items must contain 1..{BATCH_MAX_ITEMS} entries")
+    if inp.type == "IMPORT_CUSTOMERS":
+        try:
+            customer_import.validate_payload(inp.payload)
+        except customer_import.ImportFileError as e:
+            raise CommandRejected(400, str(e))
+
+
+def submit(db: Session, ctx: Context, inp: CommandIn, background=None, admit: bool = True) -> str:
+    bulk = inp.items is not None or inp.type == "IMPORT_CUSTOMERS"
+    priority = lanes.resolve(inp.priority, ctx.role, bulk)
+    emit("cmd_submit", user_id=ctx.user_id, type=inp.type, key=inp.idempotency_key,
+         items=len(inp.items) if inp.items is not None else None, priority=priority)
+    if inp.priority and priority != inp.priority:
+        emit("cmd_priority_capped", user_id=ctx.user_id, role=ctx.role, requested=inp.priority, priority=priority)
+    validate(inp)
+
+    # 重试：已绑定 job 的幂等键直接返回，不占准入令牌
+    job_id = find_job_id(db, ctx.user_id, inp.idempotency_key)
+    if job_id:
+        IDEMPOTENCY_TOTAL.labels("hit").inc()
+        emit("idem_hit", user_id=ctx.user_id, key=inp.idempotency_key, job_id=job_id)
+        return job_id
+
+    # 准入：必须在幂等记录 / Job 写库之前，过载时被拒的请求不留下任何行
+    if admit:
+        try:
+            admission.admit(ctx.user_id, low_priority=priority != "high")
+        except admission.AdmissionRejected as e:
+            detail = "Too many commands, retry later" if e.status == 429 else "Queue backlog too deep, retry later"
+            raise CommandRejected(e.status, detail, headers={"Retry-After": str(e.retry_after)})
+
+    # 幂等：第一次创建记录；后续命中直接返回旧 job
+    payload = {"items": inp.items} if inp.items is not None else inp.payload
+    existed = ensure_request(db, ctx.user_id, inp.idempotency_key, inp.type, payload)
+    if not existed:
+        emit("idem_none_unexpected", user_id=ctx.user_id, key=inp.idempotency_key, type=inp.type)
+        raise CommandRejected(500, "idempotency_record_create_failed")
+
+    if existed.job_id:
+        IDEMPOTENCY_TOTAL.labels("hit").inc()
+        emit("idem_hit", user_id=ctx.user_id, key=inp.idempotency_key, job_id=existed.job_id)
+        return existed.job_id
+
+    IDEMPOTENCY_TOTAL.labels("miss").inc()
+    emit("idem_miss", user_id=ctx.user_id, key=inp.idempotency_key)
+
+    # 统一创建 Job（PENDING），并把 job_id 绑定到幂等记录
+    job_id = str(uuid.uuid4())
+    Job.create_pending(db, job_id=job_id, user_id=ctx.user_id, job_type=inp.type)
+    link_job_id(db, ctx.user_id, inp.idempotency_key, job_id)
+    emit("job_created_pending", user_id=ctx.user_id, job_id=job_id, type=inp.type)
+
+    # —— 分流执行 —— #
+    if "." in inp.type:
+        # Step4：队列化（account_selector 已在 validate 里检查）
+        # 入队：dispatcher 在 Worker 里解析 site/action，拉账号、登录/复用会话、执行连接器动作
+        if inp.items is not None and (inp.chunk_size or len(inp.items) > FANOUT_MIN_ITEMS):
+            fanout.fan_out(db, parent_id=job_id, user_id=ctx.user_id, job_type=inp.type,
+                           account_selector=inp.account_selector, items=inp.items,
+                           chunk_size=inp.chunk_size or FANOUT_CHUNK_SIZE, priority=priority)
+        elif inp.items is not None:
+            enqueue_batch(job_id=job_id, user_id=ctx.user_id, type=inp.type,
+                          account_selector=inp.account_selector, items=inp.items, priority=priority)
+        else:
+            enqueue(job_id=job_id, user_id=ctx.user_id, type=inp.type,
+                    account_selector=inp.account_selector, payload=inp.payload, priority=priority)
+    else:
+        if IMPORT_CUSTOMERS_RUNNER != "background" or background is None:
+            enqueue_import(job_id, ctx.serialize(), inp.payload, priority=priority)
+        else:
+            # Step3：API 进程内后台执行，方便兼容旧测试/脚本
+            from app.workers.jobs import import_customers
+            background.add_task(import_customers, ctx.serialize(), inp.payload, job_id)
+
+    return job_id
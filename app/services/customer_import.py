@@ -0,0 +1,246 @@
+"""
+模块职能：IMPORT_CUSTOMERS 的流式导入流水线，内存占用与文件大小无关。
+1) download：http(s) 经共享 httpx 连接池按块流式下载到临时文件（IMPORT_DOWNLOAD_CHUNK）；本地路径 / file:// 直接读，不复制
+   来源校验（file_url 来自用户提交的命令，见 check_source）：
+   - http(s)：主机解析出的每个地址都必须是公网地址（拒绝回环 / 私有 / 链路本地 / 保留段）；下载时直接连校验过的
+     那个 IP（Host 头与 TLS SNI / 证书校验仍用原主机名），httpx 不再自己解析一次，DNS 重绑定绕不过去；
+     不自动跟随重定向，每一跳都重新解析、校验并钉住，最多 IMPORT_MAX_REDIRECTS 跳
+   - 本地路径 / file://：只允许服务端上传目录 IMPORT_UPLOAD_DIR 之内（realpath 判断，符号链接 / .. 逃不出去）；
+     未配置该目录时一律拒绝。目录外的路径不论是否存在都只报 source not allowed，不泄露文件是否存在
+   - 其它 scheme 拒绝
+2) iter_batches：csv.DictReader 增量读取，每次产出 batch_size 行
+3) validate_row：external_id 必填、email 粗校验、字段裁剪；不合格行计数并保留前 MAX_ERRORS 条原因
+4) upsert_batch：按方言 INSERT ... ON CONFLICT (user_id, external_id) DO UPDATE，一批一个事务
+5) 进度：ProgressReporter 每隔 IMPORT_PROGRESS_SECONDS 写回 jobs.processed / phase（download → upsert → done）；
+   不合格行逐条追加到 job_results，作业运行中即可分页查看
+
+CSV 列：external_id（必填）, name, email, phone；多余列忽略。
+
+函数：
+- validate_payload(payload)：提交命令时校验 file_url / batch_size，不合格抛 ImportFileError（API 返回 400）
+- check_source(source) / check_batch_size(value)
+- run_import(user_id, source, job_id=None, batch_size=None) -> dict 结果摘要
+
+环境变量：
+- IMPORT_UPLOAD_DIR：允许导入本地文件的服务端目录（默认空 = 只接受 http(s)）
+- IMPORT_MAX_REDIRECTS：下载时最多跟随的重定向次数（默认 3）
+- IMPORT_BATCH_SIZE_MAX：payload.batch_size 上限（默认 50000）
+
+日志：
+- import_download_done / import_progress / import_done
+"""
+import os
+import csv
+import httpx
+import socket
+import ipaddress
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
+
+from app.core.models import Customer
+from app.infra.db import dialect_insert, engine
+from app.infra.http_client import get_http_client
+from app.infra.logger import emit
+from app.services.job_progress import ProgressReporter, append_results
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_DOWNLOAD_CHUNK = int(os.getenv("IMPORT_DOWNLOAD_CHUNK", str(1 << 20)))
+IMPORT_PROGRESS_SECONDS = float(os.getenv("IMPORT_PROGRESS_SECONDS", "1"))
+IMPORT_TMP_DIR = os.getenv("IMPORT_TMP_DIR") or None
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", "")
+IMPORT_MAX_REDIRECTS = int(os.getenv("IMPORT_MAX_REDIRECTS", "3"))
+IMPORT_BATCH_SIZE_MAX = int(os.getenv("IMPORT_BATCH_SIZE_MAX", "50000"))
+MAX_ERRORS = 20
+
+REQUIRED = "external_id"
+FIELDS = ("name", "email", "phone")
+MAX_LEN = 255
+
+
+class ImportFileError(ValueError):
+    """文件本身不可导入（缺列、下载失败等），整个作业失败。"""
+
+
+def _check_host(url: str) -> str:
+    """主机解析出的地址全部是公网地址才放行，返回下载时要连接的那个地址。"""
+    host = urlparse(url).hostname
+    if not host:
+        raise ImportFileError("source not allowed")
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        raise ImportFileError(f"download failed: cannot resolve {host}")
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if getattr(ip, "ipv4_mapped", None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global:  # 回环 / 私有 / 链路本地 / 保留 / 组播 / 共享地址段
+            raise ImportFileError("source not allowed")
+    return infos[0][4][0].split("%")[0]
+
+
+def _pinned(url: str) -> Tuple[httpx.URL, dict, dict]:
+    """把 URL 的主机换成校验过的 IP；原主机名放进 Host 头与 sni_hostname（https 证书按它校验）。"""
+    ip = _check_host(url)
+    u = httpx.URL(url)
+    extensions = {"sni_hostname": u.host} if u.scheme == "https" else {}
+    return u.copy_with(host=ip), {"Host": u.netloc.decode("ascii")}, extensions
+
+
+def _local_path(source: str) -> str:
+    parsed = urlparse(source)
+    path = url2pathname(parsed.path) if parsed.scheme == "file" else source
+    if not IMPORT_UPLOAD_DIR:
+        raise ImportFileError("source not allowed")
+    root = os.path.realpath(IMPORT_UPLOAD_DIR)
+    real = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, real]) != root:
+        raise ImportFileError("source not allowed")
+    return real
+
+
+def check_source(source: str) -> str:
+    """校验来源：http(s) 返回原 URL，本地来源返回上传目录内的真实路径；不允许的来源抛 ImportFileError。"""
+    if not isinstance(source, str) or not source:
+        raise ImportFileError("file_url is required")
+    scheme = urlparse(source).scheme
+    if scheme in ("http", "https"):
+        _check_host(source)
+        return source
+    if scheme in ("", "file"):
+        return _local_path(source)
+    raise ImportFileError("source not allowed")
+
+
+def check_batch_size(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= IMPORT_BATCH_SIZE_MAX:
+        raise ImportFileError(f"batch_size must be an integer in 1..{IMPORT_BATCH_SIZE_MAX}")
+    return value
+
+
+def validate_payload(payload: Optional[dict]) -> None:
+    payload = payload or {}
+    check_source(payload.get("file_url") or "")
+    check_batch_size(payload.get("batch_size"))
+
+
+@contextmanager
+def download(source: str) -> Iterator[str]:
+    """产出可读的本地路径；远程文件下载到临时文件，用完删除。"""
+    if isinstance(source, str) and urlparse(source).scheme in ("http", "https"):
+        # 主机在 _pinned 里解析、校验并钉住：只解析一次，校验的地址就是连接的地址
+        fd, path = tempfile.mkstemp(prefix="import_", suffix=".csv", dir=IMPORT_TMP_DIR)
+        try:
+            size, url = 0, source
+            with os.fdopen(fd, "wb") as out:
+                for _ in range(IMPORT_MAX_REDIRECTS + 1):
+                    target, headers, extensions = _pinned(url)  # 每一跳重新解析、校验并钉住 IP
+                    with get_http_client().stream("GET", target, headers=headers, extensions=extensions,
+                                                  timeout=60, follow_redirects=False) as r:
+                        if r.is_redirect:
+                            url = urljoin(url, r.headers.get("location", ""))
+                            if urlparse(url).scheme not in ("http", "https"):
+                                raise ImportFileError("source not allowed")
+                            continue
+                        if r.status_code != 200:
+                            raise ImportFileError(f"download failed: HTTP {r.status_code}")
+                        for chunk in r.iter_bytes(IMPORT_DOWNLOAD_CHUNK):
+                            out.write(chunk)
+                            size += len(chunk)
+                        break
+                else:
+                    raise ImportFileError("download failed: too many redirects")
+            emit("import_download_done", source=source, bytes=size)
+            yield path
+        finally:
+            os.unlink(path)
+        return
+    source = check_source(source)
+    if not os.path.isfile(source):
+        raise ImportFileError("source not found")
+    yield source
+
+
+def iter_batches(path: str, batch_size: int) -> Iterator[List[Dict[str, str]]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or REQUIRED not in reader.fieldnames:
+            raise ImportFileError(f"missing column {REQUIRED}")
+        batch = []
+        for row in reader:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def validate_row(row: Dict[str, str]) -> Tuple[Optional[dict], str]:
+    ext = (row.get(REQUIRED) or "").strip()
+    if not ext:
+        return None, "external_id is empty"
+    out = {REQUIRED: ext[:MAX_LEN]}
+    for k in FIELDS:
+        out[k] = (row.get(k) or "").strip()[:MAX_LEN]
+    if out["email"] and "@" not in out["email"]:
+        return None, f"invalid email: {out['email']}"
+    return out, ""
+
+
+def upsert_batch(conn, user_id: str, rows: List[dict]) -> None:
+    insert = dialect_insert()
+    now = datetime.utcnow()
+    stmt = insert(Customer.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "external_id"],
+        set_={k: stmt.excluded[k] for k in (*FIELDS, "updated_at")},
+    )
+    conn.execute(stmt, [{**r, "user_id": user_id, "created_at": now, "updated_at": now} for r in rows])
+
+
+def run_import(user_id: str, source: str, job_id: Optional[str] = None, batch_size: Optional[int] = None) -> dict:
+    batch_size = check_batch_size(batch_size) or IMPORT_BATCH_SIZE
+    started = time.perf_counter()
+    processed = upserted = invalid = 0
+    errors: List[dict] = []
+    progress = ProgressReporter(job_id, min_interval=IMPORT_PROGRESS_SECONDS)
+    progress.update(phase="download")
+    with download(source) as path:
+        progress.update(phase="upsert")
+        for batch in iter_batches(path, batch_size):
+            good, bad = [], []
+            for i, row in enumerate(batch, start=processed + 2):  # 第 1 行是表头
+                clean, err = validate_row(row)
+                if clean is None:
+                    bad.append({"line": i, "error": err})
+                else:
+                    good.append(clean)
+            # 同一批内重复的 external_id 只保留最后一条（ON CONFLICT 不能在一条语句里改同一行两次）
+            good = list({r[REQUIRED]: r for r in good}.values())
+            if good:
+                with engine.begin() as conn:
+                    upsert_batch(conn, user_id, good)
+            # 全部不合格行进 job_results（可分页查看）；摘要里只留前 MAX_ERRORS 条
+            append_results(job_id, bad)
+            errors.extend(bad[:MAX_ERRORS - len(errors)])
+            invalid += len(bad)
+            processed += len(batch)
+            upserted += len(good)
+            if progress.update(processed=processed):
+                emit("import_progress", job_id=job_id, processed=processed, invalid=invalid)
+    progress.update(processed=processed, phase="done")
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows": processed, "upserted": upserted, "invalid": invalid, "errors": errors,
+        "seconds": round(elapsed, 3), "rows_per_sec": round(processed / elapsed, 1) if elapsed else 0.0,
+    }
+    emit("import_done", job_id=job_id, **{k: v for k, v in summary.items() if k != "errors"})
+    return summary
@@ -0,0 +1,153 @@
+"""
+模块职能：
+- 父子作业（扇出）：父作业把输入切成 N 块，每块建一个子 Job（parent_id 指向父作业）并各自入队，
+  由多个 Worker 并行执行；子作业跑的是批量作业 run_batch_job。
+- 父作业进度用原子计数汇总：UPDATE jobs SET children_done = children_done + 1 ...，不做读-改-写；
+  父作业 total 为总条数，processed 随子作业完成累加已处理条数；
+  最后一个完成的子作业负责汇总各子作业的结果摘要，并用条件 UPDATE（status='RUNNING'）把父作业置终态，
+  并发完成时只有一个赢家。
+- 子作业把自己的输入存在 jobs.payload，失败的块可单独重试（retry_child），父作业随之重新打开。
+- 子作业结果摘要写入 jobs.result 时带 result IS NULL 条件，同一子作业重复执行不会重复计数。
+
+函数：
+- fan_out(db, parent_id, user_id, job_type, account_selector, items, chunk_size, priority="normal") -> [child_id]
+  子作业都进 priority 对应的通道；通道记在子作业 payload 里，retry_child 重新入队时沿用
+- child_finished(db, child_id, parent_id, out)：子作业结束回调（Worker 内调用）
+- retry_child(db, child_id) -> bool
+- list_children(db, parent_id, status=None, limit=100)
+
+日志：
+- fanout_created / fanout_child_done / fanout_parent_finished / fanout_child_retry
+"""
+import json
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from app.core.models import Job, JobResult
+from app.core.state_machine import JobStatus
+from app.infra.logger import emit
+from app.workers.queue import enqueue_batch
+
+
+def fan_out(db: Session, parent_id: str, user_id: str, job_type: str, account_selector: dict,
+            items: List[dict], chunk_size: int, priority: str = "normal") -> List[str]:
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    children = []
+    for idx, chunk in enumerate(chunks):
+        child_id = str(uuid.uuid4())
+        db.add(Job(id=child_id, user_id=user_id, type=job_type, status=JobStatus.PENDING, parent_id=parent_id,
+                   payload={"account_selector": account_selector, "items": chunk, "chunk": idx,
+                            "priority": priority}))
+        children.append((child_id, chunk))
+    parent = db.get(Job, parent_id)
+    parent.children_total = len(chunks)
+    parent.total = len(items)
+    parent.phase = "fanout"
+    parent.status = JobStatus.RUNNING
+    parent.payload = {"account_selector": account_selector, "items": len(items), "chunk_size": chunk_size}
+    db.commit()  # 子作业与父作业计数一次提交，子作业开始回调前已可见
+
+    for child_id, chunk in children:
+        enqueue_batch(job_id=child_id, user_id=user_id, type=job_type,
+                      account_selector=account_selector, items=chunk, parent_id=parent_id, priority=priority)
+    emit("fanout_created", job_id=parent_id, children=len(children), items=len(items), chunk_size=chunk_size,
+         priority=priority)
+    return [child_id for child_id, _ in children]
+
+
+def _summary(out: dict) -> dict:
+    keys = ("ok", "total", "succeeded", "failed", "error")
+    return {k: out[k] for k in keys if k in out}
+
+
+def child_finished(db: Session, child_id: str, parent_id: str, out: dict) -> None:
+    summary = _summary(out)
+    child_failed = not out.get("ok")
+    counted = db.execute(
+        text("UPDATE jobs SET result = :r WHERE id = :id AND result IS NULL"),
+        {"r": json.dumps(summary, ensure_ascii=False), "id": child_id},
+    ).rowcount
+    if not counted:  # 同一子作业重复执行：不重复计数
+        db.rollback()
+        return
+    db.execute(
+        text("UPDATE jobs SET children_done = children_done + 1, children_failed = children_failed + :f, "
+             "processed = processed + :n WHERE id = :p"),
+        {"f": 1 if child_failed else 0, "n": summary.get("total", 0), "p": parent_id},
+    )
+    row = db.execute(
+        text("SELECT children_total, children_done, children_failed FROM jobs WHERE id = :p"), {"p": parent_id},
+    ).one()
+    db.commit()
+    emit("fanout_child_done", job_id=parent_id, child_id=child_id, ok=not child_failed,
+         done=row.children_done, total=row.children_total)
+    if row.children_done >= row.children_total:
+        _finalize_parent(db, parent_id, row.children_total, row.children_failed)
+
+
+def _finalize_parent(db: Session, parent_id: str, total: int, failed_children: int) -> None:
+    agg = {"children": total, "children_failed": failed_children, "items": 0, "succeeded": 0, "failed": 0}
+    for (raw,) in db.execute(text("SELECT result FROM jobs WHERE parent_id = :p"), {"p": parent_id}):
+        res = (json.loads(raw) if isinstance(raw, str) else raw) or {}
+        agg["items"] += res.get("total", 0)
+        agg["succeeded"] += res.get("succeeded", 0)
+        agg["failed"] += res.get("failed", 0)
+    status = JobStatus.FAILED if failed_children else JobStatus.SUCCEEDED
+    error = f"{failed_children} of {total} chunks failed" if failed_children else ""
+    won = db.execute(
+        text("UPDATE jobs SET status = :s, error = :e, result = :r WHERE id = :p AND status = 'RUNNING'"),
+        {"s": status.value, "e": error, "r": json.dumps(agg, ensure_ascii=False), "p": parent_id},
+    ).rowcount
+    db.commit()
+    if won:
+        emit("fanout_parent_finished", job_id=parent_id, status=status.value, **agg)
+
+
+def retry_child(db: Session, child_id: str) -> bool:
+    """
+    FAILED 子作业重新入队；父作业计数回退一格，已 FAILED 的父作业重新打开。非 FAILED 返回 False。
+    子作业的部分结果（job_results）与进度在同一事务里清空，重跑不会产生重复结果。
+    """
+    child = db.get(Job, child_id)
+    if child is None or not child.parent_id or not child.payload:
+        return False
+    parent_id, user_id, job_type, payload = child.parent_id, child.user_id, child.type, child.payload
+    counted_items = (child.result or {}).get("total", 0)
+    reset = db.execute(
+        text("UPDATE jobs SET status = 'PENDING', error = '', result = NULL, processed = 0, phase = NULL "
+             "WHERE id = :id AND status = 'FAILED'"),
+        {"id": child_id},
+    ).rowcount
+    if not reset:
+        db.rollback()
+        return False
+    # 失败前已追加的部分结果一并清掉，重跑会重新追加（同 reaper 的重新入队）
+    db.execute(delete(JobResult.__table__).where(JobResult.job_id == child_id))
+    db.execute(
+        text("UPDATE jobs SET children_done = children_done - 1, children_failed = children_failed - 1, "
+             "processed = processed - :n WHERE id = :p"),
+        {"n": counted_items, "p": parent_id},
+    )
+    db.execute(text("UPDATE jobs SET status = 'RUNNING', error = '' WHERE id = :p AND status = 'FAILED'"),
+               {"p": parent_id})
+    db.commit()
+
+    enqueue_batch(job_id=child_id, user_id=user_id, type=job_type,
+                  account_selector=payload["account_selector"], items=payload["items"], parent_id=parent_id,
+                  priority=payload.get("priority", "normal"))
+    emit("fanout_child_retry", job_id=parent_id, child_id=child_id, chunk=payload.get("chunk"))
+    return True
+
+
+def list_children(db: Session, parent_id: str, status: Optional[str] = None, limit: int = 100) -> list:
+    sql = "SELECT id, status, COALESCE(error, '') AS error, result FROM jobs WHERE parent_id = :p"
+    params = {"p": parent_id, "n": limit}
+    if status:
+        sql += " AND status = :s"
+        params["s"] = status
+    rows = db.execute(text(sql + " ORDER BY created_at, id LIMIT :n"), params).mappings().all()
+    return [{"job_id": r["id"], "status": r["status"], "error": r["error"],
+             "result": json.loads(r["result"]) if isinstance(r["result"], str) else r["result"]} for r in rows]
@@ -10,7 +10,9 @@ ensure_request(db, user_id, key, cmd_type, payload)
 
 重复插入命中唯一键 → 返回已有记录（若已绑定 job_id，直接把它返回）
 
-link_job_id(db, user_id, key, job_id)：将这次幂等请求与 job_id 关联"""
+link_job_id(db, user_id, key, job_id)：将这次幂等请求与 job_id 关联
+
+find_job_id(db, user_id, key)：只读回查已绑定的 job_id（没有记录或尚未绑定 → None），准入前用"""
 # app/services/idempotency.py
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
@@ -59,6 +61,13 @@ def ensure_request(db, user_id: str, key: str, cmd_type: str, payload: dict):
         emit("idem_create_error", user_id=user_id, key=key, error=str(e))
         raise
 
+def find_job_id(db: Session, user_id: str, key: str):
+    return (
+        db.query(CommandRequest.job_id)
+          .filter(CommandRequest.user_id == user_id, CommandRequest.key == key)
+          .scalar()
+    )
+
 def link_job_id(db: Session, user_id: str, key: str, job_id: str):
     row = db.query(CommandRequest).filter_by(user_id=user_id, key=key).first()
     if row:
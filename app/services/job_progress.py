@@ -0,0 +1,93 @@
+"""
+模块职能：
+- 长作业的进度上报：Worker 在循环里随手调用 ProgressReporter.update，真正的写库按 JOB_PROGRESS_SECONDS
+  节流（默认每个作业最多 1 次/秒），一条 UPDATE jobs SET processed / total / phase / last_heartbeat；
+  阶段切换与结束时强制写一次。写库走独立的短事务，不占用作业自己的 Session。
+- 追加式部分结果（job_results）：作业边跑边批量追加，一批一条 INSERT；客户端在作业运行中即可按
+  自增 id 做游标分页（WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?，走 ix_job_results_job_id_id）。
+
+函数 / 类型：
+- ProgressReporter(job_id, total=None, phase=None)：update(...) / flush()
+- append_results(job_id, rows)：追加一批结果行（每行任意可 JSON 化的 dict）
+- page_results(db, job_id, after=0, limit=100) -> {"items": [{"id","data"}], "next_after", "has_more"}
+
+日志：
+- job_progress（每次实际写库）
+"""
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.models import Job, JobResult
+from app.infra.db import engine
+from app.infra.logger import emit
+
+JOB_PROGRESS_SECONDS = float(os.getenv("JOB_PROGRESS_SECONDS", "1"))
+
+
+class ProgressReporter:
+    """节流的进度写入器；job_id 为空时什么都不做（便于直接调用的场景）。"""
+
+    def __init__(self, job_id: Optional[str], total: Optional[int] = None, phase: Optional[str] = None,
+                 min_interval: Optional[float] = None):
+        self.job_id = job_id
+        self.total = total
+        self.phase = phase
+        self.processed = 0
+        self.min_interval = JOB_PROGRESS_SECONDS if min_interval is None else min_interval
+        self._last_write: Optional[float] = None  # 尚未写过：第一次 update 直接写
+        self._dirty = False
+
+    def update(self, processed: Optional[int] = None, advance: int = 0, phase: Optional[str] = None,
+               total: Optional[int] = None, force: bool = False) -> bool:
+        """记录最新进度；到达节流间隔（或阶段变化 / force）时写库。返回本次是否写了库。"""
+        if processed is not None:
+            self.processed = processed
+        self.processed += advance
+        if total is not None:
+            self.total = total
+        if phase is not None and phase != self.phase:
+            self.phase = phase
+            force = True
+        self._dirty = True
+        if force or self._last_write is None or time.monotonic() - self._last_write >= self.min_interval:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        if not self.job_id or not self._dirty:
+            return
+        with engine.begin() as conn:
+            conn.execute(
+                update(Job.__table__).where(Job.id == self.job_id)
+                .values(processed=self.processed, total=self.total, phase=self.phase,
+                        last_heartbeat=datetime.now(timezone.utc))
+            )
+        self._last_write = time.monotonic()
+        self._dirty = False
+        emit("job_progress", job_id=self.job_id, processed=self.processed, total=self.total, phase=self.phase)
+
+
+def append_results(job_id: Optional[str], rows: List[dict]) -> None:
+    if not job_id or not rows:
+        return
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(JobResult.__table__), [{"job_id": job_id, "data": r, "created_at": now} for r in rows])
+
+
+def page_results(db: Session, job_id: str, after: int = 0, limit: int = 100) -> dict:
+    rows = db.execute(
+        select(JobResult.id, JobResult.data)
+        .where(JobResult.job_id == job_id, JobResult.id > after)
+        .order_by(JobResult.id)
+        .limit(limit)
+    ).all()
+    items = [{"id": r.id, "data": r.data} for r in rows]
+    # next_after 总是可用的游标：不满页说明暂时读到末尾，作业仍在运行时稍后用同一游标继续读新追加的行
+    return {"items": items, "next_after": items[-1]["id"] if items else after, "has_more": len(items) == limit}
@@ -0,0 +1,150 @@
+"""
+模块职能：
+- 队列积压 / 等待时间的可用信号（扩缩容依据）：按队列（及站点）报告深度、最老作业等待时长、
+  入队 / 出队速率、执行中作业数与在线 Worker 数。
+- 只读 RQ 自己的结构（队列 list、StartedJobRegistry / FailedJobRegistry 的 zset、rq:workers:<q> 集合），
+  全部用 pipeline 批量读取：一次快照两次往返（第二次只取各队列队头作业的 enqueued_at），不遍历作业。
+- 速率：RQ 不记计数，入队（app.workers.queue）与出队（Worker 开始执行作业时）各自 HINCRBY 到按分钟分桶的
+  hash（qstats:<queue>:enq|deq:<epoch_minute>，字段 _all 与站点名，TTL 1 小时）；窗口内求和 / 窗口秒数。
+- 站点积压：另有累计 hash（qstats:<queue>:enq_total|deq_total，字段为站点），backlog = 入队累计 - 出队累计，
+  是近似值（丢失 / 被 reaper 置 FAILED 的作业不会回补）。
+
+函数：
+- record(conn, queue, kind, site, n=1)：kind = "enq" | "deq"；失败只记日志，不影响入队 / 执行
+- record_current_dequeue(site)：Worker 内执行作业时调用（非 RQ 执行环境直接返回）
+- snapshot(conn, queues=None, window=None, now=None) -> [ {...每队列...} ]
+
+环境变量：
+- QUEUE_STATS_WINDOW_SECONDS：速率窗口（默认 300）
+
+日志：
+- queue_stats_error
+"""
+import os
+import math
+import time
+from datetime import timezone
+from typing import Dict, List, Optional
+
+from app.infra.logger import emit
+from app.workers import lanes
+
+QUEUE_STATS_WINDOW_SECONDS = int(os.getenv("QUEUE_STATS_WINDOW_SECONDS", "300"))
+BUCKET_TTL = 3600
+ALL = "_all"
+
+_QUEUES_KEY = "rq:queues"
+_QUEUE_KEY = "rq:queue:{}"
+_STARTED_KEY = "rq:wip:{}"
+_FAILED_KEY = "rq:failed:{}"
+_WORKERS_KEY = "rq:workers:{}"
+_JOB_KEY = "rq:job:{}"
+
+
+def _bucket(queue: str, kind: str, minute: int) -> str:
+    return f"qstats:{queue}:{kind}:{minute}"
+
+
+def _totals(queue: str, kind: str) -> str:
+    return f"qstats:{queue}:{kind}_total"
+
+
+def record(conn, queue: str, kind: str, site: str, n: int = 1) -> None:
+    try:
+        key = _bucket(queue, kind, int(time.time() // 60))
+        pipe = conn.pipeline(transaction=False)
+        pipe.hincrby(key, ALL, n)
+        pipe.hincrby(key, site, n)
+        pipe.expire(key, BUCKET_TTL)
+        pipe.hincrby(_totals(queue, kind), site, n)
+        pipe.execute()
+    except Exception as e:  # 统计是旁路，Redis 抖动不能让入队 / 作业失败
+        emit("queue_stats_error", queue=queue, kind=kind, error=str(e))
+
+
+def record_current_dequeue(site: str) -> None:
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return
+    job = get_current_job()
+    if job is not None:
+        record(job.connection, job.origin, "deq", site)
+
+
+def _decode(v):
+    return v.decode() if isinstance(v, bytes) else v
+
+
+def _sum_hashes(hashes: List[dict]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for h in hashes:
+        for k, v in (h or {}).items():
+            k = _decode(k)
+            out[k] = out.get(k, 0) + int(v)
+    return out
+
+
+def _age_seconds(raw, now: float) -> Optional[float]:
+    if not raw:
+        return None
+    from rq.utils import utcparse
+    ts = utcparse(_decode(raw)).replace(tzinfo=timezone.utc).timestamp()
+    return round(max(0.0, now - ts), 3)
+
+
+def snapshot(conn, queues: Optional[List[str]] = None, window: Optional[int] = None,
+             now: Optional[float] = None) -> List[dict]:
+    now = now or time.time()
+    window = window or QUEUE_STATS_WINDOW_SECONDS
+    if queues is None:
+        prefix = _QUEUE_KEY.format("")
+        queues = sorted(_decode(k)[len(prefix):] for k in conn.smembers(_QUEUES_KEY))
+    current = int(now // 60)
+    minutes = list(range(current - max(1, math.ceil(window / 60)) + 1, current + 1))
+    span = now - minutes[0] * 60  # 窗口实际覆盖的秒数（当前分钟只过了一部分）
+
+    pipe = conn.pipeline(transaction=False)
+    for q in queues:
+        pipe.llen(_QUEUE_KEY.format(q))
+        pipe.lindex(_QUEUE_KEY.format(q), 0)
+        pipe.zcard(_STARTED_KEY.format(q))
+        pipe.zcard(_FAILED_KEY.format(q))
+        pipe.scard(_WORKERS_KEY.format(q))
+        pipe.hgetall(_totals(q, "enq"))
+        pipe.hgetall(_totals(q, "deq"))
+        for kind in ("enq", "deq"):
+            for m in minutes:
+                pipe.hgetall(_bucket(q, kind, m))
+    res = pipe.execute()
+
+    per = 7 + 2 * len(minutes)
+    rows = []
+    pipe = conn.pipeline(transaction=False)
+    for i, q in enumerate(queues):
+        r = res[i * per:(i + 1) * per]
+        depth, head, started, failed, workers, enq_total, deq_total = r[:7]
+        enq = _sum_hashes(r[7:7 + len(minutes)])
+        deq = _sum_hashes(r[7 + len(minutes):])
+        enq_total, deq_total = _sum_hashes([enq_total]), _sum_hashes([deq_total])
+        sites = {}
+        for site in sorted((set(enq) | set(deq) | set(enq_total)) - {ALL}):
+            sites[site] = {
+                "enqueue_rate": round(enq.get(site, 0) / span, 3),
+                "dequeue_rate": round(deq.get(site, 0) / span, 3),
+                "backlog": max(0, enq_total.get(site, 0) - deq_total.get(site, 0)),
+            }
+        rows.append({
+            "queue": q, "lane": lanes.lane_of(q), "depth": depth, "oldest_age_s": None, "started": started, "failed": failed,
+            "workers": workers, "enqueue_rate": round(enq.get(ALL, 0) / span, 3),
+            "dequeue_rate": round(deq.get(ALL, 0) / span, 3), "window_s": round(span, 1), "sites": sites,
+        })
+        if head is not None:
+            pipe.hget(_JOB_KEY.format(_decode(head)), "enqueued_at")
+    ages = iter(pipe.execute())
+    for i, row in enumerate(rows):
+        if res[i * per + 1] is not None:
+            row["oldest_age_s"] = _age_seconds(next(ages), now)
+        elif row["depth"] == 0:
+            row["oldest_age_s"] = 0.0
+    return rows
@@ -0,0 +1,102 @@
+"""
+模块职能：
+- 刷新令牌的签发 / 轮换 / 吊销。客户端用它续期 access token，不必每小时重跑 /api/login（bcrypt）。
+
+要点：
+- 令牌是随机串，库里只存 HMAC-SHA256(SECRET_KEY, token)；校验是一次 HMAC + 唯一索引查找
+- 每次刷新都轮换：旧令牌立即作废，新令牌继承同一 family_id
+- 已作废的令牌再次出现（被盗重放）→ 吊销整条 family
+- 作废用条件 UPDATE（revoked_at IS NULL），并发刷新同一令牌只有一个能成功
+
+函数：
+- issue(db, user_id, family_id=None) -> str
+- rotate(db, token) -> (user_id, new_token)
+- revoke(db, token) -> bool
+
+日志：
+- refresh_issue / refresh_rotate / refresh_reuse_detected / refresh_revoke
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.models_user import RefreshToken
+from app.core.security import get_secret_key, get_refresh_token_expire_days
+from app.infra.logger import emit
+
+
+class RefreshTokenInvalid(Exception):
+    """令牌不存在、已过期、已作废或被重放。"""
+
+
+def _digest(token: str) -> str:
+    return hmac.new(get_secret_key().encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _new_row(user_id: str, family_id: str) -> Tuple[RefreshToken, str]:
+    raw = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        id=str(uuid4()), user_id=user_id, family_id=family_id, token_hash=_digest(raw),
+        expires_at=datetime.utcnow() + timedelta(days=get_refresh_token_expire_days()),
+    )
+    return row, raw
+
+
+def issue(db: Session, user_id: str, family_id: Optional[str] = None) -> str:
+    row, raw = _new_row(user_id, family_id or str(uuid4()))
+    db.add(row); db.commit()
+    emit("refresh_issue", user_id=user_id, family_id=row.family_id)
+    return raw
+
+
+def _revoke_family(db: Session, family_id: str) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def rotate(db: Session, token: str) -> Tuple[str, str]:
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _digest(token)).first()
+    if not row:
+        raise RefreshTokenInvalid("not_found")
+    user_id, family_id = row.user_id, row.family_id
+    if row.revoked_at is not None:
+        _revoke_family(db, family_id)
+        emit("refresh_reuse_detected", user_id=user_id, family_id=family_id)
+        raise RefreshTokenInvalid("reused")
+    if row.expires_at <= datetime.utcnow():
+        raise RefreshTokenInvalid("expired")
+
+    new_row, new_raw = _new_row(user_id, family_id)
+    res = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow(), replaced_by=new_row.id)
+    )
+    if res.rowcount != 1:
+        # 并发刷新：另一请求已轮换掉这枚令牌，按重放处理
+        db.rollback()
+        _revoke_family(db, family_id)
+        emit("refresh_reuse_detected", user_id=user_id, family_id=family_id)
+        raise RefreshTokenInvalid("reused")
+    db.add(new_row); db.commit()
+    emit("refresh_rotate", user_id=user_id, family_id=family_id)
+    return user_id, new_raw
+
+
+def revoke(db: Session, token: str) -> bool:
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _digest(token)).first()
+    if not row:
+        return False
+    _revoke_family(db, row.family_id)
+    emit("refresh_revoke", user_id=row.user_id, family_id=row.family_id)
+    return True
@@ -0,0 +1,253 @@
+"""
+模块职能：
+- 定时 / 周期命令（schedules 表）：取代外部 cron 脚本定点批量调用 POST /api/commands。
+- 触发规则：cron（5 段：分 时 日 月 周，UTC；支持 * / , - 与 */n，日与周都受限时任一满足即可）或
+  interval_seconds（按 epoch 对齐的固定间隔）。每个窗口（相邻两次计划时间之间）只触发一次。
+- 抖动：实际触发时间 = 窗口起点 slot + jitter(id, slot)，jitter 在 [0, min(jitter_seconds, 窗口长度)) 内，
+  由 (schedule_id, slot) 哈希得出：同一窗口重启调度器后算出同一时刻，成千上万条同周期的计划被均匀摊开，
+  不再在整点同时打到站点。
+- 创建时即用 app.services.commands.validate 校验命令（类型、account_selector、IMPORT_CUSTOMERS 参数），
+  不合法的命令不会每个窗口留下一个 PENDING 孤儿作业。
+- 触发走现有的命令路径（app.services.commands.submit），幂等键 schedule:<id>:<slot epoch>：
+  先提交命令、再推进 next_run_at，调度器切主、重复扫描、进程在两步之间崩溃后重放都只会产生一个作业，
+  也不会丢窗口。
+- 错过的窗口（调度器停机）不补跑：到期行只触发一次，随后从当前时间往后算下一个窗口。
+
+函数：
+- parse_cron(expr) -> CronSpec（非法表达式抛 ValueError）
+- next_slot(schedule, after) -> datetime：after 之后的第一个计划时间（窗口起点）
+- jitter_for(schedule_id, slot, window, jitter_seconds) -> float 秒
+- create_schedule(db, user_id, name, command, cron=None, interval_seconds=None, jitter_seconds=None, now=None)
+- list_schedules(db, user_id) / set_enabled(db, user_id, schedule_id, enabled) / delete_schedule(db, user_id, schedule_id)
+- due(db, now, limit)：按 (enabled, next_run_at) 索引取到期的计划；只取触发要用的列（普通行，不挂在 Session 上，
+  每条计划提交后不会再逐行重新 SELECT）
+- fire(db, schedule, now) -> job_id | None：先用幂等键提交命令，再用条件 UPDATE 推进 next_run_at；
+  命令被拒（CommandRejected）记 last_error 照常推进，其它异常原样抛出，本窗口下一轮重试
+
+环境变量：
+- SCHEDULE_DEFAULT_JITTER_SECONDS：jitter_seconds 为空时的抖动上限（默认 60）
+- SCHEDULE_MIN_INTERVAL_SECONDS：interval_seconds 下限（默认 60）
+
+日志：
+- schedule_created / schedule_fired / schedule_fire_error / schedule_skipped
+"""
+import os
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import FrozenSet, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.context import Context
+from app.core.models import Schedule
+from app.core.models_user import User
+from app.infra.logger import emit
+
+SCHEDULE_DEFAULT_JITTER_SECONDS = int(os.getenv("SCHEDULE_DEFAULT_JITTER_SECONDS", "60"))
+SCHEDULE_MIN_INTERVAL_SECONDS = int(os.getenv("SCHEDULE_MIN_INTERVAL_SECONDS", "60"))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 6))
+
+
+@dataclass(frozen=True)
+class CronSpec:
+    minute: FrozenSet[int]
+    hour: FrozenSet[int]
+    day: FrozenSet[int]
+    month: FrozenSet[int]
+    weekday: FrozenSet[int]      # 0 = 周日
+    day_any: bool
+    weekday_any: bool
+
+    def day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.day
+        dow = (dt.isoweekday() % 7) in self.weekday
+        if self.day_any or self.weekday_any:
+            return dom and dow
+        return dom or dow  # 与 cron 一致：日、周都受限时任一满足
+
+
+def _parse_field(part: str, lo: int, hi: int, name: str) -> FrozenSet[int]:
+    values = set()
+    for item in part.split(","):
+        rng, _, step = item.partition("/")
+        step_n = int(step) if step else 1
+        if rng == "*":
+            a, b = lo, hi
+        elif "-" in rng:
+            a, b = (int(x) for x in rng.split("-", 1))
+        else:
+            a = b = int(rng)
+            if step:
+                b = hi
+        if step_n < 1 or a > b or a < lo or b > (7 if name == "weekday" else hi):
+            raise ValueError(f"invalid cron {name} field: {part}")
+        values.update(v % 7 if name == "weekday" else v for v in range(a, b + 1, step_n))
+    return frozenset(values)
+
+
+def parse_cron(expr: str) -> CronSpec:
+    parts = (expr or "").split()
+    if len(parts) != 5:
+        raise ValueError("cron must have 5 fields: minute hour day month weekday")
+    try:
+        sets = [_parse_field(p, lo, hi, name) for p, (name, lo, hi) in zip(parts, _FIELDS)]
+    except ValueError as e:
+        raise ValueError(str(e) if "cron" in str(e) else f"invalid cron: {expr}")
+    return CronSpec(*sets, day_any=parts[2] == "*", weekday_any=parts[4] == "*")
+
+
+def _cron_next(spec: CronSpec, after: datetime) -> datetime:
+    dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = dt + timedelta(days=366 * 5)
+    while dt < limit:  # 逐级跳：月 → 日 → 时 → 分，最多几千步
+        if dt.month not in spec.month:
+            dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+        elif not spec.day_matches(dt):
+            dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+        elif dt.hour not in spec.hour:
+            dt = dt.replace(minute=0) + timedelta(hours=1)
+        elif dt.minute not in spec.minute:
+            dt += timedelta(minutes=1)
+        else:
+            return dt
+    raise ValueError("cron never fires")
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def next_slot(schedule: Schedule, after: datetime) -> datetime:
+    after = _utc(after)
+    if schedule.cron:
+        return _cron_next(parse_cron(schedule.cron), after)
+    step = schedule.interval_seconds
+    n = int((after - _EPOCH).total_seconds() // step) + 1
+    return _EPOCH + timedelta(seconds=n * step)
+
+
+def jitter_for(schedule_id: str, slot: datetime, window: float, jitter_seconds: Optional[int]) -> float:
+    cap = SCHEDULE_DEFAULT_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+    cap = max(0.0, min(float(cap), window))
+    if cap <= 0:
+        return 0.0
+    digest = hashlib.sha256(f"{schedule_id}:{int(slot.timestamp())}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 * cap
+
+
+def _plan(schedule: Schedule, after: datetime):
+    slot = next_slot(schedule, after)
+    window = (next_slot(schedule, slot) - slot).total_seconds()
+    return slot, slot + timedelta(seconds=jitter_for(schedule.id, slot, window, schedule.jitter_seconds))
+
+
+def create_schedule(db: Session, user_id: str, name: str, command: dict, cron: Optional[str] = None,
+                    interval_seconds: Optional[int] = None, jitter_seconds: Optional[int] = None,
+                    now: Optional[datetime] = None) -> Schedule:
+    from app.services import commands as cmd_svc  # 延迟导入：commands → workers.queue → ...
+
+    if bool(cron) == bool(interval_seconds):
+        raise ValueError("exactly one of cron / interval_seconds is required")
+    try:
+        cmd_svc.validate(cmd_svc.CommandIn(**dict(command, idempotency_key="schedule")))
+    except cmd_svc.CommandRejected as e:
+        raise ValueError(e.detail)
+    if cron:
+        _cron_next(parse_cron(cron), datetime.now(timezone.utc))
+    elif interval_seconds < SCHEDULE_MIN_INTERVAL_SECONDS:
+        raise ValueError(f"interval_seconds must be >= {SCHEDULE_MIN_INTERVAL_SECONDS}")
+    row = Schedule(user_id=user_id, name=name or "", command=command, cron=cron,
+                   interval_seconds=interval_seconds, jitter_seconds=jitter_seconds, enabled=True)
+    db.add(row)
+    db.flush()  # 拿到 id：抖动由 id 决定
+    row.slot_at, row.next_run_at = _plan(row, now or datetime.now(timezone.utc))
+    db.commit()
+    emit("schedule_created", schedule_id=row.id, user_id=user_id, type=command.get("type"),
+         cron=cron, interval_seconds=interval_seconds, next_run_at=row.next_run_at.isoformat())
+    return row
+
+
+def list_schedules(db: Session, user_id: str) -> List[Schedule]:
+    return db.execute(select(Schedule).where(Schedule.user_id == user_id)
+                      .order_by(Schedule.created_at)).scalars().all()
+
+
+def _owned(db: Session, user_id: str, schedule_id: str) -> Optional[Schedule]:
+    row = db.get(Schedule, schedule_id)
+    return row if row is not None and row.user_id == user_id else None
+
+
+def set_enabled(db: Session, user_id: str, schedule_id: str, enabled: bool) -> Optional[Schedule]:
+    row = _owned(db, user_id, schedule_id)
+    if row is None:
+        return None
+    if enabled and not row.enabled:
+        row.slot_at, row.next_run_at = _plan(row, datetime.now(timezone.utc))  # 停用期间的窗口不补
+    row.enabled = enabled
+    db.commit()
+    return row
+
+
+def delete_schedule(db: Session, user_id: str, schedule_id: str) -> bool:
+    row = _owned(db, user_id, schedule_id)
+    if row is None:
+        return False
+    db.delete(row)
+    db.commit()
+    return True
+
+
+_DUE_COLUMNS = (Schedule.id, Schedule.user_id, Schedule.command, Schedule.cron, Schedule.interval_seconds,
+                Schedule.jitter_seconds, Schedule.slot_at, Schedule.next_run_at)
+
+
+def due(db: Session, now: datetime, limit: int) -> list:
+    return db.execute(
+        select(*_DUE_COLUMNS)
+        .where(Schedule.enabled.is_(True), Schedule.next_run_at <= now)
+        .order_by(Schedule.next_run_at)
+        .limit(limit)
+    ).all()
+
+
+def fire(db: Session, schedule: Schedule, now: datetime) -> Optional[str]:
+    from app.services import commands as cmd_svc  # 延迟导入：commands → workers.queue → ...
+
+    now = _utc(now)
+    slot, old_next = schedule.slot_at, schedule.next_run_at
+    new_slot, new_next = _plan(schedule, now)
+    # 先提交命令：幂等键只由 (计划, 窗口) 决定，重复提交只会拿回同一个作业
+    job_id, error = None, None
+    user = db.get(User, schedule.user_id)
+    if user is None or not user.is_active:
+        error = "user inactive"
+    else:
+        ctx = Context(user_id=user.id, role=getattr(user.role, "value", user.role), username=user.username)
+        body = dict(schedule.command, idempotency_key=f"schedule:{schedule.id}:{int(_utc(slot).timestamp())}")
+        try:
+            job_id = cmd_svc.submit(db, ctx, cmd_svc.CommandIn(**body), admit=False)
+        except cmd_svc.CommandRejected as e:
+            db.rollback()
+            error = e.detail
+    # 再推进本窗口：并发的另一个调度器（切主瞬间）条件不成立，跳过（它提交的是同一个作业）
+    won = db.execute(
+        update(Schedule)
+        .where(Schedule.id == schedule.id, Schedule.next_run_at == old_next)
+        .values(slot_at=new_slot, next_run_at=new_next, last_run_at=now, last_job_id=job_id, last_error=error)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not won:
+        emit("schedule_skipped", schedule_id=schedule.id, reason="claimed")
+        return None
+    if error:
+        emit("schedule_fire_error", schedule_id=schedule.id, user_id=schedule.user_id, error=error)
+    else:
+        emit("schedule_fired", schedule_id=schedule.id, user_id=schedule.user_id, job_id=job_id,
+             slot=_utc(slot).isoformat(), lag_ms=round((now - _utc(old_next)).total_seconds() * 1000, 1),
+             next_run_at=new_next.isoformat())
+    return job_id
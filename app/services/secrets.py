@@ -1,18 +1,23 @@
 """
 模块职能：
 - 应用层加解密（账户密钥/会话数据），密文入库，明文只在内存中使用。
+- Fernet 实例按 SECRET_KEY 缓存在进程内（常驻 Worker 跨作业复用，不必每次派生密钥）。
 """
 import base64, json, os, hashlib
+from functools import lru_cache
 from cryptography.fernet import Fernet
 
 def _derive_fernet_key(raw: str) -> bytes:
     h = hashlib.sha256(raw.encode("utf-8")).digest()
     return base64.urlsafe_b64encode(h)
 
-def _fernet() -> Fernet:
-    secret = os.getenv("SECRET_KEY","dev-secret-change-me")
+@lru_cache(maxsize=4)
+def _fernet_for(secret: str) -> Fernet:
     return Fernet(_derive_fernet_key(secret))
 
+def _fernet() -> Fernet:
+    return _fernet_for(os.getenv("SECRET_KEY","dev-secret-change-me"))
+
 def encrypt_dict(d: dict) -> str:
     return _fernet().encrypt(json.dumps(d).encode()).decode()
 
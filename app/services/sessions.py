@@ -4,23 +4,36 @@
 
 日志：
 - sess_hit / sess_miss_login / sess_saved
+
+指标：
+- session_lookups_total{result} / connector_call_duration_seconds{op="login"}
+
+追踪：
+- span "ensure_session"，未命中时下挂 "connector.login"
 """
 from __future__ import annotations
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
 from sqlalchemy.orm import Session
 from app.core.models import Session as SessionModel
 from app.services.secrets import encrypt_dict, decrypt_str
 from app.infra.logger import emit
+from app.infra.metrics import SESSION_LOOKUPS_TOTAL, CONNECTOR_SECONDS
+from app.infra import tracing
 from app.connectors.base import SessionCtx
 
 def _now(): return datetime.now(timezone.utc)
 
+def _aware(dt: datetime) -> datetime:
+    # sessions.expires_at 为 naive DateTime（SQLite 读回不带时区），按 UTC 解释
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
 def get_valid_session(db: Session, account_id: str) -> Optional[Dict]:
     row = (db.query(SessionModel)
            .filter(SessionModel.account_id==account_id, SessionModel.status=="ACTIVE")
            .order_by(SessionModel.updated_at.desc()).first())
-    if row and row.expires_at and row.expires_at > _now():
+    if row and row.expires_at and _aware(row.expires_at) > _now():
         emit("sess_hit", account_id=account_id)
         return decrypt_str(row.data_encrypted)
     return None
@@ -31,12 +44,18 @@ def save_session(db: Session, account_id: str, data_dict: Dict, expires_at: Opti
     db.add(row); db.commit()
     emit("sess_saved", account_id=account_id)
 
+@tracing.traced("ensure_session")
 def ensure_session(db: Session, connector, account: Dict, secrets: Dict, ttl_seconds: int) -> SessionCtx:
     cached = get_valid_session(db, account["id"])
     if cached:
+        SESSION_LOOKUPS_TOTAL.labels("hit").inc()
         return SessionCtx(kind=cached.get("kind","httpx"), store=cached.get("store",{}))
+    SESSION_LOOKUPS_TOTAL.labels("miss").inc()
     emit("sess_miss_login", account_id=account["id"])
-    res = connector.login(account, secrets, backend="httpx")
+    t0 = time.perf_counter()
+    with tracing.start_span("connector.login", kind="client", site=account.get("site", "")):
+        res = connector.login(account, secrets, backend="httpx")
+    CONNECTOR_SECONDS.labels(account.get("site", ""), "login", str(res.ok).lower()).observe(time.perf_counter() - t0)
     if not res.ok:
         if res.need_user_action: raise RuntimeError("pending_user_action")
         raise RuntimeError(f"login_failed: {res.error}")
@@ -0,0 +1,118 @@
+"""
+模块职能：
+- 按站点的并发上限（跨 Worker 进程的计数信号量）：同一站点同时在跑的登录不超过上限，
+  无论有多少个 Worker、多少个批量作业。用来保护目标站点（以及避免被站点风控）。
+- 实现：每个站点一个 ZSET site_slots:<site>，成员是持有者 token，分数是到期时间（毫秒）。
+  一次 Lua 调用完成「清理过期持有者 → 计数 → 未满则占位」，时间取 Redis TIME；
+  持有者崩溃时占位最多 SITE_SLOT_TTL_SECONDS 后自动释放，不会把站点永久锁死。
+- 等待有上限：名额已满时最多等 SITE_SLOT_WAIT_SECONDS，仍拿不到抛 SiteBusy，由调用方记成该项的
+  「站点繁忙」结果，不把 Worker 线程无限期挂在轮询上（也不让 RQ 作业远超其超时）。
+- Redis 不可用时放行（fail-open，记 site_slot_error），与准入控制一致。
+
+函数：
+- limit_for(site) -> int：站点上限（SITE_CONCURRENCY_LIMITS 覆盖，否则 SITE_CONCURRENCY_DEFAULT；<= 0 不限）
+- site_slot(site, conn=None, limit=None)：上下文管理器，拿到名额才进入，退出时归还；等待超时抛 SiteBusy
+
+环境变量：
+- SITE_CONCURRENCY_DEFAULT：每站点默认并发上限（默认 4）
+- SITE_CONCURRENCY_LIMITS：按站点覆盖，例 "example:2,bigsite:16"
+- SITE_SLOT_TTL_SECONDS：单个名额的最长占用时间（默认 120，应大于一次登录的超时）
+- SITE_SLOT_POLL_SECONDS：名额已满时的重试间隔（默认 0.05）
+- SITE_SLOT_WAIT_SECONDS：最长等待名额的时间（默认 30；<= 0 一直等）
+
+日志：
+- site_slot_busy / site_slot_error
+"""
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.infra.logger import emit
+from app.infra.redis_client import get_redis
+
+SITE_CONCURRENCY_DEFAULT = int(os.getenv("SITE_CONCURRENCY_DEFAULT", "4"))
+SITE_CONCURRENCY_LIMITS = os.getenv("SITE_CONCURRENCY_LIMITS", "")
+SITE_SLOT_TTL_SECONDS = float(os.getenv("SITE_SLOT_TTL_SECONDS", "120"))
+SITE_SLOT_POLL_SECONDS = float(os.getenv("SITE_SLOT_POLL_SECONDS", "0.05"))
+SITE_SLOT_WAIT_SECONDS = float(os.getenv("SITE_SLOT_WAIT_SECONDS", "30"))
+
+# KEYS[1]：站点 ZSET；ARGV：token, 上限, TTL 毫秒。返回 1 = 拿到名额
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local ttl = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+  redis.call('ZADD', KEYS[1], now + ttl, ARGV[1])
+  redis.call('PEXPIRE', KEYS[1], ttl)
+  return 1
+end
+return 0
+"""
+
+_script = None
+_script_conn = None
+
+
+class SiteBusy(Exception):
+    """站点名额在 SITE_SLOT_WAIT_SECONDS 内一直是满的。"""
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for part in value.split(","):
+        site, _, n = part.strip().partition(":")
+        if site and n.strip().lstrip("-").isdigit():
+            limits[site] = int(n)
+    return limits
+
+
+_limits = _parse_limits(SITE_CONCURRENCY_LIMITS)
+
+
+def limit_for(site: str) -> int:
+    return _limits.get(site, SITE_CONCURRENCY_DEFAULT)
+
+
+def _key(site: str) -> str:
+    return f"site_slots:{site}"
+
+
+def _acquire_script(conn):
+    global _script, _script_conn
+    if _script is None or _script_conn is not conn:
+        _script, _script_conn = conn.register_script(_ACQUIRE_LUA), conn
+    return _script
+
+
+@contextmanager
+def site_slot(site: str, conn=None, limit: Optional[int] = None) -> Iterator[None]:
+    limit = limit_for(site) if limit is None else limit
+    if limit <= 0:
+        yield
+        return
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + SITE_SLOT_WAIT_SECONDS
+    try:
+        conn = conn or get_redis()
+        script = _acquire_script(conn)
+        while not int(script(keys=[_key(site)], args=[token, limit, int(SITE_SLOT_TTL_SECONDS * 1000)])):
+            if SITE_SLOT_WAIT_SECONDS > 0 and time.monotonic() >= deadline:
+                raise SiteBusy(site)
+            time.sleep(SITE_SLOT_POLL_SECONDS)
+    except SiteBusy:
+        emit("site_slot_busy", site=site, limit=limit, waited=SITE_SLOT_WAIT_SECONDS)
+        raise
+    except Exception as e:  # Redis 不可用：放行
+        emit("site_slot_error", site=site, error=str(e))
+        conn = None
+    try:
+        yield
+    finally:
+        if conn is not None:
+            try:
+                conn.zrem(_key(site), token)
+            except Exception as e:
+                emit("site_slot_error", site=site, error=str(e))
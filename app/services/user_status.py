@@ -0,0 +1,130 @@
+"""
+模块职能：
+- 用户启用状态的进程内缓存（user_id -> is_active），给统一鉴权依赖 get_context 用：
+  活跃性检查只是一次 dict 查找，不再每请求查一次 users 表。
+
+吊销模型（AUTH_REVOCATION）：
+- none：完全信任 JWT 负载（旧 get_context 行为），不检查用户状态
+- interval（默认）：每 AUTH_USER_STATUS_REFRESH_SECONDS 秒整表刷新一次；停用最多延迟一个刷新周期生效
+- pubsub：在 interval 基础上订阅 Redis 频道 AUTH_USER_STATUS_CHANNEL，停用后各进程立即失效；
+  定时刷新作为断线兜底
+- 整表刷新读从库（配置了 READ_DATABASE_URL 时）；快照之后新建用户的单行补查读主库，
+  避免从库尚未同步到新用户时把它当成已停用
+
+函数：
+- is_active(user_id)：鉴权热路径
+- set_user_active(db, user_id, is_active)：落库 + 本地更新 + （pubsub 模式）广播
+- start() / stop()：pubsub 模式下启动/停止监听线程（lifespan 调用）
+
+日志：
+- user_status_refresh / user_status_changed / user_status_remote_update
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.models_user import User
+from app.infra import pubsub
+from app.infra.db import SessionLocal, ReadSessionLocal
+from app.infra.logger import emit
+
+MODE = os.getenv("AUTH_REVOCATION", "interval").lower()
+REFRESH_SECONDS = float(os.getenv("AUTH_USER_STATUS_REFRESH_SECONDS", "30"))
+CHANNEL = os.getenv("AUTH_USER_STATUS_CHANNEL", "auth:user_status")
+
+
+class UserStatusTable:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._active: Dict[str, bool] = {}
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def is_active(self, user_id: str) -> bool:
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self.refresh()
+        st = self._active.get(user_id)
+        if st is None:
+            # 快照之后新建的用户：单行补查一次并记住
+            st = self._load_one(user_id)
+        return st
+
+    def refresh(self) -> None:
+        # 只让一个线程刷新；其余线程继续读旧快照
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with ReadSessionLocal() as db:
+                rows = db.execute(select(User.id, User.is_active)).all()
+            self._active = {uid: bool(active) for uid, active in rows}
+            self._loaded_at = time.monotonic()
+            emit("user_status_refresh", count=len(rows))
+        finally:
+            self._refresh_lock.release()
+
+    def _load_one(self, user_id: str) -> bool:
+        with SessionLocal() as db:
+            active = db.execute(select(User.is_active).where(User.id == user_id)).scalar()
+        st = bool(active)
+        self._active[user_id] = st
+        return st
+
+    def set(self, user_id: str, is_active: bool) -> None:
+        self._active[user_id] = is_active
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        if user_id is None:
+            self._loaded_at = 0.0
+        else:
+            self._active.pop(user_id, None)
+
+
+table = UserStatusTable(REFRESH_SECONDS)
+
+
+def is_active(user_id: str) -> bool:
+    if MODE == "none":
+        return True
+    return table.is_active(user_id)
+
+
+def set_user_active(db: Session, user_id: str, is_active: bool) -> bool:
+    """更新 users.is_active；返回 False 表示用户不存在。"""
+    user = db.get(User, user_id)
+    if not user:
+        return False
+    user.is_active = is_active
+    db.add(user); db.commit()
+    table.set(user_id, is_active)
+    emit("user_status_changed", user_id=user_id, is_active=is_active)
+    if MODE == "pubsub":
+        pubsub.publish(CHANNEL, {"user_id": user_id, "is_active": is_active})
+    return True
+
+
+def _on_remote_update(msg: dict) -> None:
+    uid = msg.get("user_id")
+    if uid:
+        table.set(uid, bool(msg.get("is_active")))
+        emit("user_status_remote_update", user_id=uid, is_active=bool(msg.get("is_active")))
+
+
+_subscribed = False
+
+
+def start() -> None:
+    global _subscribed
+    if MODE == "pubsub":
+        if not _subscribed:
+            pubsub.subscribe(CHANNEL, _on_remote_update)
+            _subscribed = True
+        pubsub.start()
+
+
+def stop() -> None:
+    if MODE == "pubsub":
+        pubsub.stop()
@@ -0,0 +1,206 @@
+# app/workers/autoscaler.py
+"""
+模块职能：
+- 队列信号的命令行出口（与 GET /api/admin/queues 同源，见 app.services.queue_stats）。
+- 可选的本机自动扩缩容：按队头作业的等待时长（oldest_age_s）启停本机的 worker_entry 进程，
+  让等待时长保持在目标值以下。只管自己启动的进程，不碰别的机器 / 别的方式启动的 Worker。
+
+用法：
+  python -m app.workers.autoscaler stats                      # 打印一次 JSON
+  python -m app.workers.autoscaler stats --watch 5            # 每 5 秒打印一次
+  python -m app.workers.autoscaler run --min 1 --max 8 --target-age 30   # 默认按全部优先级通道
+  python -m app.workers.autoscaler run --max 4 -- --pool 4 --sites example   # -- 之后原样传给 worker_entry
+
+决策（decide，每 AUTOSCALE_INTERVAL_SECONDS 一轮）：
+- 信号取所服务队列的合计：depth 求和，oldest_age_s 取最大（Worker 同时服务这些通道）
+- oldest_age_s > target：按超出比例加进程（至少 1 个），不超过 max；距上次扩容不足 AUTOSCALE_UP_COOLDOWN_SECONDS 不动
+  （新进程启动、预热需要时间，等待时长不会马上降）
+- 队列空或 oldest_age_s < target * AUTOSCALE_IDLE_RATIO：每轮最多减 1 个，不低于 min；
+  距上次变更不足 AUTOSCALE_DOWN_COOLDOWN_SECONDS 不动（避免抖动）
+- 队列有积压但当前 0 个进程：至少起 1 个
+- 缩容发 SIGTERM（RQ warm shutdown，做完手上的作业再退出）；autoscaler 自身退出时停掉全部子进程
+
+环境变量：
+- AUTOSCALE_TARGET_AGE_SECONDS / AUTOSCALE_MIN_WORKERS / AUTOSCALE_MAX_WORKERS / AUTOSCALE_INTERVAL_SECONDS
+- AUTOSCALE_UP_COOLDOWN_SECONDS / AUTOSCALE_DOWN_COOLDOWN_SECONDS / AUTOSCALE_IDLE_RATIO
+
+日志：
+- autoscale_start / autoscale_decision / autoscale_worker_start / autoscale_worker_stop / autoscale_worker_exit /
+  autoscale_error / autoscale_stop
+"""
+import os
+import sys
+import json
+import math
+import time
+import signal
+import argparse
+import subprocess
+from typing import List, Optional
+
+from app.infra.logger import configure_logging, emit
+from app.services import queue_stats
+from app.workers import lanes
+
+AUTOSCALE_TARGET_AGE_SECONDS = float(os.getenv("AUTOSCALE_TARGET_AGE_SECONDS", "30"))
+AUTOSCALE_MIN_WORKERS = int(os.getenv("AUTOSCALE_MIN_WORKERS", "1"))
+AUTOSCALE_MAX_WORKERS = int(os.getenv("AUTOSCALE_MAX_WORKERS", "8"))
+AUTOSCALE_INTERVAL_SECONDS = float(os.getenv("AUTOSCALE_INTERVAL_SECONDS", "5"))
+AUTOSCALE_UP_COOLDOWN_SECONDS = float(os.getenv("AUTOSCALE_UP_COOLDOWN_SECONDS", "15"))
+AUTOSCALE_DOWN_COOLDOWN_SECONDS = float(os.getenv("AUTOSCALE_DOWN_COOLDOWN_SECONDS", "60"))
+AUTOSCALE_IDLE_RATIO = float(os.getenv("AUTOSCALE_IDLE_RATIO", "0.25"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def decide(current: int, stats: dict, target_age: float, min_workers: int, max_workers: int) -> int:
+    """返回期望的进程数（不含冷却判断）。"""
+    depth = stats.get("depth") or 0
+    age = stats.get("oldest_age_s") or 0.0
+    if depth and current == 0:
+        return max(1, min_workers)
+    if age > target_age:
+        step = max(1, math.ceil(current * (age / target_age - 1)))
+        return max(min_workers, min(max_workers, current + step))
+    if depth == 0 or age < target_age * AUTOSCALE_IDLE_RATIO:
+        return max(min_workers, min(max_workers, current - 1))
+    return max(min_workers, min(max_workers, current))
+
+
+class LocalScaler:
+    def __init__(self, queue: str, redis_url: str, worker_args: List[str], target_age: float,
+                 min_workers: int, max_workers: int):
+        self.queue = queue
+        self.redis_url = redis_url
+        self.worker_args = worker_args
+        self.target_age = target_age
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.procs: List[subprocess.Popen] = []
+        self.stopping: List[subprocess.Popen] = []
+        self.last_up = self.last_change = 0.0
+
+    def _start_one(self) -> None:
+        cmd = [sys.executable, "-m", "app.workers.worker_entry", "--queue", self.queue,
+               "--redis", self.redis_url, *self.worker_args]
+        p = subprocess.Popen(cmd, cwd=ROOT)
+        self.procs.append(p)
+        emit("autoscale_worker_start", pid=p.pid, queue=self.queue, workers=len(self.procs))
+
+    def _stop_one(self) -> None:
+        p = self.procs.pop()  # 最新启动的先停：老进程的连接器 / 连接池都已热
+        p.send_signal(signal.SIGTERM)
+        self.stopping.append(p)
+        emit("autoscale_worker_stop", pid=p.pid, queue=self.queue, workers=len(self.procs))
+
+    def _reap(self) -> None:
+        for group in (self.procs, self.stopping):
+            for p in [p for p in group if p.poll() is not None]:
+                group.remove(p)
+                if group is self.procs:  # 不是我们停的：进程自己退出 / 崩溃，下一轮按信号补
+                    emit("autoscale_worker_exit", pid=p.pid, code=p.returncode, queue=self.queue)
+
+    def tick(self, stats: dict, now: Optional[float] = None) -> int:
+        now = now or time.monotonic()
+        self._reap()
+        current = len(self.procs)
+        desired = decide(current, stats, self.target_age, self.min_workers, self.max_workers)
+        if desired > current and (current == 0 or now - self.last_up >= AUTOSCALE_UP_COOLDOWN_SECONDS):
+            for _ in range(desired - current):
+                self._start_one()
+            self.last_up = self.last_change = now
+        elif desired < current and now - self.last_change >= AUTOSCALE_DOWN_COOLDOWN_SECONDS:
+            self._stop_one()
+            self.last_change = now
+        else:
+            desired = current
+        if desired != current:
+            emit("autoscale_decision", queue=self.queue, workers=current, desired=desired,
+                 depth=stats.get("depth"), oldest_age_s=stats.get("oldest_age_s"), target_age=self.target_age)
+        return len(self.procs)
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        while self.procs:
+            self._stop_one()
+        deadline = time.monotonic() + timeout
+        for p in self.stopping:
+            try:
+                p.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                p.kill()
+        self.stopping.clear()
+
+
+def _queue_row(conn, queue: str) -> dict:
+    rows = queue_stats.snapshot(conn, queues=[q for q in queue.split(",") if q])
+    return {"queue": queue, "depth": sum(r["depth"] for r in rows),
+            "oldest_age_s": max((r["oldest_age_s"] or 0.0 for r in rows), default=0.0)}
+
+
+def _cmd_stats(args, conn) -> None:
+    queues = [q for q in args.queue.split(",") if q] or None
+    while True:
+        rows = queue_stats.snapshot(conn, queues=queues, window=args.window)
+        print(json.dumps({"ts": round(time.time(), 3), "queues": rows}, ensure_ascii=False), flush=True)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+def _cmd_run(args, conn) -> None:
+    scaler = LocalScaler(args.queue, args.redis, args.worker_args, args.target_age, args.min, args.max)
+    emit("autoscale_start", queue=args.queue, target_age=args.target_age, min=args.min, max=args.max,
+         worker_args=args.worker_args)
+
+    def on_signal(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_signal)
+    try:
+        while True:
+            try:
+                scaler.tick(_queue_row(conn, args.queue))
+            except Exception as e:  # Redis 抖动：保持现有进程，下一轮再试
+                emit("autoscale_error", error=str(e))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        emit("autoscale_stop", queue=args.queue, workers=len(scaler.procs))
+    finally:
+        scaler.shutdown()
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    worker_args: List[str] = []
+    if "--" in argv:
+        i = argv.index("--")
+        argv, worker_args = argv[:i], argv[i + 1:]
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_stats = sub.add_parser("stats", help="打印队列信号（JSON）")
+    p_stats.add_argument("--queue", default="", help="只看这些队列（逗号分隔）；默认全部")
+    p_stats.add_argument("--window", type=int, default=queue_stats.QUEUE_STATS_WINDOW_SECONDS)
+    p_stats.add_argument("--watch", type=float, default=0, help="每 N 秒重复打印")
+    p_run = sub.add_parser("run", help="本机自动扩缩容 worker_entry 进程")
+    p_run.add_argument("--queue", default=",".join(lanes.worker_queue_names()),
+                       help="逗号分隔，原样传给 worker_entry --queue")
+    p_run.add_argument("--target-age", type=float, default=AUTOSCALE_TARGET_AGE_SECONDS)
+    p_run.add_argument("--min", type=int, default=AUTOSCALE_MIN_WORKERS)
+    p_run.add_argument("--max", type=int, default=AUTOSCALE_MAX_WORKERS)
+    p_run.add_argument("--interval", type=float, default=AUTOSCALE_INTERVAL_SECONDS)
+    args = parser.parse_args(argv)
+    args.worker_args = worker_args
+
+    from redis import from_url as redis_from_url
+    configure_logging()
+    conn = redis_from_url(args.redis)
+    if args.cmd == "stats":
+        _cmd_stats(args, conn)
+    else:
+        _cmd_run(args, conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,321 @@
 """
 模块职能：
 - Worker 侧统一调度：解析命令→解析账号→会话→调用 Connector→返回结果。
+- 推进 jobs 表状态：开始置 RUNNING，结束置 SUCCEEDED / FAILED（error 落库），GET /api/jobs 可见。
+- 批量命令（CommandIn.items）：一个作业内只解析一次账号、只确认一次会话，按 BATCH_CHUNK_SIZE 切块，
+  以 BATCH_CONCURRENCY 个线程并发调用 connector.perform_many，按块顺序把逐项结果交给 on_chunk，
+  每块一条 job_batch_chunk，而不是每项一条日志。RQ 作业的返回值只有摘要（total / succeeded / failed），
+  逐项结果已在 job_results 里，不再序列化进 Redis；进程内调用方要汇总结果时传 collect=True。
+- 批量作业边跑边把逐项结果追加到 job_results，并节流写回进度（processed / total / phase），
+  客户端在作业结束前即可分页读取部分结果（见 app.services.job_progress）。
+- 执行期间持有作业锁并定期写心跳（见 app.workers.heartbeat）；Worker 死亡后由 app.workers.reaper 回收。
 
 函数：
-- run_job(job_id, user_id, site, action, account_selector, payload)
+- run_job(job_id, user_id, site, action, account_selector, payload, enqueued_at=None)
+- run_batch_job(job_id, user_id, site, action, account_selector, items, enqueued_at=None, parent_id=None)
+  parent_id 非空时是扇出的子作业，结束后回调 fanout.child_finished 汇总到父作业
+- run_test_login_job(job_id, user_id, account_ids, enqueued_at=None)：批量测试登录。按 BATCH_CHUNK_SIZE
+  分块取账户，TEST_LOGIN_CONCURRENCY 个线程并发登录，每次登录先拿站点名额（app.services.site_slots，
+  跨 Worker 的按站点并发上限；SITE_SLOT_WAIT_SECONDS 内等不到名额的账户记为 site_busy）；成功的会话经 sessions.save_session 落库（后续作业直接复用），
+  逐账户结果追加到 job_results，摘要写 jobs.result
 
 日志：
-- job_dispatch / job_start / job_step / job_finished / job_failed
+- job_dispatch / job_start / job_step / job_finished / job_failed / job_batch_chunk
+
+指标：
+- job_queue_wait_seconds（enqueued_at 由 queue.enqueue 写入）/ job_lane_wait_seconds（按优先级通道）/
+  job_run_duration_seconds
+- 出队计数（app.services.queue_stats，按站点）：扩缩容信号里的出队速率
+- connector_call_duration_seconds{op="perform"|"perform_many"}
+
+追踪：
+- 从 RQ job.meta 接续 API 侧的 trace（span "run_job"，带 queue_wait_ms），下挂 ensure_session /
+  connector.* / SQL span；本作业内的 emit 事件自动带 trace_id / request_id
+
+分析：
+- Worker 以 --profile 启动时（JOB_PROFILE_DIR），对每个作业采样；超过阈值的慢作业写出
+  speedscope 文件，并发出 job_profile_saved（job_id + profile 路径）
 """
-import os, traceback
+import os, time, traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.infra.db import SessionLocal
+from app.core.models import Job
+from app.core.state_machine import JobStatus
 from app.infra.logger import emit
-from app.services import accounts as acct_svc, secrets as sec_svc, sessions as sess_svc
+from app.infra.metrics import JOB_QUEUE_WAIT_SECONDS, JOB_RUN_SECONDS, CONNECTOR_SECONDS
+from app.infra import tracing, profiler
+from app.services import accounts as acct_svc, secrets as sec_svc, sessions as sess_svc, fanout, job_progress, queue_stats
+from app.services import site_slots
+from app.services.job_progress import ProgressReporter
 from app.connectors.registry import get_connector
+from app.workers import heartbeat, lanes
 
 SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS","86400"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+TEST_LOGIN_CONCURRENCY = int(os.getenv("TEST_LOGIN_CONCURRENCY", "8"))
+
+def _trace_carrier() -> dict:
+    # RQ Worker 内：enqueue 时写入的 traceparent / request_id；直接调用（测试）时为空
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return {}
+    job = get_current_job()
+    return dict(job.meta or {}) if job is not None else {}
+
+
+@contextmanager
+def _job_scope(job_id: str, site: str, action: str, enqueued_at: Optional[float], **attrs):
+    """run_job / run_batch_job 共用：接续 trace、记录排队等待、按需采样 profile。"""
+    carrier = _trace_carrier()
+    queue_stats.record_current_dequeue(site)
+    rid_token = tracing.set_request_id(carrier.get("request_id"))
+    try:
+        with tracing.start_span("run_job", parent=tracing.extract(carrier), kind="consumer",
+                                job_id=job_id, site=site, action=action, **attrs) as span:
+            if enqueued_at:
+                wait = max(0.0, time.time() - enqueued_at)
+                JOB_QUEUE_WAIT_SECONDS.labels(site, action).observe(wait)
+                lanes.observe_current_wait(enqueued_at)
+                span.set(queue_wait_ms=round(wait * 1000, 2))
+            prof = profiler.start_job_profile()
+            try:
+                yield span
+            finally:
+                path = profiler.finish_job_profile(prof, job_id)
+                if path:
+                    span.set(profile=path)
+                    emit("job_profile_saved", job_id=job_id, site=site, action=action,
+                         duration_ms=round(prof.duration * 1000, 2), profile=path)
+    finally:
+        tracing.reset_request_id(rid_token)
+
+
+def run_job(job_id: str, user_id: str, site: str, action: str, account_selector: dict, payload: dict,
+            enqueued_at: Optional[float] = None) -> dict:
+    try:
+        with _job_scope(job_id, site, action, enqueued_at), heartbeat.job_guard(job_id):
+            return _run_job(job_id, user_id, site, action, account_selector, payload)
+    except heartbeat.JobLocked:
+        return {"ok": False, "error": "job is already running"}
+
+
+def run_batch_job(job_id: str, user_id: str, site: str, action: str, account_selector: dict, items: List[dict],
+                  enqueued_at: Optional[float] = None, parent_id: Optional[str] = None) -> dict:
+    try:
+        with _job_scope(job_id, site, action, enqueued_at, items=len(items)), heartbeat.job_guard(job_id):
+            out = _run_batch_job(job_id, user_id, site, action, account_selector, items)
+            if parent_id:
+                with SessionLocal() as db:
+                    fanout.child_finished(db, job_id, parent_id, out)
+            return out
+    except heartbeat.JobLocked:
+        return {"ok": False, "error": "job is already running"}
 
-def run_job(job_id: str, user_id: str, site: str, action: str, account_selector: dict, payload: dict) -> dict:
+
+def _open_session(db: Session, job_id: str, user_id: str, site: str, account_selector: dict):
+    """解析账号 → 解密凭据 → 实例化连接器 → 复用或登录会话；返回 (connector, session_ctx)。"""
+    acc = acct_svc.resolve(db, user_id, account_selector)
+    acc_dict = {"id":acc.id, "user_id":acc.user_id, "site":acc.site, "account_name":acc.account_name}
+    secrets = sec_svc.decrypt_str(acc.secret_encrypted)
+
+    Connector = get_connector(site); connector = Connector()
+    emit("job_start", job_id=job_id)
+    session_ctx = sess_svc.ensure_session(db, connector, acc_dict, secrets, ttl_seconds=SESSION_TTL)
+    return connector, session_ctx
+
+
+def _run_job(job_id: str, user_id: str, site: str, action: str, account_selector: dict, payload: dict) -> dict:
     emit("job_dispatch", job_id=job_id, user_id=user_id, site=site, action=action)
+    started = time.time()
+    status = "FAILED"
     db: Session = SessionLocal()
     try:
-        acc = acct_svc.resolve(db, user_id, account_selector)
-        acc_dict = {"id":acc.id, "user_id":acc.user_id, "site":acc.site, "account_name":acc.account_name}
-        secrets = sec_svc.decrypt_str(acc.secret_encrypted)
-
-        Connector = get_connector(site); connector = Connector()
-        emit("job_start", job_id=job_id)
-        session_ctx = sess_svc.ensure_session(db, connector, acc_dict, secrets, ttl_seconds=SESSION_TTL)
+        Job.start(db, job_id, worker_id=heartbeat.worker_id())
+        connector, session_ctx = _open_session(db, job_id, user_id, site, account_selector)
 
         emit("job_step", job_id=job_id, step="perform", action=action)
-        res = connector.perform(action, payload, session_ctx)
+        t0 = time.perf_counter()
+        with tracing.start_span("connector.perform", kind="client", site=site, action=action):
+            res = connector.perform(action, payload, session_ctx)
+        CONNECTOR_SECONDS.labels(site, "perform", str(res.ok).lower()).observe(time.perf_counter() - t0)
         if not res.ok:
+            Job.finish(db, job_id, JobStatus.FAILED, res.error or "")
             emit("job_finished", job_id=job_id, status="FAILED", error=res.error)
             return {"ok": False, "error": res.error}
 
+        status = "SUCCEEDED"
+        Job.finish(db, job_id, JobStatus.SUCCEEDED)
         emit("job_finished", job_id=job_id, status="SUCCEEDED")
         return {"ok": True, "data": res.data}
     except Exception as e:
         emit("job_failed", job_id=job_id, error=str(e), trace=traceback.format_exc())
+        db.rollback()
+        Job.finish(db, job_id, JobStatus.FAILED, str(e))
+        return {"ok": False, "error": str(e)}
+    finally:
+        JOB_RUN_SECONDS.labels(site, action, status).observe(time.time() - started)
+        db.close()
+
+
+def _summary(out: dict, collected: Optional[List[dict]]) -> dict:
+    if collected is not None:
+        out["results"] = collected
+    return out
+
+
+def _run_batch_job(job_id: str, user_id: str, site: str, action: str, account_selector: dict, items: List[dict],
+                   on_chunk: Optional[Callable[[int, list], None]] = None, collect: bool = False) -> dict:
+    """
+    on_chunk(offset, rows)：按块顺序回调，rows 与 items[offset:offset+len(rows)] 一一对应，
+    每行 {"index","ok","data","error"}。collect=True 时另把逐项结果汇总进返回值 results。
+    """
+    emit("job_dispatch", job_id=job_id, user_id=user_id, site=site, action=action, items=len(items))
+    started = time.time()
+    status = "FAILED"
+    collected: Optional[List[dict]] = [] if collect else None
+    db: Session = SessionLocal()
+    try:
+        Job.start(db, job_id, worker_id=heartbeat.worker_id())
+        connector, session_ctx = _open_session(db, job_id, user_id, site, account_selector)
+        chunks = [(i, items[i:i + BATCH_CHUNK_SIZE]) for i in range(0, len(items), BATCH_CHUNK_SIZE)]
+        emit("job_step", job_id=job_id, step="perform_many", action=action,
+             items=len(items), chunks=len(chunks), concurrency=BATCH_CONCURRENCY)
+        scope = tracing.current_span()
+        progress = ProgressReporter(job_id, total=len(items))
+        progress.update(phase="perform_many")
+
+        def _perform_chunk(offset: int, chunk: list):
+            with tracing.use_span(scope):  # 线程池里挂回作业 span
+                t0 = time.perf_counter()
+                with tracing.start_span("connector.perform_many", kind="client", site=site, action=action,
+                                        offset=offset, size=len(chunk)):
+                    results = connector.perform_many(action, chunk, session_ctx)
+                CONNECTOR_SECONDS.labels(site, "perform_many", str(all(r.ok for r in results)).lower()) \
+                    .observe(time.perf_counter() - t0)
+                return offset, results
+
+        ok_count = 0
+        with ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch") as pool:
+            for offset, results in pool.map(lambda c: _perform_chunk(*c), chunks):
+                rows = [{"index": offset + k, "ok": r.ok, "data": r.data, "error": r.error}
+                        for k, r in enumerate(results)]
+                chunk_ok = sum(1 for r in results if r.ok)
+                ok_count += chunk_ok
+                if on_chunk is not None:
+                    on_chunk(offset, rows)
+                if collected is not None:
+                    collected.extend(rows)
+                job_progress.append_results(job_id, rows)
+                progress.update(advance=len(rows))
+                emit("job_batch_chunk", job_id=job_id, offset=offset, size=len(rows),
+                     ok=chunk_ok, failed=len(rows) - chunk_ok)
+
+        progress.update(phase="done")
+        failed = len(items) - ok_count
+        if items and ok_count == 0:
+            error = f"all {failed} items failed"
+            Job.finish(db, job_id, JobStatus.FAILED, error)
+            emit("job_finished", job_id=job_id, status="FAILED", error=error, items=len(items))
+            return _summary({"ok": False, "error": error, "total": len(items), "succeeded": 0, "failed": failed},
+                            collected)
+
+        status = "SUCCEEDED"
+        Job.finish(db, job_id, JobStatus.SUCCEEDED, f"{failed} of {len(items)} items failed" if failed else "")
+        emit("job_finished", job_id=job_id, status="SUCCEEDED", items=len(items), failed=failed)
+        return _summary({"ok": True, "total": len(items), "succeeded": ok_count, "failed": failed}, collected)
+    except Exception as e:
+        emit("job_failed", job_id=job_id, error=str(e), trace=traceback.format_exc())
+        db.rollback()
+        Job.finish(db, job_id, JobStatus.FAILED, str(e))
+        return {"ok": False, "error": str(e)}
+    finally:
+        JOB_RUN_SECONDS.labels(site, action, status).observe(time.time() - started)
+        db.close()
+
+
+def run_test_login_job(job_id: str, user_id: str, account_ids: List[str], enqueued_at: Optional[float] = None) -> dict:
+    try:
+        with _job_scope(job_id, "accounts", "test_login", enqueued_at, items=len(account_ids)), \
+                heartbeat.job_guard(job_id):
+            return _run_test_login_job(job_id, user_id, account_ids)
+    except heartbeat.JobLocked:
+        return {"ok": False, "error": "job is already running"}
+
+
+def _test_login_one(acc) -> dict:
+    row = {"account_id": acc.id, "site": acc.site, "account_name": acc.account_name}
+    account = {"id": acc.id, "user_id": acc.user_id, "site": acc.site, "account_name": acc.account_name}
+    try:
+        secrets = sec_svc.decrypt_str(acc.secret_encrypted)
+        connector = get_connector(acc.site)()
+        with site_slots.site_slot(acc.site):
+            t0 = time.perf_counter()
+            with tracing.start_span("connector.login", kind="client", site=acc.site):
+                res = connector.login(account, secrets, backend="httpx")
+            CONNECTOR_SECONDS.labels(acc.site, "login", str(res.ok).lower()).observe(time.perf_counter() - t0)
+        if not res.ok:
+            return {**row, "ok": False, "error": res.error, "need_user_action": res.need_user_action}
+        expires = datetime.now(timezone.utc) + timedelta(seconds=SESSION_TTL) if SESSION_TTL > 0 else None
+        with SessionLocal() as db:
+            sess_svc.save_session(db, acc.id, {"kind": res.session.kind, "store": res.session.store}, expires)
+        return {**row, "ok": True, "error": None}
+    except site_slots.SiteBusy:
+        return {**row, "ok": False, "error": "site_busy"}  # 站点名额等不到：记结果，不无限期占着 Worker
+    except Exception as e:
+        return {**row, "ok": False, "error": str(e)}
+
+
+def _run_test_login_job(job_id: str, user_id: str, account_ids: List[str]) -> dict:
+    emit("job_dispatch", job_id=job_id, user_id=user_id, site="accounts", action="test_login", items=len(account_ids))
+    started = time.time()
+    status = "FAILED"
+    db: Session = SessionLocal()
+    try:
+        Job.start(db, job_id, worker_id=heartbeat.worker_id())
+        scope = tracing.current_span()
+        progress = ProgressReporter(job_id, total=len(account_ids))
+        progress.update(phase="login")
+
+        def _one(acc):
+            with tracing.use_span(scope):  # 线程池里挂回作业 span
+                return _test_login_one(acc)
+
+        ok_count = 0
+        with ThreadPoolExecutor(max_workers=max(1, TEST_LOGIN_CONCURRENCY), thread_name_prefix="test-login") as pool:
+            for offset in range(0, len(account_ids), BATCH_CHUNK_SIZE):
+                ids = account_ids[offset:offset + BATCH_CHUNK_SIZE]
+                accounts = {a.id: a for a in acct_svc.load_many(db, user_id, ids)}
+                db.rollback()  # 结束只读事务，登录期间不占连接
+                rows = list(pool.map(_one, [accounts[i] for i in ids if i in accounts]))
+                rows += [{"account_id": i, "ok": False, "error": "account_not_found"} for i in ids if i not in accounts]
+                chunk_ok = sum(1 for r in rows if r["ok"])
+                ok_count += chunk_ok
+                job_progress.append_results(job_id, rows)
+                progress.update(advance=len(rows))
+                emit("job_batch_chunk", job_id=job_id, offset=offset, size=len(rows),
+                     ok=chunk_ok, failed=len(rows) - chunk_ok)
+
+        progress.update(phase="done")
+        failed = len(account_ids) - ok_count
+        summary = {"total": len(account_ids), "succeeded": ok_count, "failed": failed}
+        db.execute(update(Job.__table__).where(Job.id == job_id).values(result=summary))
+        db.commit()
+        status = "SUCCEEDED"
+        Job.finish(db, job_id, JobStatus.SUCCEEDED, f"{failed} of {len(account_ids)} logins failed" if failed else "")
+        emit("job_finished", job_id=job_id, status="SUCCEEDED", items=len(account_ids), failed=failed)
+        return {"ok": True, **summary}
+    except Exception as e:
+        emit("job_failed", job_id=job_id, error=str(e), trace=traceback.format_exc())
+        db.rollback()
+        Job.finish(db, job_id, JobStatus.FAILED, str(e))
         return {"ok": False, "error": str(e)}
     finally:
+        JOB_RUN_SECONDS.labels("accounts", "test_login", status).observe(time.time() - started)
         db.close()
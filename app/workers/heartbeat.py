@@ -0,0 +1,158 @@
+"""
+模块职能：
+- Worker 心跳：worker_entry 起一个守护线程，每 WORKER_HEARTBEAT_SECONDS 刷新 Redis 键
+  worker:hb:<worker_id>（TTL 为 3 个周期）；键消失即视为 Worker 已死（reaper 据此提前回收其作业）。
+- 作业心跳：dispatcher / import_customers 在作业执行期间起一个守护线程，每 JOB_HEARTBEAT_SECONDS
+  UPDATE jobs SET last_heartbeat（仅 status='RUNNING' 的行），并续期作业锁；短作业结束前不会多写一次库。
+- 作业锁：Redis 键 job:lock:<job_id>（SET NX，TTL JOB_STALE_SECONDS），只在 RQ Worker 内执行时获取，
+  防止同一作业被重复投递后并发执行；正常结束时释放，Worker 死亡后由 reaper 清理。
+
+函数 / 类型：
+- worker_id()：当前 Worker 标识（worker_entry 写入环境变量 WORKER_ID；work horse 继承）
+- WorkerHeartbeat(conn, worker_id, queue)：start() / stop()
+- worker_alive(conn, worker_id) -> bool
+- acquire_job_lock(conn, job_id) -> bool / release_job_lock(conn, job_id) / job_lock_key(job_id)
+- job_heartbeat(job_id, conn=None)：上下文管理器，作业执行期间的心跳线程（conn 非空时顺带续期作业锁）
+- job_guard(job_id)：上下文管理器 = RQ 内获取作业锁（已被占用抛 JobLocked）+ job_heartbeat + 释放锁；
+  dispatcher.run_job / run_batch_job 与 import_customers 共用
+
+日志：
+- worker_heartbeat_error / job_heartbeat_error（写失败只记日志，不中断作业）/ job_lock_busy
+"""
+import os
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import update
+
+from app.core.models import Job
+from app.core.state_machine import JobStatus
+from app.infra.logger import emit
+
+WORKER_HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "10"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+
+WORKER_KEY = "worker:hb:{}"
+LOCK_KEY = "job:lock:{}"
+
+
+def worker_id() -> str:
+    return os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkerHeartbeat:
+    def __init__(self, conn, worker_id: str, queue: str = "", interval: Optional[float] = None):
+        self.conn = conn
+        self.key = WORKER_KEY.format(worker_id)
+        self.queue = queue
+        self.interval = interval or WORKER_HEARTBEAT_SECONDS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self) -> None:
+        value = json.dumps({"pid": os.getpid(), "queue": self.queue, "ts": time.time()})
+        self.conn.set(self.key, value, ex=max(1, int(self.interval * 3)))
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:  # Redis 抖动：下个周期再试，键的 TTL 留有余量
+                emit("worker_heartbeat_error", key=self.key, error=str(e))
+
+    def start(self) -> "WorkerHeartbeat":
+        self.beat()
+        self._thread = threading.Thread(target=self._loop, name="worker-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+        try:
+            self.conn.delete(self.key)  # 正常退出立即注销
+        except Exception:
+            pass
+
+
+def worker_alive(conn, worker_id: Optional[str]) -> bool:
+    return bool(worker_id) and bool(conn.exists(WORKER_KEY.format(worker_id)))
+
+
+def job_lock_key(job_id: str) -> str:
+    return LOCK_KEY.format(job_id)
+
+
+def acquire_job_lock(conn, job_id: str) -> bool:
+    return bool(conn.set(job_lock_key(job_id), worker_id(), nx=True, ex=JOB_STALE_SECONDS))
+
+
+def release_job_lock(conn, job_id: str) -> None:
+    key = job_lock_key(job_id)
+    owner = conn.get(key)
+    if owner is not None and (owner.decode() if isinstance(owner, bytes) else owner) == worker_id():
+        conn.delete(key)
+
+
+def _beat_job(job_id: str, conn) -> None:
+    from app.infra.db import engine  # 延迟导入：Worker 启动时不必连库
+    with engine.begin() as db:
+        db.execute(update(Job.__table__).where(Job.id == job_id, Job.status == JobStatus.RUNNING.value)
+                   .values(last_heartbeat=datetime.now(timezone.utc)))
+    if conn is not None:
+        conn.expire(job_lock_key(job_id), JOB_STALE_SECONDS)
+
+
+@contextmanager
+def job_heartbeat(job_id: str, conn=None):
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                _beat_job(job_id, conn)
+            except Exception as e:
+                emit("job_heartbeat_error", job_id=job_id, error=str(e))
+
+    t = threading.Thread(target=_loop, name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join(timeout=1)
+
+
+class JobLocked(RuntimeError):
+    """同一作业已在别处执行（作业锁被占用）。"""
+
+
+def rq_connection():
+    """在 RQ Worker 内执行时返回当前作业的 Redis 连接；直接调用（测试 / 后台线程）时为 None。"""
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return None
+    job = get_current_job()
+    return job.connection if job is not None else None
+
+
+@contextmanager
+def job_guard(job_id: str):
+    conn = rq_connection()
+    if conn is not None and not acquire_job_lock(conn, job_id):
+        emit("job_lock_busy", job_id=job_id, worker_id=worker_id())
+        raise JobLocked(job_id)
+    try:
+        with job_heartbeat(job_id, conn):
+            yield
+    finally:
+        if conn is not None:
+            release_job_lock(conn, job_id)
@@ -1,6 +1,6 @@
 """"模块职能：
 
-示例后台任务 import_customers：模拟 3 步处理，按状态机推进并记录调试日志
+后台任务 import_customers：流式导入客户 CSV（见 app.services.customer_import），按状态机推进并记录调试日志
 
 主要函数：
 
@@ -8,38 +8,60 @@ import_customers(ctx_payload, payload, job_id)：
 
 解析上下文 user_id
 
+job_guard：RQ 内持有作业锁、执行期间定期写心跳（见 app.workers.heartbeat）
+
 Job.start 置 RUNNING
 
-依次输出 job_step：download_csv/parse_csv/upsert_db
+job_step：download_csv → upsert_db（边读边校验边批量 upsert，进度写回 jobs.processed）
+
+Job.finish 标记 SUCCEEDED/FAILED，结果摘要写入 jobs.result
+
+payload：{"file_url": "https://... | IMPORT_UPLOAD_DIR 内的 file:/// 或本地路径", "batch_size": 可选，1..IMPORT_BATCH_SIZE_MAX}
 
-Job.finish 标记 SUCCEEDED/FAILED"""
+来源与 batch_size 在提交时已校验，执行时 run_import 再校验一次（入队之后配置可能已变）"""
 # app/workers/jobs.py
-import time
+import json
+from sqlalchemy import text
 from app.core.context import Context
 from app.infra.db import SessionLocal
 from app.core.models import Job
 from app.core.state_machine import JobStatus
 from app.infra.logger import emit
+from app.services import queue_stats
+from app.services.customer_import import run_import
+from app.workers import lanes
+from app.workers.heartbeat import JobLocked, job_guard, worker_id
 
 def import_customers(ctx_payload: dict, payload: dict, job_id: str):
     """
-    示例任务：
+    导入任务：
     - 读上下文获得 user_id
     - 置 RUNNING
-    - 模拟 3 步：download_csv / parse_csv / upsert_db
-    - SUCCEEDED 或 FAILED
+    - download_csv / upsert_db（流式，常量内存）
+    - SUCCEEDED 或 FAILED；摘要（行数 / upsert 数 / 不合格行及前若干条原因）写 jobs.result
     """
     ctx = Context.from_payload(ctx_payload)
+    queue_stats.record_current_dequeue("import")
+    lanes.observe_current_wait()
     db = SessionLocal()
     try:
         emit("job_start", job_id=job_id, type="IMPORT_CUSTOMERS", user_id=ctx.user_id)
-        Job.start(db, job_id)
-        for step in ("download_csv", "parse_csv", "upsert_db"):
-            emit("job_step", job_id=job_id, step=step, user_id=ctx.user_id)
-            time.sleep(0.2)
+        with job_guard(job_id):
+            Job.start(db, job_id, worker_id=worker_id())
+            emit("job_step", job_id=job_id, step="download_csv", user_id=ctx.user_id)
+            source = (payload or {}).get("file_url") or ""
+            emit("job_step", job_id=job_id, step="upsert_db", user_id=ctx.user_id)
+            summary = run_import(ctx.user_id, source, job_id=job_id, batch_size=(payload or {}).get("batch_size"))
+        db.execute(text("UPDATE jobs SET result = :r WHERE id = :id"),
+                   {"r": json.dumps(summary, ensure_ascii=False), "id": job_id})
+        db.commit()
         Job.finish(db, job_id, JobStatus.SUCCEEDED)
-        emit("job_finished", job_id=job_id, status="SUCCEEDED", user_id=ctx.user_id)
+        emit("job_finished", job_id=job_id, status="SUCCEEDED", user_id=ctx.user_id,
+             rows=summary["rows"], invalid=summary["invalid"])
+    except JobLocked:
+        emit("job_finished", job_id=job_id, status="SKIPPED", error="job is already running", user_id=ctx.user_id)
     except Exception as e:
+        db.rollback()
         Job.finish(db, job_id, JobStatus.FAILED, str(e))
         emit("job_finished", job_id=job_id, status="FAILED", error=str(e), user_id=ctx.user_id)
         raise
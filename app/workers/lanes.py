@@ -0,0 +1,108 @@
+# app/workers/lanes.py
+"""
+模块职能：
+- 优先级通道：high / normal / low 各对应一个 RQ 队列，交互命令（点一下"测试"、取单个资料）不再排在
+  批量导入后面。normal 就是原来的 RQ_QUEUE（默认 "default"），不带优先级入队的调用方行为不变。
+- 命令的通道（resolve）：
+  - 未指定时：单条 site.action 命令走 high；批量（items / 扇出）与 IMPORT_CUSTOMERS 走 normal
+  - 按角色封顶：批量命令最高只能到 LANE_ROLE_CAPS 给该角色的通道（默认 user 到 normal，admin / ops 到 high）；
+    单条命令任何角色都可以用 high（积压过深时由准入的 ADMISSION_SHED_DEPTH_HIGH 削峰，见 app.services.admission）。
+    超过上限的请求被降到上限，不报错
+- Worker 侧（LanePriorityMixin，worker_entry / 池模式共用）：按 high → normal → low 严格优先出队；
+  防饿死：某个通道连续 LANE_STARVATION_EVERY 次出队都排在被服务的通道之后，下一次出队把它提到最前；
+  排在被服务通道之前的通道说明当时是空的，计数清零。繁忙时每个通道至少分到约
+  1 / (LANE_STARVATION_EVERY + 1) 的出队；低优先级通道空着时不影响高优先级。
+- 指标：job_lane_wait_seconds{lane}，入队到开始执行的等待分布（按通道）。
+
+函数 / 类型：
+- queue_name(lane) / lane_of(queue_name) / worker_queue_names()
+- resolve(requested, role, bulk) -> lane
+- LanePriorityMixin：混入 RQ Worker / SimpleWorker，重写 reorder_queues
+- observe_current_wait(enqueued_at=None)：Worker 内执行作业时调用
+
+环境变量：
+- RQ_QUEUE（normal）/ RQ_QUEUE_HIGH / RQ_QUEUE_LOW
+- LANE_STARVATION_EVERY / LANE_ROLE_CAPS（如 "admin:high,ops:high,user:normal"）
+"""
+import os
+import time
+from datetime import timezone
+from typing import Dict, List, Optional
+
+from app.infra.metrics import JOB_LANE_WAIT_SECONDS
+
+LANES = ("high", "normal", "low")
+
+RQ_QUEUE = os.getenv("RQ_QUEUE", "default")
+RQ_QUEUE_HIGH = os.getenv("RQ_QUEUE_HIGH", f"{RQ_QUEUE}-high")
+RQ_QUEUE_LOW = os.getenv("RQ_QUEUE_LOW", f"{RQ_QUEUE}-low")
+LANE_STARVATION_EVERY = int(os.getenv("LANE_STARVATION_EVERY", "10"))
+
+
+def _parse_caps(raw: str) -> Dict[str, str]:
+    caps = {}
+    for part in raw.split(","):
+        role, _, lane = part.strip().partition(":")
+        if role and lane in LANES:
+            caps[role] = lane
+    return caps
+
+
+LANE_ROLE_CAPS = _parse_caps(os.getenv("LANE_ROLE_CAPS", "admin:high,ops:high,user:normal"))
+
+
+def queue_name(lane: str) -> str:
+    return {"high": RQ_QUEUE_HIGH, "normal": RQ_QUEUE, "low": RQ_QUEUE_LOW}[lane]
+
+
+def lane_of(name: str) -> str:
+    return {RQ_QUEUE_HIGH: "high", RQ_QUEUE: "normal", RQ_QUEUE_LOW: "low"}.get(name, name)
+
+
+def worker_queue_names() -> List[str]:
+    return [queue_name(lane) for lane in LANES]
+
+
+def resolve(requested: Optional[str], role: Optional[str], bulk: bool) -> str:
+    lane = requested or ("normal" if bulk else "high")
+    cap = LANE_ROLE_CAPS.get(role or "", "normal") if bulk else "high"
+    return max(lane, cap, key=LANES.index)  # LANES 按优先级从高到低：index 越大越低
+
+
+class LanePriorityMixin:
+    """严格优先 + 防饿死；队列顺序取构造时传入的顺序（worker_queue_names() 即 high → normal → low）。"""
+
+    starvation_every = LANE_STARVATION_EVERY
+
+    def reorder_queues(self, reference_queue):
+        if len(self.queues) < 2 or self.starvation_every <= 0:
+            return
+        skips = self.__dict__.setdefault("_lane_skips", {q.name: 0 for q in self.queues})
+        order = [q.name for q in self._ordered_queues]
+        if reference_queue.name not in order:
+            return
+        pos = order.index(reference_queue.name)
+        for name in order[:pos]:
+            skips[name] = 0  # 排在前面却没出到作业：是空的，不算饿
+        for name in order[pos + 1:]:
+            skips[name] += 1
+        skips[reference_queue.name] = 0
+        starving = [q for q in self.queues if skips[q.name] >= self.starvation_every]
+        # 饿着的通道提到最前（最低的最先，它被跳过得最多），其余保持严格优先
+        self._ordered_queues = starving[::-1] + [q for q in self.queues if q not in starving]
+
+
+def observe_current_wait(enqueued_at: Optional[float] = None) -> None:
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return
+    job = get_current_job()
+    if job is None:
+        return
+    if enqueued_at is None:
+        if job.enqueued_at is None:
+            return
+        ts = job.enqueued_at
+        enqueued_at = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()  # RQ 1.x 为 naive UTC
+    JOB_LANE_WAIT_SECONDS.labels(lane_of(job.origin)).observe(max(0.0, time.time() - enqueued_at))
@@ -0,0 +1,172 @@
+# app/workers/pool.py
+"""
+模块职能：
+- Worker 池模式（worker_entry --pool N）：主进程预先 import 应用模块与连接器后 fork 出 N 个常驻子进程，
+  每个子进程跑一个 RQ SimpleWorker（作业在子进程内直接执行，不再每个作业 fork 一个 work horse）。
+  子进程在作业之间保留：DB 连接池（app.infra.db.engine）、HTTP 连接池（app.infra.http_client）、
+  已加载的连接器、Fernet 实例等进程内缓存。
+- 回收：子进程执行满 max_jobs 个作业，或某个作业结束后 RSS 超过 max_rss_mb，就在作业间隙退出
+  （退出码 EXIT_RECYCLE），主进程立即补一个新的子进程；异常退出的子进程也会补（间隔 RESPAWN_BACKOFF 秒）。
+- 主进程不连 DB / Redis、不起线程，只负责 fork、wait 与信号转发；SIGTERM / SIGINT 转发给子进程
+  （RQ 的 warm shutdown：做完手上的作业再退出），之后不再补进程。
+
+与 stock Worker 的差异：
+- 作业超时仍由 RQ 的 death penalty（SIGALRM）保证；但作业若搞坏了进程状态（全局变量、泄漏），
+  影响会延续到同一子进程的后续作业，直到被回收，因此 max_jobs 不宜设得过大。
+
+函数 / 类型：
+- PoolWorker：SimpleWorker 子类（带优先级通道出队，见 app.workers.lanes），记录执行数与 RSS，决定是否回收
+- run_pool(redis_url, queue, size, max_jobs, max_rss_mb, sites, burst=False) -> int（退出码）；
+  queue 为逗号分隔的队列名，按优先级从高到低
+
+日志：
+- pool_start / pool_child_spawn / pool_child_exit（reason=recycle|done|crash）/ pool_child_recycle / pool_stop
+"""
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+
+from app.infra.logger import emit
+from app.workers.lanes import LanePriorityMixin
+
+EXIT_RECYCLE = 75
+RESPAWN_BACKOFF = 1.0
+
+try:
+    from rq import SimpleWorker
+except ImportError:
+    from rq.worker import SimpleWorker
+
+
+def rss_mb() -> float:
+    """当前进程常驻内存（MB）；无 /proc 时退化为峰值 RSS。"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PoolWorker(LanePriorityMixin, SimpleWorker):
+    def __init__(self, *args, max_jobs: Optional[int] = None, max_rss_mb: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.jobs_done = 0
+        self.recycle_reason: Optional[str] = None
+
+    def execute_job(self, job, queue):
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            self.jobs_done += 1
+            if self.max_jobs and self.jobs_done >= self.max_jobs:
+                self.recycle_reason = "max_jobs"
+            elif self.max_rss_mb and rss_mb() > self.max_rss_mb:
+                self.recycle_reason = "memory"
+            if self.recycle_reason:
+                emit("pool_child_recycle", pid=os.getpid(), reason=self.recycle_reason,
+                     jobs=self.jobs_done, rss_mb=round(rss_mb(), 1))
+                self._stop_requested = True  # 在下一次取作业前退出 work 循环
+
+
+def preload(sites: List[str]) -> None:
+    """fork 前在主进程 import：子进程共享这些页（写时复制），启动与首个作业都不再付 import 成本。"""
+    from app.workers import dispatcher, jobs  # noqa: F401
+    from app.connectors import registry
+    if sites:
+        emit("worker_connectors_preloaded", connectors=registry.preload(sites))
+
+
+def _child_main(redis_url: str, queue_name: str, max_jobs: int, max_rss_mb: float, burst: bool) -> int:
+    from redis import from_url as redis_from_url
+    from rq import Queue
+    from app.infra.db import engine
+    from app.workers.heartbeat import WorkerHeartbeat
+
+    # 主进程理论上没建连接；保险起见丢弃继承来的连接池（不关闭 socket，避免影响别的进程）
+    engine.dispose(close=False)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    conn = redis_from_url(redis_url)
+    queues = [Queue(name, connection=conn) for name in queue_name.split(",") if name]
+    worker = PoolWorker(queues, connection=conn, max_jobs=max_jobs, max_rss_mb=max_rss_mb)
+    os.environ["WORKER_ID"] = worker.name
+    beat = WorkerHeartbeat(conn, worker.name, queue=queue_name).start()
+    try:
+        worker.work(burst=burst)
+    finally:
+        beat.stop()
+    return EXIT_RECYCLE if worker.recycle_reason else 0
+
+
+def run_pool(redis_url: str, queue: str, size: int, max_jobs: int, max_rss_mb: float, sites: List[str],
+             burst: bool = False) -> int:
+    preload(sites)
+    emit("pool_start", size=size, queue=queue, max_jobs=max_jobs, max_rss_mb=max_rss_mb, burst=burst)
+    children: Dict[int, int] = {}  # pid -> slot
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _child_main(redis_url, queue, max_jobs, max_rss_mb, burst)
+            except BaseException as e:  # 子进程绝不能回到主进程的循环里
+                emit("pool_child_error", pid=os.getpid(), error=str(e))
+            finally:
+                os._exit(code)
+        children[pid] = slot
+        emit("pool_child_spawn", pid=pid, slot=slot)
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    for slot in range(size):
+        spawn(slot)
+
+    exit_code = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        _mark_metrics_dead(pid)
+        code = os.waitstatus_to_exitcode(status)
+        reason = "recycle" if code == EXIT_RECYCLE else "done" if code == 0 else "crash"
+        emit("pool_child_exit", pid=pid, slot=slot, code=code, reason=reason)
+        if reason == "crash":
+            exit_code = 1
+        if stopping or reason == "done":
+            continue  # burst 下队列已空 / 收到停止信号：不补
+        if reason == "crash":
+            time.sleep(RESPAWN_BACKOFF)
+        spawn(slot)
+    emit("pool_stop", code=exit_code)
+    return exit_code
+
+
+def _mark_metrics_dead(pid: int) -> None:
+    # prometheus 多进程模式：退出的子进程的 gauge 文件要标记，否则 /metrics 会一直聚合它
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
@@ -1,46 +1,134 @@
 """
 模块职能：
 - 生产者：把作业入 RQ 队列（Redis）。
+- priority（high / normal / low）选择优先级通道对应的队列（见 app.workers.lanes）；默认 normal，即 RQ_QUEUE。
 
 函数：
-- enqueue(job_id, user_id, type, account_selector, payload)
+- enqueue(job_id, user_id, type, account_selector, payload, priority="normal")
+- enqueue_batch(job_id, user_id, type, account_selector, items, parent_id=None, priority="normal")：批量命令，
+  一个 RQ 作业跑 run_batch_job；parent_id 非空时为扇出的子作业（见 app.services.fanout）
+- enqueue_import(job_id, ctx_payload, payload, priority="normal")：IMPORT_CUSTOMERS 交给 Worker 跑 import_customers
+- enqueue_test_login(job_id, user_id, account_ids, priority="normal")：批量测试登录，Worker 跑 run_test_login_job
 
 日志：
 - q_enqueue
+
+统计：
+- 每次入队按 (队列, 站点) 计数，供 app.services.queue_stats 算入队速率与站点积压
+
+追踪：
+- span "rq.enqueue"；traceparent / request_id 写入 RQ job.meta，由 dispatcher.run_job 接续
 """
 import os
+import time
+from typing import Optional
 from app.infra.logger import emit
+from app.infra.redis_client import get_redis
+from app.infra import tracing
+from app.services import queue_stats
+from app.workers import lanes
+from app.workers.lanes import RQ_QUEUE
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-RQ_QUEUE  = os.getenv("RQ_QUEUE", "default")
+BATCH_JOB_TIMEOUT = int(os.getenv("BATCH_JOB_TIMEOUT", "3600"))  # 批量作业比单项作业长得多
+IMPORT_JOB_TIMEOUT = int(os.getenv("IMPORT_JOB_TIMEOUT", "21600"))  # 多 GB 导入
 
-_redis = None
 _Queue = None
-_queue = None
-
-
-def _get_queue():
-    global _redis, _Queue, _queue
-    if _queue is None:
-        from redis import from_url as redis_from_url
-        try:
-            from rq import Queue
-        except ImportError:
-            from rq.queue import Queue
-        _redis = redis_from_url(REDIS_URL)
-        _Queue = Queue
-        _queue = _Queue(RQ_QUEUE, connection=_redis)
-    return _queue
-
-def enqueue(job_id: str, user_id: str, type: str, account_selector: dict, payload: dict) -> str:
+_queues = {}
+
+
+def _get_queue(priority: str = "normal"):
+    global _Queue
+    conn = get_redis()
+    q = _queues.get(priority)
+    # 连接被 set_redis_url 切换过时重新绑定
+    if q is None or q.connection is not conn:
+        if _Queue is None:
+            try:
+                from rq import Queue
+            except ImportError:
+                from rq.queue import Queue
+            _Queue = Queue
+        q = _queues[priority] = _Queue(lanes.queue_name(priority), connection=conn)
+    return q
+
+def _count(q, site: str) -> None:
+    queue_stats.record(q.connection, q.name, "enq", site)
+
+
+def enqueue(job_id: str, user_id: str, type: str, account_selector: dict, payload: dict,
+            priority: str = "normal") -> str:
     site, action = type.split(".", 1)
     from app.workers.dispatcher import run_job  # 延迟导入避免循环
-    rq_job = _get_queue().enqueue(
-        run_job,
-        job_id=job_id,
-        kwargs=dict(job_id=job_id, user_id=user_id, site=site, action=action,
-                    account_selector=account_selector, payload=payload),
-        retry=None,
-    )
-    emit("q_enqueue", job_id=job_id, rq_job_id=rq_job.id, site=site, action=action)
-    return rq_job.id
\ No newline at end of file
+    with tracing.start_span("rq.enqueue", kind="producer", job_id=job_id, site=site, action=action):
+        q = _get_queue(priority)
+        rq_job = q.enqueue(
+            run_job,
+            job_id=job_id,
+            kwargs=dict(job_id=job_id, user_id=user_id, site=site, action=action,
+                        account_selector=account_selector, payload=payload,
+                        enqueued_at=time.time()),
+            meta=tracing.inject(),
+            retry=None,
+        )
+        emit("q_enqueue", job_id=job_id, rq_job_id=rq_job.id, site=site, action=action, priority=priority)
+    _count(q, site)
+    return rq_job.id
+
+
+def enqueue_batch(job_id: str, user_id: str, type: str, account_selector: dict, items: list,
+                  parent_id: Optional[str] = None, priority: str = "normal") -> str:
+    site, action = type.split(".", 1)
+    from app.workers.dispatcher import run_batch_job  # 延迟导入避免循环
+    with tracing.start_span("rq.enqueue", kind="producer", job_id=job_id, site=site, action=action,
+                            items=len(items)):
+        q = _get_queue(priority)
+        rq_job = q.enqueue(
+            run_batch_job,
+            job_id=job_id,
+            kwargs=dict(job_id=job_id, user_id=user_id, site=site, action=action,
+                        account_selector=account_selector, items=items,
+                        enqueued_at=time.time(), parent_id=parent_id),
+            meta=tracing.inject(),
+            retry=None,
+            job_timeout=BATCH_JOB_TIMEOUT,
+        )
+        emit("q_enqueue", job_id=job_id, rq_job_id=rq_job.id, site=site, action=action, items=len(items),
+             priority=priority)
+    _count(q, site)
+    return rq_job.id
+
+
+def enqueue_import(job_id: str, ctx_payload: dict, payload: dict, priority: str = "normal") -> str:
+    from app.workers.jobs import import_customers  # 延迟导入避免循环
+    with tracing.start_span("rq.enqueue", kind="producer", job_id=job_id, type="IMPORT_CUSTOMERS"):
+        q = _get_queue(priority)
+        rq_job = q.enqueue(
+            import_customers,
+            job_id=job_id,
+            args=(ctx_payload, payload, job_id),
+            meta=tracing.inject(),
+            retry=None,
+            job_timeout=IMPORT_JOB_TIMEOUT,
+        )
+        emit("q_enqueue", job_id=job_id, rq_job_id=rq_job.id, type="IMPORT_CUSTOMERS", priority=priority)
+    _count(q, "import")
+    return rq_job.id
+
+
+def enqueue_test_login(job_id: str, user_id: str, account_ids: list, priority: str = "normal") -> str:
+    from app.workers.dispatcher import run_test_login_job  # 延迟导入避免循环
+    with tracing.start_span("rq.enqueue", kind="producer", job_id=job_id, type="accounts.test_login",
+                            items=len(account_ids)):
+        q = _get_queue(priority)
+        rq_job = q.enqueue(
+            run_test_login_job,
+            job_id=job_id,
+            kwargs=dict(job_id=job_id, user_id=user_id, account_ids=account_ids, enqueued_at=time.time()),
+            meta=tracing.inject(),
+            retry=None,
+            job_timeout=BATCH_JOB_TIMEOUT,
+        )
+        emit("q_enqueue", job_id=job_id, rq_job_id=rq_job.id, type="accounts.test_login",
+             items=len(account_ids), priority=priority)
+    _count(q, "accounts")
+    return rq_job.id
@@ -0,0 +1,200 @@
+# app/workers/reaper.py
+"""
+模块职能：
+- 回收卡死的作业：Worker 被 kill / 宕机后，jobs 行停在 RUNNING，作业锁与 RQ 的 StartedJobRegistry 也留着。
+  reaper 周期性扫描心跳过期的 RUNNING 作业，按重试策略重新入队或置 FAILED，并清理锁与 RQ 登记。
+
+判定（两档）：
+- 可疑：last_heartbeat 早于 now - 2 * JOB_HEARTBEAT_SECONDS（正常执行的作业每个周期都会刷新心跳）
+- 回收：可疑且（执行它的 Worker 心跳键已消失，或 last_heartbeat 早于 now - JOB_STALE_SECONDS）
+
+重试策略：
+- attempts < JOB_MAX_ATTEMPTS 且 RQ 作业数据仍在 Redis：置回 PENDING、清掉本次的部分结果与进度，原 RQ 作业重新入队
+- 否则置 FAILED；扇出子作业同时回调 fanout.child_finished，父作业照常收敛
+- PENDING 超过 JOB_PENDING_STALE_SECONDS 且 RQ 里查不到（入队后 Redis 丢了数据）：置 FAILED
+
+开销：
+- 扫描走 ix_jobs_status_heartbeat（status, last_heartbeat）/ ix_jobs_status_updated（status, updated_at），
+  按 (时间, id) 键集分页，每批最多 REAPER_BATCH_SIZE 行、每轮最多
+  REAPER_MAX_BATCHES 批；状态变更都是带条件的 UPDATE（status='RUNNING' 且心跳仍过期），
+  与刚恢复心跳的 Worker 或并行的另一个 reaper 竞争时只有一方生效。
+
+运行：
+  python -m app.workers.reaper            # 常驻，每 REAPER_INTERVAL_SECONDS 一轮
+  python -m app.workers.reaper --once     # 只跑一轮（cron / 运维手动）
+
+函数：
+- reap_once(now=None, conn=None) -> {"scanned","requeued","failed"}
+
+日志：
+- job_reclaimed（action=requeue|fail）/ reaper_pass / reaper_error / reaper_start / reaper_stop
+"""
+import os
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+
+from app.core.models import Job, JobResult
+from app.core.state_machine import JobStatus
+from app.infra.db import SessionLocal
+from app.infra.logger import configure_logging, emit
+from app.infra.redis_client import get_redis
+from app.services import fanout
+from app.workers import heartbeat
+from app.workers.heartbeat import JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "200"))
+REAPER_MAX_BATCHES = int(os.getenv("REAPER_MAX_BATCHES", "10"))
+REAPER_INTERVAL_SECONDS = float(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+JOB_PENDING_STALE_SECONDS = int(os.getenv("JOB_PENDING_STALE_SECONDS", "3600"))
+
+
+def _fetch_rq_job(conn, job_id: str):
+    from rq.job import Job as RQJob
+    from rq.exceptions import NoSuchJobError
+    try:
+        return RQJob.fetch(job_id, connection=conn)
+    except NoSuchJobError:
+        return None
+
+
+def _forget_started(conn, rq_job) -> None:
+    """从原队列的 StartedJobRegistry 移除（死掉的 Worker 不会再做这件事）。"""
+    from rq import Queue
+    from rq.registry import StartedJobRegistry
+    registry = StartedJobRegistry(queue=Queue(rq_job.origin, connection=conn))
+    if hasattr(registry, "remove_executions"):  # RQ 2.x 按 execution 登记
+        registry.remove_executions(rq_job)
+    else:
+        registry.remove(rq_job)
+
+
+def _reclaim(db, conn, row, suspect_before: datetime) -> str:
+    """返回 requeue / fail / skip（条件 UPDATE 没抢到：心跳已恢复或被别的 reaper 处理）。"""
+    still_stale = (Job.id == row.id, Job.status == JobStatus.RUNNING.value, Job.last_heartbeat < suspect_before)
+    rq_job = _fetch_rq_job(conn, row.id)
+    if rq_job is not None and row.attempts < JOB_MAX_ATTEMPTS:
+        won = db.execute(update(Job.__table__).where(*still_stale).values(
+            status=JobStatus.PENDING.value, phase=None, processed=0, worker_id=None,
+            error=f"reclaimed after worker {row.worker_id} stopped heartbeating",
+        )).rowcount
+        if not won:
+            db.rollback()
+            return "skip"
+        db.execute(delete(JobResult.__table__).where(JobResult.job_id == row.id))
+        db.commit()
+        conn.delete(heartbeat.job_lock_key(row.id))
+        _forget_started(conn, rq_job)
+        from rq import Queue
+        Queue(rq_job.origin, connection=conn).enqueue_job(rq_job)
+        return "requeue"
+
+    error = f"worker lost: no heartbeat since {row.last_heartbeat} (attempt {row.attempts})"
+    won = db.execute(update(Job.__table__).where(*still_stale).values(
+        status=JobStatus.FAILED.value, error=error)).rowcount
+    if not won:
+        db.rollback()
+        return "skip"
+    db.commit()
+    conn.delete(heartbeat.job_lock_key(row.id))
+    if rq_job is not None:
+        _forget_started(conn, rq_job)
+    if row.parent_id:
+        fanout.child_finished(db, row.id, row.parent_id, {"ok": False, "error": error})
+    return "fail"
+
+
+def _batches(db, key, *conds):
+    """按 (key, id) 键集分页的候选批次；跳过的行（如 Worker 仍活着）不会在同一轮被反复扫描。"""
+    cursor = None
+    for _ in range(REAPER_MAX_BATCHES):
+        q = select(Job.id, Job.parent_id, Job.worker_id, Job.attempts, Job.last_heartbeat, key.label("k")) \
+            .where(*conds)
+        if cursor is not None:
+            q = q.where((key > cursor[0]) | ((key == cursor[0]) & (Job.id > cursor[1])))
+        rows = db.execute(q.order_by(key, Job.id).limit(REAPER_BATCH_SIZE)).all()
+        db.rollback()  # 结束只读事务，后面每个作业各自提交
+        yield rows
+        if len(rows) < REAPER_BATCH_SIZE:
+            return
+        cursor = (rows[-1].k, rows[-1].id)
+
+
+def _lost_pending(db, conn, row) -> bool:
+    """PENDING 但 RQ 里已没有这个作业（入队后 Redis 丢数据等）：置 FAILED。"""
+    if _fetch_rq_job(conn, row.id) is not None:
+        return False
+    won = db.execute(update(Job.__table__).where(Job.id == row.id, Job.status == JobStatus.PENDING.value)
+                     .values(status=JobStatus.FAILED.value, error="lost before start: not found in queue")).rowcount
+    db.commit()
+    if won and row.parent_id:
+        fanout.child_finished(db, row.id, row.parent_id, {"ok": False, "error": "lost before start"})
+    return bool(won)
+
+
+def reap_once(now: Optional[datetime] = None, conn=None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    conn = conn or get_redis()
+    suspect_before = now - timedelta(seconds=2 * JOB_HEARTBEAT_SECONDS)
+    stale_before = now - timedelta(seconds=JOB_STALE_SECONDS)
+    stats = {"scanned": 0, "requeued": 0, "failed": 0}
+    with SessionLocal() as db:
+        for rows in _batches(db, Job.last_heartbeat,
+                             Job.status == JobStatus.RUNNING.value, Job.last_heartbeat < suspect_before):
+            stats["scanned"] += len(rows)
+            for row in rows:
+                if heartbeat.worker_alive(conn, row.worker_id) and not _before(row.last_heartbeat, stale_before):
+                    continue
+                action = _reclaim(db, conn, row, suspect_before)
+                if action != "skip":
+                    stats["requeued" if action == "requeue" else "failed"] += 1
+                    emit("job_reclaimed", job_id=row.id, action=action, worker_id=row.worker_id,
+                         attempts=row.attempts, last_heartbeat=str(row.last_heartbeat))
+
+        # RQ 作业丢失的 PENDING（只看足够老的，排队中的作业在 Redis 里查得到，不受影响）
+        pending_before = now - timedelta(seconds=JOB_PENDING_STALE_SECONDS)
+        for rows in _batches(db, Job.updated_at,
+                             Job.status == JobStatus.PENDING.value, Job.updated_at < pending_before):
+            stats["scanned"] += len(rows)
+            for row in rows:
+                if _lost_pending(db, conn, row):
+                    stats["failed"] += 1
+                    emit("job_reclaimed", job_id=row.id, action="fail", reason="lost_pending")
+    emit("reaper_pass", **stats)
+    return stats
+
+
+def _before(value: datetime, cutoff: datetime) -> bool:
+    # SQLite 读回的是 naive（按 UTC 存），Postgres 是 aware
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value < cutoff
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true", help="只扫描一轮后退出")
+    parser.add_argument("--interval", type=float, default=REAPER_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    configure_logging()
+    emit("reaper_start", interval=args.interval, stale_seconds=JOB_STALE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS)
+    try:
+        while True:
+            try:
+                reap_once()
+            except Exception as e:  # 单轮失败（DB / Redis 抖动）不退出，下一轮再试
+                emit("reaper_error", error=str(e))
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        emit("reaper_stop", reason="KeyboardInterrupt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# app/workers/scheduler.py
+"""
+模块职能：
+- 定时命令调度器：周期扫描到期的 schedules 行，经 app.services.schedules.fire 走命令提交路径入队。
+- 单主：可以部署多个副本，只有持有 Redis 锁 scheduler:leader 的那一个扫描；锁带 TTL，
+  主进程每轮续期，挂掉后最多 SCHEDULER_LEADER_TTL 秒由其它副本接手。
+  切主瞬间的重叠由 fire 的条件 UPDATE 与幂等键兜底，不会重复建作业。
+
+开销：
+- 每轮一次索引扫描（ix_schedules_enabled_next_run：enabled AND next_run_at <= now ORDER BY next_run_at），
+  每批最多 SCHEDULER_BATCH_SIZE 行；一批取满说明还有积压，不等待直接再取下一批。
+  扫描只取触发要用的列，触发时不再按行回表。
+
+运行：
+  python -m app.workers.scheduler            # 常驻，每 SCHEDULER_TICK_SECONDS 一轮
+  python -m app.workers.scheduler --once     # 只跑一轮（不抢锁，运维手动补触发）
+
+函数：
+- acquire_leader(conn, owner, ttl) -> bool：抢锁或续期（锁属于自己时）
+- release_leader(conn, owner)：只删除自己持有的锁
+- run_once(now=None) -> {"due","fired","errors"}
+
+环境变量：
+- SCHEDULER_TICK_SECONDS：扫描周期（默认 1）
+- SCHEDULER_LEADER_TTL：主锁 TTL 秒（默认 15）
+- SCHEDULER_BATCH_SIZE：每批最多触发的计划数（默认 200）
+
+日志：
+- scheduler_start / scheduler_leader（acquired|lost）/ scheduler_pass / scheduler_error / scheduler_stop
+"""
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.infra.db import SessionLocal
+from app.infra.logger import configure_logging, emit
+from app.infra.redis_client import get_redis
+from app.services import schedules
+from app.workers import heartbeat
+
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "1"))
+SCHEDULER_LEADER_TTL = float(os.getenv("SCHEDULER_LEADER_TTL", "15"))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "200"))
+
+LEADER_KEY = "scheduler:leader"
+
+# 锁属于自己才续期 / 删除；不是自己的锁（已过期被别人抢走）一律不动
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def acquire_leader(conn, owner: str, ttl: float = SCHEDULER_LEADER_TTL) -> bool:
+    ttl_ms = int(ttl * 1000)
+    if conn.set(LEADER_KEY, owner, nx=True, px=ttl_ms):
+        return True
+    return bool(conn.eval(_RENEW, 1, LEADER_KEY, owner, ttl_ms))
+
+
+def release_leader(conn, owner: str) -> None:
+    conn.eval(_RELEASE, 1, LEADER_KEY, owner)
+
+
+def run_once(now: Optional[datetime] = None) -> dict:
+    stats = {"due": 0, "fired": 0, "errors": 0}
+    with SessionLocal() as db:
+        while True:
+            tick = now or datetime.now(timezone.utc)
+            rows = schedules.due(db, tick, SCHEDULER_BATCH_SIZE)
+            db.rollback()  # 结束只读事务，每个计划各自提交（due 返回普通行，回滚不会让它们过期重查）
+            stats["due"] += len(rows)
+            for row in rows:
+                try:
+                    if schedules.fire(db, row, tick):
+                        stats["fired"] += 1
+                except Exception as e:  # 单条失败（DB 抖动等）不影响同批其它计划
+                    db.rollback()
+                    stats["errors"] += 1
+                    emit("scheduler_error", schedule_id=row.id, error=str(e))
+            if len(rows) < SCHEDULER_BATCH_SIZE or stats["errors"]:  # 有失败时留到下一轮，避免原地打转
+                break
+    if stats["due"]:
+        emit("scheduler_pass", **stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true", help="只扫描一轮后退出（不抢主锁）")
+    parser.add_argument("--interval", type=float, default=SCHEDULER_TICK_SECONDS)
+    args = parser.parse_args()
+
+    configure_logging()
+    owner = heartbeat.worker_id()
+    emit("scheduler_start", owner=owner, interval=args.interval, leader_ttl=SCHEDULER_LEADER_TTL)
+    if args.once:
+        run_once()
+        return
+
+    conn = get_redis()
+    leader = False
+    try:
+        while True:
+            try:
+                is_leader = acquire_leader(conn, owner)
+                if is_leader != leader:
+                    emit("scheduler_leader", owner=owner, state="acquired" if is_leader else "lost")
+                    leader = is_leader
+                if leader:
+                    run_once()
+            except Exception as e:  # 单轮失败（DB / Redis 抖动）不退出，下一轮再试
+                emit("scheduler_error", error=str(e))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        emit("scheduler_stop", reason="KeyboardInterrupt")
+    finally:
+        if leader:
+            try:
+                release_leader(conn, owner)
+            except Exception:
+                pass
+
+
+if __name__ == "__main__":
+    main()
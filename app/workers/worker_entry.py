@@ -3,13 +3,44 @@
 RQ Worker 启动入口：
 - 默认常驻；传 --burst 则队列空了就退出。
 - 兼容 RQ 1.x/2.x；显式 Redis 连接。
-日志：worker_env_loaded / worker_start / worker_stop
+- 设置了 PROMETHEUS_MULTIPROC_DIR 时确保目录存在（各 work horse 把指标写到这里，由 API 的 /metrics 聚合）。
+- --profile：对每个作业采样，慢于 --profile-threshold-ms 的作业把 speedscope 文件写到 --profile-dir，
+  并发出 job_profile_saved 事件（见 app.infra.profiler）。
+- --sites a,b：启动时只预热本 Worker 服务的站点连接器（"*" 为全部；默认 CONNECTOR_PRELOAD），
+  work horse fork 后直接复用已 import 的模块；未列出的站点仍在首次使用时懒加载。
+- 心跳：WORKER_ID 设为 RQ worker.name（work horse 继承，写入 jobs.worker_id），后台线程刷新
+  Redis 键 worker:hb:<WORKER_ID>；进程死亡后键过期，app.workers.reaper 据此回收其作业。
+- --pool N：池模式（见 app.workers.pool），fork N 个常驻子进程各跑一个 SimpleWorker，跨作业复用
+  DB / HTTP 连接池与进程内缓存；子进程满 --max-jobs 个作业或 RSS 超过 --max-rss-mb 后回收重建。
+  默认 0 = 原来的 RQ Worker（每个作业 fork 一个 work horse）。
+- --queue：默认监听全部优先级通道（high → normal → low，严格优先 + 防饿死，见 app.workers.lanes）；
+  也可传逗号分隔的队列名，只服务其中几个通道（顺序即优先级）。
+日志：worker_env_loaded / worker_connectors_preloaded / worker_start / worker_stop
 """
 import os
 import argparse
 from pathlib import Path
 from dotenv import load_dotenv
+
+
+def _load_env():
+    root = Path(__file__).resolve().parents[2]
+    env_example = root / ".env.example"
+    env_file = root / ".env"
+    if env_example.exists():
+        load_dotenv(env_example, override=False)
+    if env_file.exists():
+        load_dotenv(env_file, override=True)
+
+
+# 先加载 .env，务必在导入 app 模块之前：lanes 的队列名、指标的 PROMETHEUS_MULTIPROC_DIR 在 import 时读取，
+# 下面命令行参数的默认值（WORKER_POOL_SIZE / CONNECTOR_PRELOAD / JOB_PROFILE_* 等）也取自环境变量
+_load_env()
+
 from app.infra.logger import configure_logging, emit
+from app.connectors import registry
+from app.workers import lanes
+from app.workers.heartbeat import WorkerHeartbeat
 
 try:
     from rq import Worker
@@ -22,36 +53,63 @@ except ImportError:
 
 from redis import from_url as redis_from_url
 
-def _load_env():
-    root = Path(__file__).resolve().parents[2]
-    env_example = root / ".env.example"
-    env_file = root / ".env"
-    if env_example.exists():
-        load_dotenv(env_example, override=False)
-    if env_file.exists():
-        load_dotenv(env_file, override=True)
+
+class PriorityWorker(lanes.LanePriorityMixin, Worker):
+    pass
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--burst", action="store_true", help="队列空时自动退出")
-    parser.add_argument("--queue", default=os.getenv("RQ_QUEUE", "default"))
+    parser.add_argument("--queue", default=",".join(lanes.worker_queue_names()),
+                        help="逗号分隔的队列名，按优先级从高到低；默认全部通道")
     parser.add_argument("--redis", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--sites", default=os.getenv("CONNECTOR_PRELOAD", ""),
+                        help="预热的站点连接器，逗号分隔，* 为全部")
+    parser.add_argument("--pool", type=int, default=int(os.getenv("WORKER_POOL_SIZE", "0")),
+                        help="池模式的常驻子进程数；0 为每个作业 fork 的 stock Worker")
+    parser.add_argument("--max-jobs", type=int, default=int(os.getenv("WORKER_MAX_JOBS", "1000")),
+                        help="池模式：子进程执行多少个作业后回收")
+    parser.add_argument("--max-rss-mb", type=float, default=float(os.getenv("WORKER_MAX_RSS_MB", "512")),
+                        help="池模式：作业结束后 RSS 超过该值（MB）即回收子进程")
+    parser.add_argument("--profile", action="store_true", help="为慢作业落盘采样 profile")
+    parser.add_argument("--profile-threshold-ms", type=float,
+                        default=float(os.getenv("JOB_PROFILE_THRESHOLD_MS", "1000")))
+    parser.add_argument("--profile-dir", default=os.getenv("JOB_PROFILE_DIR") or os.path.join("logs", "profiles"))
     args = parser.parse_args()
 
-    _load_env()
     configure_logging()
+    if args.profile:
+        # 通过环境变量传给 fork 出的 work horse
+        os.environ["JOB_PROFILE_DIR"] = args.profile_dir
+        os.environ["JOB_PROFILE_THRESHOLD_MS"] = str(args.profile_threshold_ms)
+        emit("worker_profile_enabled", dir=args.profile_dir, threshold_ms=args.profile_threshold_ms)
+    prom_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if prom_dir:
+        Path(prom_dir).mkdir(parents=True, exist_ok=True)
     emit("worker_env_loaded", REDIS_URL=args.redis, RQ_QUEUE=args.queue)
+    sites = registry.parse_sites(args.sites)
+    if args.pool > 0:
+        from app.workers.pool import run_pool
+        raise SystemExit(run_pool(args.redis, args.queue, args.pool, args.max_jobs, args.max_rss_mb, sites,
+                                  burst=args.burst))
+    if sites:
+        report = registry.preload(sites)
+        emit("worker_connectors_preloaded", connectors=report)
     emit("worker_start", redis=args.redis, queue=args.queue)
 
     conn = redis_from_url(args.redis)
-    q = Queue(args.queue, connection=conn)
-    worker = Worker([q], connection=conn)
+    queues = [Queue(name, connection=conn) for name in args.queue.split(",") if name]
+    worker = PriorityWorker(queues, connection=conn)
+    os.environ["WORKER_ID"] = worker.name
+    beat = WorkerHeartbeat(conn, worker.name, queue=args.queue).start()
 
     try:
         worker.work(burst=args.burst)
     except KeyboardInterrupt:
         emit("worker_stop", reason="KeyboardInterrupt")
     finally:
+        beat.stop()
         emit("worker_stop", reason="exit")
 
 if __name__ == "__main__":
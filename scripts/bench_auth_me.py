@@ -0,0 +1,69 @@
+"""
+基准：/api/me 吞吐（JWT 校验缓存 开 / 关 对比）
+
+用法：
+    python -m scripts.bench_auth_me --requests 5000 --concurrency 16
+
+说明：
+- 走完整 ASGI 栈（中间件 + 依赖注入），不经网络，结果反映的是进程内开销
+- 同一个 token 反复使用，模拟自动化客户端长时间复用 token 的场景
+- “关”的一轮把 token_cache.maxsize 置 0，等价于 AUTH_TOKEN_CACHE_SIZE=0
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.core import context as ctx_mod  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.services import user_status  # noqa: E402
+
+
+async def _run(token: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                r = await client.get("/api/me", headers=headers)
+                assert r.status_code == 200, r.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def run(total: int, concurrency: int) -> dict:
+    ctx_mod.load_signing_key()
+    # bench 用户不落库；吊销检查本身只是一次 dict 查找，这里只比较验签缓存
+    user_status.MODE = "none"
+    token = create_access_token({"sub": "bench-user", "username": "bench", "role": "user"})
+    size = ctx_mod.token_cache.maxsize or 10000
+    results = {}
+    for label, maxsize in (("cache_off", 0), ("cache_on", size)):
+        ctx_mod.token_cache.maxsize = maxsize
+        ctx_mod.token_cache.clear()
+        elapsed = asyncio.run(_run(token, total, concurrency))
+        results[label] = round(total / elapsed, 1)
+        print(f"[bench_auth_me] {label:9s} {total} req in {elapsed:.3f}s → {results[label]} req/s", flush=True)
+    ctx_mod.token_cache.maxsize = size
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    run(args.requests, args.concurrency)
+    sys.exit(0)
@@ -0,0 +1,83 @@
+"""
+基准：IMPORT_CUSTOMERS 流式导入的吞吐与内存
+
+用法：
+    python -m scripts.bench_import_customers --rows 10000000
+    python -m scripts.bench_import_customers --rows 1000000 --batch-size 5000 --db-url postgresql+psycopg://u:p@host/db
+    python -m scripts.bench_import_customers --file /data/customers.csv   # 复用已生成的文件
+
+说明：
+- 先流式生成 --rows 行的 CSV（external_id,name,email,phone），再直接调用 customer_import.run_import
+- 默认每次新建 bench_import.db（SQLite）；--db-url 可指向 Postgres
+- 输出 rows/sec 与进程峰值 RSS（ru_maxrss），导入前后对比可确认内存不随文件大小增长
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import resource
+import tempfile
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+SQLITE_FILE = "bench_import.db"
+
+
+def _rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def generate(path: str, rows: int) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("external_id,name,email,phone\n")
+        for i in range(rows):
+            f.write(f"c{i},Customer {i},user{i}@example.com,+1555{i % 10000000:07d}\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--file", default="", help="使用现成的 CSV（不生成）")
+    parser.add_argument("--batch-size", type=int, default=0, help="默认 IMPORT_BATCH_SIZE")
+    parser.add_argument("--db-url", default="")
+    args = parser.parse_args()
+
+    if args.db_url:
+        os.environ["DATABASE_URL"] = args.db_url
+    else:
+        if os.path.exists(SQLITE_FILE):
+            os.remove(SQLITE_FILE)
+        os.environ["DATABASE_URL"] = f"sqlite:///./{SQLITE_FILE}"
+
+    from app.infra.db import init_db
+    from app.services import customer_import
+    init_db()
+
+    path, generated = args.file, False
+    if not path:
+        fd, path = tempfile.mkstemp(prefix="bench_customers_", suffix=".csv")
+        os.close(fd)
+        t0 = time.perf_counter()
+        generate(path, args.rows)
+        generated = True
+        print(f"[bench_import_customers] generated {args.rows} rows "
+              f"({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f}s", flush=True)
+
+    customer_import.IMPORT_UPLOAD_DIR = os.path.dirname(os.path.abspath(path))  # 本地文件只能从上传目录导入
+    rss_before = _rss_mb()
+    try:
+        out = customer_import.run_import(f"bench-{uuid.uuid4().hex[:8]}", path, batch_size=args.batch_size or None)
+    finally:
+        if generated:
+            os.remove(path)
+    print(f"[bench_import_customers] rows={out['rows']} rows_per_sec={out['rows_per_sec']} "
+          f"seconds={out['seconds']} rss_before_mb={rss_before} rss_peak_mb={_rss_mb()}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+基准：登录洪峰下的 /api/jobs 延迟（混合负载）
+
+用法：
+    python -m scripts.bench_login_mixed --seconds 10 --logins 32 --readers 8 --executor thread --workers 4
+
+说明：
+- logins 个协程不停调用 /api/login（bcrypt），readers 个协程不停轮询 /api/jobs/{id}
+- 输出登录吞吐（次/秒）与 /api/jobs 的 p50/p95/p99 延迟
+- 503（执行器饱和）单独计数：这是有界执行器的预期行为，客户端按 Retry-After 重试
+- 走进程内 ASGI（无网络），同步路由跑在 anyio 线程池上，与线上 uvicorn 一致
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.models import Job  # noqa: E402
+from app.core.models_user import User  # noqa: E402
+from app.infra.db import SessionLocal, init_db  # noqa: E402
+from scripts.seed_step5 import run as seed_users  # noqa: E402
+
+
+def _pct(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def _mixed(seconds: float, logins: int, readers: int, job_id: str, token: str) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.perf_counter() + seconds
+    stats = {"login_ok": 0, "login_busy": 0, "job_lat": []}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def login_loop():
+            while time.perf_counter() < deadline:
+                r = await client.post("/api/login", json={"username": "demo", "password": "demo"})
+                if r.status_code == 200:
+                    stats["login_ok"] += 1
+                elif r.status_code == 503:
+                    stats["login_busy"] += 1
+                    await asyncio.sleep(0.05)
+
+        async def reader_loop():
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.get(f"/api/jobs/{job_id}", headers=headers)
+                assert r.status_code == 200, r.text
+                stats["job_lat"].append((time.perf_counter() - t0) * 1000)
+
+        await asyncio.gather(*([login_loop() for _ in range(logins)] + [reader_loop() for _ in range(readers)]))
+    return stats
+
+
+def run(seconds: float, logins: int, readers: int, executor: str, workers: int, max_pending: int) -> dict:
+    init_db()
+    seed_users()
+    with SessionLocal() as db:
+        demo = db.query(User).filter(User.username == "demo").first()
+        job_id = str(uuid.uuid4())
+        Job.create_pending(db, job_id=job_id, user_id=demo.id, job_type="bench.noop")
+        token = security.create_access_token({"sub": demo.id, "username": demo.username, "role": demo.role.value})
+
+    security.password_hasher.shutdown()
+    security.password_hasher = security.PasswordHasher(executor, workers, max_pending)
+    from app.api import auth as auth_api
+    auth_api.password_hasher = security.password_hasher
+
+    stats = asyncio.run(_mixed(seconds, logins, readers, job_id, token))
+    security.password_hasher.shutdown()
+
+    lat = stats["job_lat"]
+    out = {
+        "executor": executor,
+        "workers": workers,
+        "login_per_sec": round(stats["login_ok"] / seconds, 1),
+        "login_busy_503": stats["login_busy"],
+        "jobs_reqs": len(lat),
+        "jobs_p50_ms": round(statistics.median(lat), 2) if lat else 0.0,
+        "jobs_p95_ms": round(_pct(lat, 0.95), 2),
+        "jobs_p99_ms": round(_pct(lat, 0.99), 2),
+    }
+    print(f"[bench_login_mixed] {out}", flush=True)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=32, help="并发登录协程数")
+    parser.add_argument("--readers", type=int, default=8, help="并发 /api/jobs 轮询协程数")
+    parser.add_argument("--executor", choices=["thread", "process"], default=security.PASSWORD_HASH_EXECUTOR)
+    parser.add_argument("--workers", type=int, default=security.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=security.PASSWORD_HASH_MAX_PENDING)
+    args = parser.parse_args()
+    run(args.seconds, args.logins, args.readers, args.executor, args.workers, args.max_pending)
+    sys.exit(0)
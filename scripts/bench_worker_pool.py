@@ -0,0 +1,135 @@
+"""
+基准：短作业吞吐，stock RQ Worker（每个作业 fork 一个 work horse）vs 池模式（worker_entry --pool）
+
+用法：
+    python -m scripts.bench_worker_pool --jobs 300 --workers 2
+    python -m scripts.bench_worker_pool --modes pool --workers 4 --max-jobs 100
+    python -m scripts.bench_worker_pool --redis-url redis://localhost:6379/15
+
+说明：
+- Redis：需要真实 Redis（Worker 是独立进程，进程内 fakeredis:// 无法共享；fakeredis 的 TCP 服务
+  处理不了 RQ 的二进制负载）。默认 redis://localhost:6379/15，开始前会清空其中的 RQ 队列，勿对生产库使用
+- 数据库：每次新建 SQLite 文件 bench_worker_pool.db（--db-url 可指定现成的库）
+- 作业：example.fetch_profile（不访问网络），每个作业先按 API 的方式预建 PENDING 行再入队
+- 每种模式：先把 --jobs 个作业全部入队，再以 --burst 启动 Worker（fork 模式起 --workers 个进程，
+  pool 模式起 1 个主进程 + --workers 个子进程），计时到 Worker 全部退出（含启动成本）
+- 输出：每种模式的 jobs_per_sec / wall_s / succeeded，以及 pool 相对 fork 的倍数
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import subprocess
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+SQLITE_FILE = "bench_worker_pool.db"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _prepare(jobs: int, redis_url: str) -> list:
+    """建表、准备 demo 账号，预建 PENDING 作业并入队；返回 job_id 列表。"""
+    from app.core.models import Account, Job
+    from app.core.models_user import User
+    from app.infra import redis_client
+    from app.infra.db import SessionLocal, init_db
+    from app.services.accounts import create_account
+    from app.workers import queue as queue_mod
+    from scripts.seed_step5 import run as seed_users
+
+    init_db()
+    seed_users()
+    with SessionLocal() as db:
+        demo = db.query(User).filter(User.username == "demo").first()
+        if not db.query(Account).filter(Account.user_id == demo.id, Account.site == "example",
+                                        Account.account_name == "bench").first():
+            create_account(db, demo.id, "example", "bench", {"password": "bench"})
+        user_id = demo.id
+
+    redis_client.set_redis_url(redis_url)
+    queue_mod._get_queue().empty()
+    ids = []
+    for i in range(jobs):
+        job_id = str(uuid.uuid4())
+        with SessionLocal() as db:
+            Job.create_pending(db, job_id=job_id, user_id=user_id, job_type="example.fetch_profile")
+        queue_mod.enqueue(job_id, user_id, "example.fetch_profile",
+                          {"site": "example", "account_name": "bench"}, {"uid": str(i)})
+        ids.append(job_id)
+    return ids
+
+
+def _count_done(ids: list) -> dict:
+    from sqlalchemy import func
+    from app.core.models import Job
+    from app.infra.db import SessionLocal
+    with SessionLocal() as db:
+        rows = db.query(Job.status, func.count()).filter(Job.id.in_(ids)).group_by(Job.status).all()
+    return dict(rows)
+
+
+def run_mode(mode: str, jobs: int, workers: int, max_jobs: int, redis_url: str) -> dict:
+    ids = _prepare(jobs, redis_url)
+    env = dict(os.environ, REDIS_URL=redis_url)
+    base = [sys.executable, "-m", "app.workers.worker_entry", "--burst", "--redis", redis_url, "--sites", "example"]
+    if mode == "pool":
+        cmds = [base + ["--pool", str(workers), "--max-jobs", str(max_jobs)]]
+    else:
+        cmds = [base] * workers
+    t0 = time.perf_counter()
+    procs = [subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+             for cmd in cmds]
+    errors = []
+    for p in procs:
+        _, err = p.communicate()
+        if p.returncode != 0:
+            errors.append(err.decode(errors="replace")[-2000:])
+    wall = time.perf_counter() - t0
+    counts = _count_done(ids)
+    return {
+        "mode": mode,
+        "jobs": jobs,
+        "workers": workers,
+        "succeeded": counts.get("SUCCEEDED", 0),
+        "failed": counts.get("FAILED", 0),
+        "wall_s": round(wall, 3),
+        "jobs_per_sec": round(jobs / wall, 1) if wall else 0.0,
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=2, help="fork 模式的 Worker 进程数 / pool 模式的子进程数")
+    parser.add_argument("--max-jobs", type=int, default=1000, help="pool 模式子进程回收前的作业数")
+    parser.add_argument("--modes", default="fork,pool")
+    parser.add_argument("--db-url", default="")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    args = parser.parse_args()
+
+    if args.db_url:
+        os.environ["DATABASE_URL"] = args.db_url
+    else:
+        if os.path.exists(SQLITE_FILE):
+            os.remove(SQLITE_FILE)
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(ROOT, SQLITE_FILE)}"
+    redis_url = args.redis_url
+
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        results[mode] = run_mode(mode, args.jobs, args.workers, args.max_jobs, redis_url)
+        print(f"[bench_worker_pool] {json.dumps(results[mode], ensure_ascii=False)}", flush=True)
+    if "fork" in results and "pool" in results and results["fork"]["jobs_per_sec"]:
+        speedup = results["pool"]["jobs_per_sec"] / results["fork"]["jobs_per_sec"]
+        print(f"[bench_worker_pool] pool/fork jobs_per_sec = {speedup:.2f}x", flush=True)
+    ok = all(r["succeeded"] == args.jobs and not r["errors"] for r in results.values())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# scripts/migrate.py
+"""
+数据库迁移命令行（app.infra.migrator）：
+- python -m scripts.migrate            执行全部待执行的迁移（含在线回填，输出进度）
+- python -m scripts.migrate status     列出各版本及执行时间
+可选参数：--batch-size N / --sleep SECONDS 覆盖 MIGRATE_BACKFILL_BATCH_SIZE / MIGRATE_BACKFILL_SLEEP_SECONDS。
+回填被中断（Ctrl-C、进程被杀）后重新执行即可从断点继续。
+"""
+import argparse
+import os
+import sys
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+from app.infra import migrator  # noqa: E402
+from app.infra.logger import emit  # noqa: E402
+
+
+def run(batch_size=None, sleep=None):
+    return migrator.upgrade(progress=lambda line: print(line, flush=True), batch_size=batch_size, sleep=sleep)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="apply versioned database migrations")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--sleep", type=float, default=None)
+    args = parser.parse_args(argv)
+    print(f"[migrate] DATABASE_URL={os.getenv('DATABASE_URL')}", flush=True)
+    try:
+        if args.command == "status":
+            for s in migrator.status():
+                print(f"{s['version']}  {s['name']:<32} {s['applied_at'] or 'pending'}", flush=True)
+        else:
+            done = run(args.batch_size, args.sleep)
+            print(f"[migrate] applied: {', '.join(done) or 'none (up to date)'}", flush=True)
+        return 0
+    except Exception as e:
+        emit("migrate_error", error=str(e))
+        print(f"[migrate] ERROR: {e}", file=sys.stderr, flush=True)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# scripts/migrate_step6.py
+"""
+Step6：jobs 进度 / 扇出列与列表索引（现为迁移 0003）。
+保留原入口（命令行与 run()）以兼容既有部署脚本和测试；实际执行 app.infra.migrator.upgrade()，
+即全部待执行的版本化迁移（已执行过的版本不会重复执行）。新代码直接用 scripts/migrate.py。
+"""
+import os
+import sys
+
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+from app.infra import migrator  # noqa: E402
+from app.infra.logger import emit  # noqa: E402
+
+
+def run():
+    emit("migrate_step6_begin", database_url=os.getenv("DATABASE_URL"))
+    applied = migrator.upgrade(progress=lambda line: print(line, flush=True))
+    emit("migrate_step6_done", status="ok", applied=applied)
+
+
+if __name__ == "__main__":
+    print(f"[migrate_step6] DATABASE_URL={os.getenv('DATABASE_URL')}", flush=True)
+    try:
+        run()
+        sys.exit(0)
+    except Exception as e:
+        emit("migrate_step6_error", error=str(e))
+        print(f"[migrate_step6] ERROR: {e}", file=sys.stderr, flush=True)
+        sys.exit(1)
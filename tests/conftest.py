@@ -1,6 +1,61 @@
 import sys
+import uuid
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
\ No newline at end of file
+    sys.path.insert(0, str(ROOT))
+
+
+# 共享夹具。app 模块一律在夹具里延迟导入：各测试文件要先设好 LOG_TO_FILE / SECRET_KEY / DATABASE_URL
+# 等环境变量再导入 app，conftest 不能抢先导入。
+
+@pytest.fixture
+def users():
+    """跑 Step5 / Step6 迁移并写入种子用户；返回 {username: {"id","username","role","headers"}}（demo / admin）。"""
+    from app.core import security
+    from app.core.models_user import User
+    from app.infra.db import SessionLocal
+    from scripts.migrate_step5 import run as migrate_users
+    from scripts.migrate_step6 import run as migrate_step6
+    from scripts.seed_step5 import run as seed_users
+
+    migrate_users(); migrate_step6(); seed_users()
+    out = {}
+    with SessionLocal() as db:
+        for u in db.query(User).filter(User.username.in_(["demo", "admin"])):
+            token = security.create_access_token({"sub": u.id, "username": u.username, "role": u.role.value})
+            out[u.username] = {"id": u.id, "username": u.username, "role": u.role.value,
+                               "headers": {"Authorization": f"Bearer {token}"}}
+    return out
+
+
+@pytest.fixture
+def demo(users):
+    return users["demo"]
+
+
+@pytest.fixture
+def demo_account(demo):
+    """demo 名下一个 example 站点账号（密码 pw），返回 account_name。"""
+    from app.infra.db import SessionLocal
+    from app.services.accounts import create_account
+
+    name = f"acct-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        create_account(db, demo["id"], "example", name, {"password": "pw"})
+    return name
+
+
+@pytest.fixture
+def fake_redis():
+    """切到进程内 fakeredis 并清空，返回连接（即队列用的连接）；结束后切回原 REDIS_URL。"""
+    from app.infra import redis_client
+
+    old = redis_client.set_redis_url("fakeredis://")
+    conn = redis_client.get_redis()
+    conn.flushdb()
+    yield conn
+    redis_client.set_redis_url(old)
@@ -0,0 +1,101 @@
+# tests/test_account_cache.py
+# 账户解析缓存：同一账户重复派发只查一次库；负缓存；创建 / 修改 / 删除后失效；查库与失效并发时不写回旧值
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.core.models import Job
+from app.infra.db import SessionLocal, engine
+from app.services import account_cache, accounts as acct_svc
+from app.services.secrets import decrypt_str
+from app.workers import dispatcher
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(demo, fake_redis):
+    return {"demo_id": demo["id"], "headers": demo["headers"]}
+
+
+class _AccountQueries:
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM accounts" in statement:
+            self.count += 1
+
+
+def test_repeated_dispatches_hit_db_once(env):
+    name = f"cache-{uuid.uuid4().hex[:8]}"
+    selector = {"site": "example", "account_name": name}
+    with SessionLocal() as db:
+        acct_svc.create_account(db, env["demo_id"], "example", name, {"password": "pw"})
+        job_ids = [str(uuid.uuid4()) for _ in range(5)]
+        for job_id in job_ids:
+            Job.create_pending(db, job_id=job_id, user_id=env["demo_id"], job_type="example.fetch_profile")
+    with _AccountQueries() as q:
+        for job_id in job_ids:
+            out = dispatcher.run_job(job_id, env["demo_id"], "example", "fetch_profile", selector, {"uid": "1"})
+            assert out["ok"], out
+    assert q.count == 1
+
+
+def test_negative_cache_and_invalidation(env):
+    name = f"neg-{uuid.uuid4().hex[:8]}"
+    selector = {"site": "example", "account_name": name}
+    with SessionLocal() as db, _AccountQueries() as q:
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                acct_svc.resolve(db, env["demo_id"], selector)
+        assert q.count == 1
+
+        acc = acct_svc.create_account(db, env["demo_id"], "example", name, {"password": "old"})
+        assert acct_svc.resolve(db, env["demo_id"], selector).id == acc.id  # 负缓存已失效
+
+    r = client.patch(f"/api/accounts/{acc.id}", headers=env["headers"], json={"secrets": {"password": "new"}})
+    assert r.status_code == 200
+    with SessionLocal() as db:
+        assert decrypt_str(acct_svc.resolve(db, env["demo_id"], selector).secret_encrypted) == {"password": "new"}
+
+    assert client.delete(f"/api/accounts/{acc.id}", headers=env["headers"]).status_code == 200
+    assert client.delete(f"/api/accounts/{acc.id}", headers=env["headers"]).status_code == 404
+    with SessionLocal() as db, pytest.raises(ValueError):
+        acct_svc.resolve(db, env["demo_id"], selector)
+
+
+def test_invalidation_during_db_read_is_not_overwritten(env):
+    name = f"race-{uuid.uuid4().hex[:8]}"
+    uid = env["demo_id"]
+    selector = {"site": "example", "account_name": name}
+
+    # resolve 未命中、查库没查到；提交 put 之前账户被创建并失效 → 负缓存不能写回
+    hit, _, gen = account_cache.get(uid, "example", name)
+    assert not hit and gen is not None
+    with SessionLocal() as db:
+        acc = acct_svc.create_account(db, uid, "example", name, {"password": "old"})
+    assert account_cache.put(uid, "example", name, None, gen) is False
+    with SessionLocal() as db:
+        stale = acct_svc.resolve(db, uid, selector)
+        assert stale.id == acc.id
+
+    # 同理：查到旧密文之后密钥被轮换 → 旧密文不能写回
+    account_cache.invalidate([(uid, "example", name)])
+    _, _, gen = account_cache.get(uid, "example", name)
+    with SessionLocal() as db:
+        acct_svc.update_secrets(db, uid, acc.id, {"password": "new"})
+    assert account_cache.put(uid, "example", name, stale.__dict__, gen) is False
+    with SessionLocal() as db:
+        assert decrypt_str(acct_svc.resolve(db, uid, selector).secret_encrypted) == {"password": "new"}
+    assert account_cache.get(uid, "example", name)[0]  # 没有并发失效时照常写入
@@ -0,0 +1,127 @@
+# tests/test_accounts_listing.py
+# 账户列表：键集分页（管理员全量 / 普通用户本人）、非法游标、流式导出、只查投影列；批量导入逐行结果、请求体上限
+import os, json, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.api import accounts as accounts_api
+from app.core.models_user import User
+from app.infra.db import SessionLocal, engine
+from app.services.accounts import create_account, resolve
+from app.services.secrets import decrypt_str
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(users):
+    site = f"list{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        for i in range(7):
+            create_account(db, users["demo"]["id"], site, f"d{i}", {"password": "pw"})
+        for i in range(3):
+            create_account(db, users["admin"]["id"], site, f"a{i}", {"password": "pw"})
+    return {"site": site, "headers": {n: u["headers"] for n, u in users.items()}}
+
+
+def _all_pages(headers, site, limit):
+    names, cursor, pages = [], None, 0
+    while True:
+        params = {"site": site, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/api/accounts", headers=headers, params=params)
+        assert r.status_code == 200, r.text
+        pages += 1
+        names += [a["account_name"] for a in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return names, pages
+
+
+def test_keyset_pages_cover_everything_once(env):
+    names, pages = _all_pages(env["headers"]["admin"], env["site"], 3)
+    assert sorted(names) == sorted([f"d{i}" for i in range(7)] + [f"a{i}" for i in range(3)])
+    assert pages == 4
+    assert names[:3] == ["a2", "a1", "a0"]  # 新建的在前
+
+    names, pages = _all_pages(env["headers"]["demo"], env["site"], 5)
+    assert sorted(names) == [f"d{i}" for i in range(7)] and pages == 2
+
+    r = client.get("/api/accounts", headers=env["headers"]["demo"], params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def test_export_streams_json_and_skips_secrets(env):
+    statements = []
+
+    def _capture(conn, cursor, statement, *args):
+        if "FROM accounts" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        r = client.get("/api/accounts/export", headers=env["headers"]["admin"], params={"site": env["site"]})
+        client.get("/api/accounts", headers=env["headers"]["demo"], params={"site": env["site"]})
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/json")
+    assert len(r.json()) == 10 and set(r.json()[0]) == {"id", "site", "account_name"}
+    assert statements and not any("secret_encrypted" in s for s in statements)
+
+    r = client.get("/api/accounts/export", headers=env["headers"]["demo"], params={"site": "no-such-site"})
+    assert r.json() == []
+
+
+def _import(headers, body, **params):
+    r = client.post("/api/accounts/import", headers=headers, params=params, content=body)
+    assert r.status_code == 200, r.text
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+def test_bulk_import_reports_rows_and_round_trips_export(env, monkeypatch):
+    site = env["site"]
+    ndjson = "\n".join(json.dumps(r) for r in [
+        {"site": site, "account_name": "n1", "secrets": {"password": "p1"}},
+        {"site": site, "account_name": "d0", "secrets": {"password": "x"}},   # 已存在
+        {"site": site, "account_name": "n1", "secrets": {"password": "p2"}},  # 文件内重复
+        {"site": site, "account_name": "", "secrets": {"password": "x"}},
+        {"site": site, "account_name": "n2", "secrets": {"password": "p3"}},
+    ]) + "\nnot json\n"
+    rows, summary = _import(env["headers"]["demo"], ndjson)
+    assert [r["status"] for r in rows if r["status"] != "invalid"] == ["created", "conflict", "conflict", "created"]
+    assert [r["line"] for r in rows if r["status"] == "invalid"] == [4, 6]
+    assert summary["rows"] == 6 and summary["created"] == 2 and summary["conflicts"] == 2 and summary["invalid"] == 2
+
+    with SessionLocal() as db:
+        demo_id = db.query(User).filter(User.username == "demo").one().id
+        acc = resolve(db, demo_id, {"site": site, "account_name": "n1"})
+        assert acc.id == next(r["id"] for r in rows if r["status"] == "created" and r["account_name"] == "n1")
+        assert decrypt_str(acc.secret_encrypted) == {"password": "p1"}
+
+    csv_body = f"site,account_name,password,token\n{site},c1,pw,\n{site},c2,pw,tk\n{site},n2,pw,\n"
+    rows, summary = _import(env["headers"]["demo"], csv_body, format="csv")
+    assert [(r["line"], r["status"]) for r in rows] == [(2, "created"), (3, "created"), (4, "conflict")]
+    r = client.post("/api/accounts/import", headers=env["headers"]["demo"], params={"format": "csv"},
+                    content="name\nx\n")
+    assert r.status_code == 400
+    monkeypatch.setattr(accounts_api, "ACCOUNT_IMPORT_MAX_BYTES", 64)
+    r = client.post("/api/accounts/import", headers=env["headers"]["demo"], params={"format": "csv"},
+                    content=csv_body * 4)
+    assert r.status_code == 413
+    r = client.post("/api/accounts/import", headers=env["headers"]["demo"], params={"format": "csv"},
+                    content=iter([csv_body.encode()] * 4))  # 分块发送、没有 Content-Length
+    assert r.status_code == 413
+    monkeypatch.undo()
+
+    r = client.get("/api/accounts/export", headers=env["headers"]["demo"], params={"site": site, "format": "csv"})
+    lines = r.text.splitlines()
+    assert lines[0] == "id,site,account_name" and len(lines) == 1 + 7 + 4
+    r = client.get("/api/accounts/export", headers=env["headers"]["demo"], params={"site": site, "format": "ndjson"})
+    assert {json.loads(l)["account_name"] for l in r.text.splitlines()} >= {"n1", "n2", "c1", "c2"}
@@ -0,0 +1,132 @@
+# tests/test_admission.py
+# 准入控制：每用户 / 全局令牌桶 429 + Retry-After；积压时拒绝低优先级命令；被拒请求不写 command_requests / jobs；
+# 幂等重试与被削峰的请求不扣令牌；校验不通过的命令同样不写库
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.models import CommandRequest, Job
+from app.infra.db import SessionLocal
+from app.services import admission
+from app.workers import lanes, queue as queue_mod
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_DEPTH_CACHE_SECONDS", 0)
+    return {"headers": demo["headers"], "account": demo_account, "user_id": demo["id"],
+            "queue": queue_mod._get_queue()}
+
+
+def _submit(env, key=None, **extra):
+    key = key or f"adm-{uuid.uuid4()}"
+    body = {"type": "example.fetch_profile", "idempotency_key": key,
+            "account_selector": {"site": "example", "account_name": env["account"]}, "payload": {"uid": "1"}}
+    body.update(extra)
+    return key, client.post("/api/commands", headers=env["headers"], json=body)
+
+
+def _rows_for(key):
+    with SessionLocal() as db:
+        return db.query(CommandRequest).filter(CommandRequest.key == key).count()
+
+
+def test_user_bucket_returns_429_before_any_write(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_USER_RATE", 0.5)
+    monkeypatch.setattr(admission, "ADMISSION_USER_BURST", 2)
+    with SessionLocal() as db:
+        jobs_before = db.query(Job).count()
+
+    assert [_submit(env)[1].status_code for _ in range(2)] == [200, 200]
+    key, r = _submit(env)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) == 2
+    assert _rows_for(key) == 0
+    with SessionLocal() as db:
+        assert db.query(Job).count() == jobs_before + 2
+    assert queue_mod._get_queue("high").count == 2
+
+
+def test_global_bucket_does_not_charge_user_bucket(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_GLOBAL_RATE", 1)
+    monkeypatch.setattr(admission, "ADMISSION_GLOBAL_BURST", 1)
+    conn = env["queue"].connection
+    admission.admit("someone-else", conn=conn)
+    with pytest.raises(admission.AdmissionRejected) as exc:
+        admission.admit(env["user_id"], conn=conn)
+    assert (exc.value.status, exc.value.reason) == (429, "global_rate")
+    assert not conn.exists(f"admission:user:{env['user_id']}")
+
+
+def test_backlog_sheds_low_priority_only(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_SHED_DEPTH", 2)
+    assert [_submit(env)[1].status_code for _ in range(2)] == [200, 200]
+
+    key, r = _submit(env, items=[{"uid": "1"}, {"uid": "2"}])
+    assert r.status_code == 503 and r.headers["Retry-After"] == str(admission.ADMISSION_SHED_RETRY_AFTER)
+    assert _rows_for(key) == 0
+    assert _submit(env)[1].status_code == 200  # 单条交互命令不受影响
+
+    queue_mod._get_queue("high").empty()
+    assert _submit(env, items=[{"uid": "1"}])[1].status_code == 200
+
+
+def test_deep_backlog_sheds_high_lane_too(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_SHED_DEPTH", 1)
+    monkeypatch.setattr(admission, "ADMISSION_SHED_DEPTH_HIGH", 3)
+    assert [_submit(env)[1].status_code for _ in range(3)] == [200, 200, 200]
+    key, r = _submit(env)
+    assert r.status_code == 503 and _rows_for(key) == 0
+
+
+def test_idempotent_retry_is_not_rate_limited(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_USER_RATE", 0.01)
+    monkeypatch.setattr(admission, "ADMISSION_USER_BURST", 1)
+    key, r = _submit(env)
+    assert r.status_code == 200
+    again = _submit(env, key=key)[1]
+    assert again.status_code == 200 and again.json()["job_id"] == r.json()["job_id"]
+    assert _submit(env)[1].status_code == 429  # 新命令照常限流
+    assert queue_mod._get_queue("high").count == 1
+
+
+def test_shed_request_does_not_consume_tokens(env, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_USER_RATE", 0.01)
+    monkeypatch.setattr(admission, "ADMISSION_USER_BURST", 1)
+    monkeypatch.setattr(admission, "ADMISSION_SHED_DEPTH", 1)
+    conn = env["queue"].connection
+    backlog = f"rq:queue:{lanes.worker_queue_names()[-1]}"
+    conn.rpush(backlog, "x")
+    for _ in range(3):
+        assert _submit(env, items=[{"uid": "1"}])[1].status_code == 503
+    assert not conn.exists(f"admission:user:{env['user_id']}")
+
+    conn.delete(backlog)
+    assert _submit(env, items=[{"uid": "1"}])[1].status_code == 200
+
+
+def test_invalid_commands_are_rejected_before_any_write(env):
+    with SessionLocal() as db:
+        jobs_before = db.query(Job).count()
+    key, r = _submit(env, type="NOPE")
+    assert r.status_code == 400 and r.json()["detail"] == "Unknown command type"
+    assert _rows_for(key) == 0
+    key, r = _submit(env, account_selector=None)
+    assert r.status_code == 400 and "account_selector" in r.json()["detail"]
+    assert _rows_for(key) == 0
+    with SessionLocal() as db:
+        assert db.query(Job).count() == jobs_before
+
+
+def test_redis_failure_fails_open():
+    class _Down:
+        def register_script(self, _):
+            raise ConnectionError("redis down")
+
+    assert admission.admit("anyone", low_priority=True, conn=_Down()) is None
@@ -0,0 +1,66 @@
+# tests/test_auth_revocation.py
+# 统一鉴权依赖：活跃检查走缓存表（热路径零 SQL），管理员停用后 token 立即失效
+import os, time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from passlib.hash import bcrypt
+
+from app.main import app
+from app.infra.db import engine
+from app.services import user_status
+from scripts.migrate_step5 import run as migrate_users
+from scripts.seed_step5 import run as seed_users
+
+client = TestClient(app)
+
+
+def _login(username: str, password: str) -> str:
+    r = client.post("/api/login", json={"username": username, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_deactivated_user_is_rejected_without_per_request_sql(monkeypatch):
+    monkeypatch.setattr(user_status, "MODE", "interval")
+    migrate_users(); seed_users()
+
+    uname = f"revoke_{int(time.time()*1000)}"
+    uid = f"{uname}-id"
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (id, username, password_hash, role, is_active, created_at)
+            VALUES (:id, :un, :ph, 'user', 1, CURRENT_TIMESTAMP)
+        """), {"id": uid, "un": uname, "ph": bcrypt.hash("pw")})
+
+    token = _login(uname, "pw")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/me", headers=headers).status_code == 200
+
+    statements = []
+    listener = lambda *a, **kw: statements.append(a[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        for _ in range(5):
+            assert client.get("/api/me", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any("users" in s for s in statements), statements
+
+    admin = {"Authorization": f"Bearer {_login('admin', 'admin')}"}
+    r = client.patch(f"/api/admin/users/{uid}", headers=admin, json={"is_active": False})
+    assert r.status_code == 200, r.text
+    assert client.get("/api/me", headers=headers).status_code == 401
+
+    r = client.patch(f"/api/admin/users/{uid}", headers=admin, json={"is_active": True})
+    assert r.status_code == 200
+    assert client.get("/api/me", headers=headers).status_code == 200
+
+
+def test_admin_endpoint_requires_admin():
+    token = _login("demo", "demo")
+    r = client.patch("/api/admin/users/whatever", headers={"Authorization": f"Bearer {token}"},
+                     json={"is_active": False})
+    assert r.status_code == 403
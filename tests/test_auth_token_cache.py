@@ -0,0 +1,65 @@
+# tests/test_auth_token_cache.py
+# get_context 的 token 缓存：同一 token 只做一次 jwt.decode；过期 token 不会被缓存放行
+import os
+import time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import context as ctx_mod
+from app.core.context import Context, TokenCache
+from app.services import user_status
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _trust_claims(monkeypatch):
+    # 这里的 token 指向不存在的用户，只测验签缓存，不测吊销
+    monkeypatch.setattr(user_status, "MODE", "none")
+
+
+def _token(exp_delta: int) -> str:
+    ctx_mod.load_signing_key()
+    payload = {"sub": "cache-user", "username": "cache", "role": "user", "exp": int(time.time()) + exp_delta}
+    return jwt.encode(payload, ctx_mod._get_secret(), algorithm=ctx_mod.ALGO)
+
+
+def test_repeated_requests_decode_once(monkeypatch):
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*a, **kw):
+        calls.append(1)
+        return real_decode(*a, **kw)
+
+    monkeypatch.setattr(ctx_mod.jwt, "decode", counting_decode)
+    token = _token(600)
+    for _ in range(5):
+        r = client.get("/api/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 200, r.text
+        assert r.json()["user"] == "cache"
+    assert len(calls) == 1
+
+
+def test_expired_token_rejected_every_time():
+    token = _token(-10)
+    for _ in range(2):
+        r = client.get("/api/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 401
+
+
+def test_cache_is_bounded_and_honours_exp():
+    cache = TokenCache(maxsize=2)
+    now = time.time()
+    ctx = Context(user_id="u")
+    for i in range(3):
+        cache.put(TokenCache.key(f"t{i}"), now + 60, ctx)
+    assert len(cache) == 2
+    assert cache.get(TokenCache.key("t0"), now) is None   # 最早的被淘汰
+    assert cache.get(TokenCache.key("t2"), now) is ctx
+    assert cache.get(TokenCache.key("t2"), now + 61) is None  # 过期即失效
@@ -0,0 +1,122 @@
+# tests/test_batch_commands.py
+# 批量命令：perform_many 默认回退 / 原生实现；一个作业分块并发执行、逐项结果按序；API 入队 run_batch_job
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import security
+from app.core.models import Job
+from app.core.models_user import User
+from app.connectors.base import BaseConnector, ActionResult, LoginResult
+from app.connectors.example_site.client import ExampleConnector
+from app.infra import redis_client
+from app.infra.db import SessionLocal, init_db
+from app.services.accounts import create_account
+from app.services import job_progress
+from app.workers import dispatcher, queue as queue_mod
+from scripts.migrate_step5 import run as migrate_users
+from scripts.seed_step5 import run as seed_users
+
+client = TestClient(app)
+
+
+class _FlakyConnector(BaseConnector):
+    site = "flaky"
+    supported_actions = {"echo"}
+
+    def login(self, account, secrets, *, backend="httpx"):
+        return LoginResult(ok=True)
+
+    def perform(self, action, payload, session):
+        if payload.get("boom"):
+            raise RuntimeError("boom")
+        return ActionResult(ok=True, data=payload)
+
+
+def test_default_perform_many_loops_and_isolates_errors():
+    res = _FlakyConnector().perform_many("echo", [{"x": 1}, {"boom": True}, {"x": 3}], None)
+    assert [r.ok for r in res] == [True, False, True]
+    assert res[1].error == "boom" and res[2].data == {"x": 3}
+
+
+def test_example_native_perform_many():
+    res = ExampleConnector().perform_many("fetch_profile", [{"uid": "1"}, {}, {"uid": "3"}], None)
+    assert [r.ok for r in res] == [True, False, True]
+    assert res[2].data["uid"] == "3"
+
+
+def _demo_with_account():
+    migrate_users(); init_db(); seed_users()
+    name = f"batch-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        demo = db.query(User).filter(User.username == "demo").first()
+        create_account(db, demo.id, "example", name, {"password": "pw"})
+        return {"id": demo.id, "username": demo.username, "role": demo.role.value}, name
+
+
+def test_batch_job_chunks_and_keeps_order(monkeypatch):
+    demo, name = _demo_with_account()
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=demo["id"], job_type="example.fetch_profile")
+    monkeypatch.setattr(dispatcher, "BATCH_CHUNK_SIZE", 7)
+    monkeypatch.setattr(dispatcher, "BATCH_CONCURRENCY", 3)
+
+    items = [{"uid": str(i)} for i in range(50)]
+    items[20] = {}  # 非法项只影响自己
+    out = dispatcher.run_batch_job(job_id, demo["id"], "example", "fetch_profile",
+                                   {"site": "example", "account_name": name}, items)
+
+    assert out["ok"] and out["total"] == 50 and out["failed"] == 1
+    assert "results" not in out  # RQ 返回值只有摘要，逐项结果在 job_results
+    with SessionLocal() as db:
+        rows = [r["data"] for r in job_progress.page_results(db, job_id, limit=100)["items"]]
+    assert [r["index"] for r in rows] == list(range(50))
+    assert rows[49]["data"]["uid"] == "49"
+    assert not rows[20]["ok"]
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        assert job.status == "SUCCEEDED" and job.error == "1 of 50 items failed"
+
+
+def test_batch_job_streams_chunks_to_callback():
+    demo, name = _demo_with_account()
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=demo["id"], job_type="example.fetch_profile")
+    seen = []
+    out = dispatcher._run_batch_job(job_id, demo["id"], "example", "fetch_profile",
+                                    {"site": "example", "account_name": name},
+                                    [{"uid": str(i)} for i in range(250)],
+                                    on_chunk=lambda offset, rows: seen.append((offset, len(rows))), collect=True)
+    assert seen == [(0, 100), (100, 100), (200, 50)]
+    assert [r["index"] for r in out["results"]] == list(range(250)) and out["succeeded"] == 250
+
+
+def test_submit_batch_enqueues_single_job():
+    demo, name = _demo_with_account()
+    token = security.create_access_token({"sub": demo["id"], "username": demo["username"], "role": demo["role"]})
+    old = redis_client.set_redis_url("fakeredis://")
+    try:
+        q = queue_mod._get_queue()
+        q.empty()
+        r = client.post("/api/commands", headers={"Authorization": f"Bearer {token}"}, json={
+            "type": "example.fetch_profile", "idempotency_key": f"batch-{uuid.uuid4()}",
+            "account_selector": {"site": "example", "account_name": name},
+            "items": [{"uid": str(i)} for i in range(5)],
+        })
+        assert r.status_code == 200, r.text
+        assert q.count == 1
+        rq_job = q.jobs[0]
+        assert rq_job.func_name.endswith("run_batch_job") and len(rq_job.kwargs["items"]) == 5
+
+        r = client.post("/api/commands", headers={"Authorization": f"Bearer {token}"}, json={
+            "type": "example.fetch_profile", "idempotency_key": f"batch-{uuid.uuid4()}",
+            "account_selector": {"site": "example", "account_name": name}, "items": [],
+        })
+        assert r.status_code == 400
+    finally:
+        redis_client.set_redis_url(old)
@@ -0,0 +1,32 @@
+# tests/test_bench_pipeline.py
+# 流水线基准冒烟：fakeredis 入队 → 线程 Worker 执行 run_job → 轮询到 SUCCEEDED；回归判定
+import os
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.infra import redis_client
+from scripts import bench_pipeline
+from scripts.migrate_step5 import run as migrate_users
+
+
+def test_pipeline_smoke():
+    migrate_users()
+    before = redis_client.REDIS_URL
+    out = bench_pipeline.run(commands=3, concurrency=1, workers=1, poll_ms=5)
+    assert out["succeeded"] == 3
+    assert out["http_errors"] == 0 and out["worker_errors"] == 0
+    # create_request + link + create_pending + Job.start + Job.finish（首个作业还要落会话）
+    assert out["commits_per_cmd"] >= 5
+    assert out["log_bytes_per_cmd"] > 0
+    assert redis_client.REDIS_URL == before
+
+
+def test_compare_flags_regressions_only():
+    base = {"submit_per_sec": 100, "commits_per_cmd": 5, "log_bytes_per_cmd": 1000}
+    ok = {"submit_per_sec": 90, "commits_per_cmd": 5, "log_bytes_per_cmd": 1100, "e2e_p95_ms": 999}
+    assert bench_pipeline.compare(ok, base, 0.2) == []
+
+    bad = {"submit_per_sec": 70, "commits_per_cmd": 7, "log_bytes_per_cmd": 1000}
+    keys = [k for k, _, _ in bench_pipeline.compare(bad, base, 0.2)]
+    assert keys == ["submit_per_sec", "commits_per_cmd"]
+    assert bench_pipeline.compare(bad, base, 0.2, keys=["log_bytes_per_cmd"]) == []
@@ -0,0 +1,90 @@
+# tests/test_bulk_test_login.py
+# 批量测试登录：按 site / selectors 选账户、经 RQ 在 Worker 上执行、按站点限并发、会话落库、结果流式读取
+import os, json, uuid, threading, time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from rq import SimpleWorker
+
+from app.main import app
+from app.core.models import Session as SessionModel
+from app.infra.db import SessionLocal
+from app.services import site_slots
+from app.services.accounts import create_account
+from app.workers import lanes, queue as queue_mod
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(demo, fake_redis):
+    prefix = f"bulk-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        ids = [create_account(db, demo["id"], "example", f"{prefix}-{i}", {"password": "pw"}).id for i in range(5)]
+        ids.append(create_account(db, demo["id"], "example", f"{prefix}-nopw", {"user": "x"}).id)
+    return {"headers": demo["headers"], "prefix": prefix, "ids": ids, "conn": fake_redis}
+
+
+def test_site_slot_caps_concurrency(env):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with site_slots.site_slot("capped", conn=env["conn"], limit=2):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert env["conn"].zcard("site_slots:capped") == 0
+
+
+def test_site_slot_wait_is_bounded(env, monkeypatch):
+    monkeypatch.setattr(site_slots, "SITE_SLOT_WAIT_SECONDS", 0.2)
+    with site_slots.site_slot("busy", conn=env["conn"], limit=1):
+        started = time.monotonic()
+        with pytest.raises(site_slots.SiteBusy):
+            with site_slots.site_slot("busy", conn=env["conn"], limit=1):
+                pass
+        assert 0.2 <= time.monotonic() - started < 1
+    assert env["conn"].zcard("site_slots:busy") == 0
+
+
+def test_bulk_test_login_runs_as_job(env):
+    selectors = [{"site": "example", "account_name": f"{env['prefix']}-{i}"} for i in range(5)]
+    selectors += [{"site": "example", "account_name": f"{env['prefix']}-nopw"},
+                  {"site": "example", "account_name": "missing"}]
+    r = client.post("/api/accounts/test_login/bulk", headers=env["headers"], json={"selectors": selectors})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["accounts"] == 6 and body["not_found"] == [{"site": "example", "account_name": "missing"}]
+    job_id = body["job_id"]
+    assert queue_mod._get_queue(lanes.resolve(None, "user", bulk=True)).count == 1
+
+    queues = [queue_mod._get_queue(lane) for lane in lanes.LANES]
+    SimpleWorker(queues, connection=env["conn"]).work(burst=True)
+
+    job = client.get(f"/api/jobs/{job_id}", headers=env["headers"]).json()
+    assert job["status"] == "SUCCEEDED" and job["result"] == {"total": 6, "succeeded": 5, "failed": 1}
+    assert job["progress"]["processed"] == 6
+
+    r = client.get(f"/api/jobs/{job_id}/results/stream", headers=env["headers"])
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert lines[-1]["job"]["status"] == "SUCCEEDED"
+    results = {row["data"]["account_name"]: row["data"] for row in lines[:-1]}
+    assert len(results) == 6 and results[f"{env['prefix']}-nopw"]["need_user_action"] is True
+    with SessionLocal() as db:
+        cached = db.query(SessionModel).filter(SessionModel.account_id.in_(env["ids"])).count()
+    assert cached == 5
+
+    r = client.post("/api/accounts/test_login/bulk", headers=env["headers"], json={})
+    assert r.status_code == 400
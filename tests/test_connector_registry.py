@@ -0,0 +1,58 @@
+# tests/test_connector_registry.py
+# 连接器懒加载：发现站点不 import；首次 get_connector 才 import 并记录耗时 / 内存；预热与未知站点
+import os, sys, textwrap
+os.environ.setdefault("LOG_TO_FILE", "false")
+
+import pytest
+
+from app.connectors import registry
+from app.connectors.base import BaseConnector
+
+
+def test_directory_discovery_finds_example():
+    assert registry._discover_dirs()["example"] == "app.connectors.example_site.client"
+    assert "example" in registry.available_sites()
+
+
+def test_lazy_import_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "lazy_site_plugin.py").write_text(textwrap.dedent("""
+        from app.connectors.base import BaseConnector, ActionResult, LoginResult
+        class LazyConnector(BaseConnector):
+            site = "lazy"
+            supported_actions = {"noop"}
+            def login(self, account, secrets, *, backend="httpx"):
+                return LoginResult(ok=True)
+            def perform(self, action, payload, session):
+                return ActionResult(ok=True)
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry.register("lazy", "lazy_site_plugin")
+    try:
+        assert "lazy" in registry.available_sites()
+        assert "lazy_site_plugin" not in sys.modules
+
+        cls = registry.get_connector("lazy")
+        assert issubclass(cls, BaseConnector) and cls.site == "lazy"
+        assert "lazy_site_plugin" in sys.modules
+
+        report = registry.preload(["lazy"])
+        assert report[0]["site"] == "lazy"
+        assert report[0]["import_ms"] >= 0 and "mem_kb" in report[0]
+        assert registry.get_connector("lazy") is cls
+    finally:
+        registry.REGISTRY.pop("lazy", None)
+        registry._SPECS.pop("lazy", None)
+        registry._REPORT.pop("lazy", None)
+        sys.modules.pop("lazy_site_plugin", None)
+
+
+def test_unknown_site_raises_keyerror():
+    with pytest.raises(KeyError):
+        registry.get_connector("no_such_site")
+    with pytest.raises(KeyError):
+        registry.preload(["no_such_site"])
+
+
+def test_parse_sites():
+    assert registry.parse_sites(" example, foo ,") == ["example", "foo"]
+    assert registry.parse_sites("") == []
@@ -0,0 +1,113 @@
+# tests/test_customer_import.py
+# 流式导入：分批校验 + upsert（重复导入只更新不重复）、进度写回 jobs.processed、缺列整体失败；
+# 来源限制（只允许公网 http(s) 与上传目录内的本地文件，重定向逐跳校验，连接校验过的 IP）与 batch_size 校验
+import os, socket, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.core.models import Job
+from app.infra.db import SessionLocal, engine, init_db
+from app.services import customer_import
+from scripts.migrate_step6 import run as migrate_step6
+
+
+def _csv(tmp_path, body: str):
+    f = tmp_path / f"{uuid.uuid4().hex}.csv"
+    f.write_text("external_id,name,email,phone,extra\n" + body)
+    return f
+
+
+def _customers(user_id):
+    with engine.begin() as conn:
+        return {r.external_id: (r.name, r.email) for r in conn.execute(
+            text("SELECT external_id, name, email FROM customers WHERE user_id = :u"), {"u": user_id})}
+
+
+def test_import_validates_batches_and_upserts(tmp_path, monkeypatch):
+    migrate_step6(); init_db()
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(customer_import, "IMPORT_PROGRESS_SECONDS", 0)
+    user_id, job_id = f"imp-{uuid.uuid4().hex[:8]}", str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=user_id, job_type="IMPORT_CUSTOMERS")
+
+    f = _csv(tmp_path, "c1,Alice,a@x.io,1,z\n,NoId,n@x.io,,\nc2,Bob,not-an-email,,\nc3,Carol,,,\nc1,Alice2,a2@x.io,,\n")
+    out = customer_import.run_import(user_id, str(f), job_id=job_id, batch_size=2)
+    assert (out["rows"], out["invalid"]) == (5, 2)
+    assert [e["line"] for e in out["errors"]] == [3, 4]
+    assert _customers(user_id) == {"c1": ("Alice2", "a2@x.io"), "c3": ("Carol", "")}
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT processed FROM jobs WHERE id = :id"), {"id": job_id}).scalar() == 5
+
+    # 再导一次（file:// 形式）：已有行更新、新行插入，不产生重复
+    f2 = _csv(tmp_path, "c3,Caroline,c@x.io,,\nc4,Dan,,,\n")
+    customer_import.run_import(user_id, f2.as_uri())
+    assert _customers(user_id) == {"c1": ("Alice2", "a2@x.io"), "c3": ("Caroline", "c@x.io"), "c4": ("Dan", "")}
+
+
+def test_import_rejects_bad_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", str(tmp_path))
+    bad = tmp_path / "bad.csv"
+    bad.write_text("id,name\n1,x\n")
+    with pytest.raises(customer_import.ImportFileError):
+        customer_import.run_import("u", str(bad))
+    with pytest.raises(customer_import.ImportFileError):
+        customer_import.run_import("u", str(tmp_path / "missing.csv"))
+
+
+def test_source_and_batch_size_are_restricted(tmp_path, monkeypatch):
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", "")
+    inside = _csv(tmp_path, "c1,A,,,\n")
+    for source in ("/etc/passwd", "file:///etc/hostname", str(inside), "ftp://93.184.216.34/x.csv",
+                   "http://127.0.0.1/x.csv", "http://169.254.169.254/latest", "https://10.0.0.5/x.csv",
+                   "http://[::1]/x.csv", "http://[::ffff:192.168.1.1]/x.csv"):
+        with pytest.raises(customer_import.ImportFileError, match="not allowed"):
+            customer_import.check_source(source)
+
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", str(tmp_path))
+    assert customer_import.check_source(inside.as_uri()) == os.path.realpath(inside)
+    (tmp_path / "link.csv").symlink_to("/etc/hostname")
+    for source in ("/etc/passwd", str(tmp_path / ".." / "x.csv"), str(tmp_path / "link.csv")):
+        with pytest.raises(customer_import.ImportFileError, match="not allowed"):  # 存在与否都同一个错误
+            customer_import.check_source(source)
+
+    for bad in ("100", 0, -1, 10 ** 9, True, 1.5):
+        with pytest.raises(customer_import.ImportFileError, match="batch_size"):
+            customer_import.validate_payload({"file_url": str(inside), "batch_size": bad})
+    customer_import.validate_payload({"file_url": str(inside), "batch_size": 100})
+
+
+def test_download_rechecks_every_redirect(monkeypatch):
+    def _handler(request):
+        if request.url.host == "93.184.216.34":
+            return httpx.Response(302, headers={"location": "http://127.0.0.1/secret.csv"})
+        return httpx.Response(200, text="external_id\nleak\n")
+
+    client = httpx.Client(transport=httpx.MockTransport(_handler))
+    monkeypatch.setattr(customer_import, "get_http_client", lambda: client)
+    with pytest.raises(customer_import.ImportFileError, match="not allowed"):
+        with customer_import.download("http://93.184.216.34/start.csv"):
+            pass
+
+
+def test_download_connects_to_the_checked_address(monkeypatch):
+    answers = iter(["93.184.216.34", "127.0.0.1"])  # 第二次解析被重绑定到内网
+
+    def _getaddrinfo(host, *a, **kw):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (next(answers), 0))]
+
+    seen = []
+
+    def _handler(request):
+        seen.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        return httpx.Response(200, text="external_id\nc1\n")
+
+    monkeypatch.setattr(customer_import.socket, "getaddrinfo", _getaddrinfo)
+    client = httpx.Client(transport=httpx.MockTransport(_handler))
+    monkeypatch.setattr(customer_import, "get_http_client", lambda: client)
+    with customer_import.download("https://files.example.com/c.csv") as path:
+        assert open(path).read() == "external_id\nc1\n"
+    assert seen == [("93.184.216.34", "files.example.com", "files.example.com")]
@@ -0,0 +1,144 @@
+# tests/test_fanout.py
+# 扇出：父作业切块建子作业并入队；子作业完成原子汇总到父作业；失败的块单独重试后父作业重新收敛
+# （部分失败的块重试时清掉已追加的结果，不重复）
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.models import Job
+from app.connectors.example_site.client import ExampleConnector
+from app.infra.db import SessionLocal
+from app.services import fanout
+from app.workers import dispatcher, queue as queue_mod
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis):
+    return {"headers": demo["headers"], "account": demo_account, "queue": queue_mod._get_queue()}
+
+
+def _submit(env, items, chunk_size):
+    r = client.post("/api/commands", headers=env["headers"], json={
+        "type": "example.fetch_profile", "idempotency_key": f"fan-{uuid.uuid4()}",
+        "account_selector": {"site": "example", "account_name": env["account"]},
+        "items": items, "chunk_size": chunk_size,
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["job_id"]
+
+
+def _drain(q):
+    # 代替 Worker：按入队顺序逐个执行
+    for job in q.jobs:
+        q.remove(job)
+        job.perform()
+
+
+def _job(env, job_id):
+    r = client.get(f"/api/jobs/{job_id}", headers=env["headers"])
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_parent_rolls_up_children(env):
+    items = [{"uid": str(i)} for i in range(8)]
+    items[4] = {}
+    parent_id = _submit(env, items, chunk_size=3)
+
+    body = _job(env, parent_id)
+    assert body["status"] == "RUNNING"
+    assert body["children"] == {"total": 3, "done": 0, "failed": 0}
+    assert env["queue"].count == 3
+
+    _drain(env["queue"])
+    body = _job(env, parent_id)
+    assert body["status"] == "SUCCEEDED"
+    assert body["children"] == {"total": 3, "done": 3, "failed": 0}
+    assert body["result"] == {"children": 3, "children_failed": 0, "items": 8, "succeeded": 7, "failed": 1}
+
+    children = client.get(f"/api/jobs/{parent_id}/children", headers=env["headers"]).json()
+    assert len(children) == 3 and all(c["status"] == "SUCCEEDED" for c in children)
+    assert _job(env, children[0]["job_id"])["parent_id"] == parent_id
+
+
+def test_failed_chunk_retried_alone(env, monkeypatch):
+    parent_id = _submit(env, [{"uid": str(i)} for i in range(4)], chunk_size=2)
+    q = env["queue"]
+
+    first, second = list(q.jobs)
+    q.remove(first); first.perform()
+    def _down(self, action, payloads, session):
+        raise RuntimeError("site down")
+    monkeypatch.setattr(ExampleConnector, "perform_many", _down)
+    q.remove(second); second.perform()
+    monkeypatch.undo()
+
+    body = _job(env, parent_id)
+    assert body["status"] == "FAILED" and body["error"] == "1 of 2 chunks failed"
+    failed = client.get(f"/api/jobs/{parent_id}/children?status=FAILED", headers=env["headers"]).json()
+    assert [c["job_id"] for c in failed] == [second.id]
+
+    # FAILED 是终态：RQ 重复投递同一个块，不会把它改回 RUNNING / SUCCEEDED，父作业也不动
+    second.perform()
+    with SessionLocal() as db:
+        assert db.get(Job, second.id).status == "FAILED"
+        assert Job.start(db, second.id).status == "FAILED"
+    assert _job(env, parent_id)["status"] == "FAILED"
+
+    # 成功的块不能重试；失败的块重试后父作业重新打开并最终成功
+    assert client.post(f"/api/jobs/{first.id}/retry", headers=env["headers"]).status_code == 409
+    r = client.post(f"/api/jobs/{second.id}/retry", headers=env["headers"])
+    assert r.status_code == 200, r.text
+    body = _job(env, parent_id)
+    assert body["status"] == "RUNNING" and body["children"] == {"total": 2, "done": 1, "failed": 0}
+
+    _drain(q)
+    body = _job(env, parent_id)
+    assert body["status"] == "SUCCEEDED" and body["result"]["succeeded"] == 4
+
+
+def test_duplicate_child_completion_counted_once(env):
+    parent_id = _submit(env, [{"uid": "1"}, {"uid": "2"}], chunk_size=1)
+    with SessionLocal() as db:
+        child_id = db.query(Job.id).filter(Job.parent_id == parent_id).first()[0]
+        out = {"ok": True, "total": 1, "succeeded": 1, "failed": 0}
+        fanout.child_finished(db, child_id, parent_id, out)
+        fanout.child_finished(db, child_id, parent_id, out)
+    assert _job(env, parent_id)["children"]["done"] == 1
+
+
+def test_retry_of_partly_failed_child_does_not_duplicate_results(env, monkeypatch):
+    parent_id = _submit(env, [{"uid": "1"}, {"uid": "2"}, {"uid": "3"}], chunk_size=3)
+    q = env["queue"]
+    (child,) = list(q.jobs)
+    monkeypatch.setattr(dispatcher, "BATCH_CHUNK_SIZE", 1)
+    monkeypatch.setattr(dispatcher, "BATCH_CONCURRENCY", 1)
+    real = ExampleConnector.perform_many
+
+    def _flaky(self, action, payloads, session):
+        if payloads[0]["uid"] == "3":
+            raise RuntimeError("site down")
+        return real(self, action, payloads, session)
+
+    monkeypatch.setattr(ExampleConnector, "perform_many", _flaky)
+    q.remove(child); child.perform()
+    assert _job(env, child.id)["status"] == "FAILED"
+    partial = client.get(f"/api/jobs/{child.id}/results", headers=env["headers"]).json()["items"]
+    assert len(partial) == 2  # 失败前两个小块已追加
+
+    monkeypatch.setattr(ExampleConnector, "perform_many", real)
+    assert client.post(f"/api/jobs/{child.id}/retry", headers=env["headers"]).status_code == 200
+    body = _job(env, child.id)
+    assert body["progress"]["processed"] == 0 and body["progress"]["phase"] is None
+    assert client.get(f"/api/jobs/{child.id}/results", headers=env["headers"]).json()["items"] == []
+
+    _drain(q)
+    items = client.get(f"/api/jobs/{child.id}/results", headers=env["headers"]).json()["items"]
+    assert sorted(i["data"]["index"] for i in items) == [0, 1, 2]
+    assert _job(env, parent_id)["status"] == "SUCCEEDED"
@@ -0,0 +1,97 @@
+# tests/test_job_progress.py
+# 作业进度：节流写入 processed / total / phase / last_heartbeat；部分结果追加到 job_results，运行中即可游标分页
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.main import app
+from app.core import security
+from app.core.models import Job
+from app.infra.db import SessionLocal, engine
+from app.services import customer_import
+from app.services.accounts import create_account
+from app.services.job_progress import ProgressReporter
+from app.workers import dispatcher
+
+client = TestClient(app)
+
+
+def _pending(user_id, job_type="example.fetch_profile"):
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=user_id, job_type=job_type)
+    return job_id
+
+
+def _progress_row(job_id):
+    with engine.begin() as conn:
+        return conn.execute(text("SELECT processed, total, phase, last_heartbeat FROM jobs WHERE id = :id"),
+                            {"id": job_id}).one()
+
+
+def test_reporter_throttles_writes(demo):
+    user_id = demo["id"]
+    job_id = _pending(user_id)
+    p = ProgressReporter(job_id, total=10, min_interval=3600)
+    assert p.update(advance=1)            # 第一次直接写
+    assert not p.update(advance=4)        # 节流窗口内只记内存
+    assert tuple(_progress_row(job_id)[:3]) == (1, 10, None)
+    assert p.update(phase="perform")      # 阶段切换强制写
+    row = _progress_row(job_id)
+    assert tuple(row[:3]) == (5, 10, "perform") and row.last_heartbeat is not None
+
+
+def test_batch_job_exposes_progress_and_pages_results(demo, monkeypatch):
+    user_id, headers = demo["id"], demo["headers"]
+    name = f"prog-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        create_account(db, user_id, "example", name, {"password": "pw"})
+    job_id = _pending(user_id)
+    monkeypatch.setattr(dispatcher, "BATCH_CHUNK_SIZE", 7)
+    items = [{"uid": str(i)} for i in range(20)]
+    items[3] = {}
+    dispatcher.run_batch_job(job_id, user_id, "example", "fetch_profile",
+                             {"site": "example", "account_name": name}, items)
+
+    body = client.get(f"/api/jobs/{job_id}", headers=headers).json()
+    assert body["progress"]["processed"] == 20 and body["progress"]["total"] == 20
+    assert body["progress"]["phase"] == "done" and body["progress"]["last_heartbeat"]
+
+    rows, after = [], 0
+    while True:
+        page = client.get(f"/api/jobs/{job_id}/results", params={"after": after, "limit": 8}, headers=headers).json()
+        rows += [r["data"] for r in page["items"]]
+        after = page["next_after"]
+        if not page["has_more"]:
+            break
+    assert [r["index"] for r in rows] == list(range(20))
+    assert not rows[3]["ok"] and rows[19]["data"]["uid"] == "19"
+    # 读到末尾后同一游标返回空页，游标不回退
+    page = client.get(f"/api/jobs/{job_id}/results", params={"after": after}, headers=headers).json()
+    assert page == {"items": [], "next_after": after, "has_more": False}
+
+
+def test_results_hidden_from_other_users(demo):
+    user_id = demo["id"]
+    job_id = _pending(user_id)
+    other = security.create_access_token({"sub": "someone-else", "username": "x", "role": "user"})
+    r = client.get(f"/api/jobs/{job_id}/results", headers={"Authorization": f"Bearer {other}"})
+    assert r.status_code in (401, 404)
+
+
+def test_import_streams_invalid_rows_to_results(demo, tmp_path, monkeypatch):
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", str(tmp_path))
+    user_id, headers = demo["id"], demo["headers"]
+    job_id = _pending(user_id, "IMPORT_CUSTOMERS")
+    f = tmp_path / "c.csv"
+    f.write_text("external_id,email\n" + "".join(f"x{i},{'bad' if i % 4 == 0 else 'a@b.c'}\n" for i in range(40)))
+    out = customer_import.run_import(user_id, str(f), job_id=job_id, batch_size=16)
+    assert out["invalid"] == 10
+
+    page = client.get(f"/api/jobs/{job_id}/results", params={"limit": 100}, headers=headers).json()
+    assert [r["data"]["line"] for r in page["items"]] == [i + 2 for i in range(0, 40, 4)]
+    body = client.get(f"/api/jobs/{job_id}", headers=headers).json()
+    assert body["progress"] == {**body["progress"], "processed": 40, "total": None, "phase": "done"}
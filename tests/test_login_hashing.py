@@ -0,0 +1,52 @@
+# tests/test_login_hashing.py
+# 登录走有界 bcrypt 执行器：饱和时 503 + Retry-After；低成本旧哈希登录成功后透明重算
+import os, time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from passlib.hash import bcrypt
+
+from app.main import app
+from app.infra.db import engine
+from app.core import security
+from scripts.migrate_step5 import run as migrate_users
+
+client = TestClient(app)
+
+
+def _insert_user(password_hash: str) -> str:
+    uname = f"hash_{int(time.time()*1000)}"
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (id, username, password_hash, role, is_active, created_at)
+            VALUES (:id, :un, :ph, 'user', 1, CURRENT_TIMESTAMP)
+        """), {"id": f"{uname}-id", "un": uname, "ph": password_hash})
+    return uname
+
+
+def test_login_rehashes_when_cost_changed():
+    migrate_users()
+    old_hash = bcrypt.using(rounds=4).hash("pw")
+    assert security.pwd_context.needs_update(old_hash)
+    uname = _insert_user(old_hash)
+
+    r = client.post("/api/login", json={"username": uname, "password": "pw"})
+    assert r.status_code == 200, r.text
+
+    with engine.begin() as conn:
+        stored = conn.execute(text("select password_hash from users where username=:u"), {"u": uname}).scalar()
+    assert stored != old_hash
+    assert not security.pwd_context.needs_update(stored)
+    assert security.verify_password("pw", stored)
+
+
+def test_login_returns_503_when_hasher_saturated(monkeypatch):
+    migrate_users()
+    uname = _insert_user(security.hash_password("pw"))
+    monkeypatch.setattr(security.password_hasher, "max_pending", 0)
+
+    r = client.post("/api/login", json={"username": uname, "password": "pw"})
+    assert r.status_code == 503
+    assert r.headers.get("retry-after") == "1"
@@ -0,0 +1,38 @@
+# tests/test_metrics.py
+# /metrics：HTTP 直方图按路由模板打标签；run_job 记录排队等待与执行耗时
+import os, time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.infra.db import init_db
+from app.workers.dispatcher import run_job
+
+client = TestClient(app)
+
+
+def test_metrics_exposes_route_templates():
+    assert client.get("/health").status_code == 200
+    client.get("/api/jobs/00000000-not-there")  # 401，同样计入，但标签是模板
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'route="/api/jobs/{job_id}"' in body
+    assert "00000000-not-there" not in body
+
+
+def test_run_job_records_queue_wait_and_duration():
+    init_db()
+    res = run_job(job_id="metrics-job", user_id="nobody", site="example", action="fetch_profile",
+                  account_selector={"site": "example", "account_name": "missing"}, payload={"uid": "1"},
+                  enqueued_at=time.time() - 2)
+    assert res["ok"] is False
+
+    body = client.get("/metrics").text
+    assert 'job_queue_wait_seconds_count{action="fetch_profile",site="example"}' in body
+    assert 'job_run_duration_seconds_count{action="fetch_profile",site="example",status="FAILED"}' in body
@@ -0,0 +1,138 @@
+# tests/test_migrations.py
+# 版本化迁移：新库一次建齐且重跑无操作、结构与模型一致；老库（无 user_id / 进度列）补列、建索引并分批回填；
+# 回填中断后从断点继续；check 模式只读；簿记表在迁移锁内创建
+import os
+os.environ.setdefault("LOG_TO_FILE", "false")
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from app.core import models, models_user  # noqa: F401
+from app.infra import migrator
+from app.migrations import MIGRATIONS
+
+
+def _engine(tmp_path, name):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+
+def test_fresh_database_is_built_once(tmp_path):
+    eng = _engine(tmp_path, "fresh.db")
+    lines = []
+    assert migrator.upgrade(eng, progress=lines.append) == [m.version for m in MIGRATIONS]
+    assert migrator.pending(eng) == [] and migrator.upgrade(eng, progress=lines.append) == []
+    insp = inspect(eng)
+    assert {"users", "accounts", "jobs", "schedules", "schema_migrations"} <= set(insp.get_table_names())
+    assert "ix_accounts_user_site_created" in {i["name"] for i in insp.get_indexes("accounts")}
+    assert any("0003" in l and "done" in l for l in lines)
+
+    # 迁移后的结构与当前模型一致：模型改了却没写迁移，这里会失败
+    for t in models.Base.metadata.sorted_tables:
+        assert {c.name for c in t.columns} <= {c["name"] for c in insp.get_columns(t.name)}, t.name
+        assert {i.name for i in t.indexes} <= {i["name"] for i in insp.get_indexes(t.name)}, t.name
+
+
+def test_legacy_database_gets_columns_indexes_and_batched_backfill(tmp_path):
+    eng = _engine(tmp_path, "legacy.db")
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id VARCHAR PRIMARY KEY, username VARCHAR, password_hash VARCHAR, "
+                          "role VARCHAR, is_active BOOLEAN, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO users (id, username, password_hash, role, is_active) "
+                          "VALUES ('u-demo', 'demo', 'x', 'user', 1), ('u-admin', 'admin', 'x', 'admin', 1)"))
+        conn.execute(text("CREATE TABLE accounts (id VARCHAR PRIMARY KEY, site VARCHAR, account_name VARCHAR, "
+                          "secret_encrypted TEXT, meta_json TEXT, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE jobs (id VARCHAR PRIMARY KEY, type VARCHAR, status VARCHAR, error TEXT, "
+                          "created_at DATETIME, updated_at DATETIME)"))
+        conn.execute(text("CREATE TABLE command_requests (id VARCHAR PRIMARY KEY, key VARCHAR, cmd_type VARCHAR, "
+                          "payload JSON, job_id VARCHAR)"))
+        for i in range(10):
+            conn.execute(text("INSERT INTO accounts (id, site, account_name, secret_encrypted) "
+                              "VALUES (:id, 'example', :n, 'x')"), {"id": f"a{i:02d}", "n": f"acc{i}"})
+            conn.execute(text("INSERT INTO jobs (id, type, status) VALUES (:id, 't', 'SUCCEEDED')"), {"id": f"j{i:02d}"})
+
+    lines = []
+    migrator.upgrade(eng, progress=lines.append, batch_size=3, sleep=0)
+    insp = inspect(eng)
+    assert {"user_id", "processed", "attempts"} <= {c["name"] for c in insp.get_columns("jobs")}
+    assert {"ix_accounts_user_id", "ix_jobs_status_updated"} <= {i["name"] for i in insp.get_indexes("accounts")
+                                                                 + insp.get_indexes("jobs")}
+    with eng.connect() as conn:
+        assert set(conn.execute(text("SELECT user_id FROM accounts")).scalars()) == {"u-admin"}
+        assert conn.execute(text("SELECT processed FROM jobs WHERE id = 'j00'")).scalar() == 0
+        cps = {r.name: r for r in conn.execute(select(migrator.migration_checkpoints))}
+    assert cps["0002.accounts.user_id"].done and cps["0002.accounts.user_id"].rows_updated == 10
+    # 10 行、每批 3 行：4 批，每批一行进度
+    assert len([l for l in lines if "0002.accounts.user_id" in l]) == 4
+    assert "scanned 10/10, updated 10" in [l for l in lines if "0002.accounts.user_id" in l][-1]
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    eng = _engine(tmp_path, "resume.db")
+    migrator.upgrade(eng, progress=lambda _: None)
+    with eng.begin() as conn:
+        for i in range(10):
+            conn.execute(text("INSERT INTO job_results (job_id, data) VALUES ('j', '{}')"))
+
+    class Interrupted(Exception):
+        pass
+
+    def _die_after_two(line, seen=[]):
+        seen.append(line)
+        if len(seen) == 2:
+            raise Interrupted()
+
+    ctx = migrator.MigrationContext(eng, "9999", progress=_die_after_two, batch_size=3, sleep=0)
+    with pytest.raises(Interrupted):
+        ctx.backfill("9999.job_results", "job_results", {"job_id": "k"}, where=lambda t: t.c.job_id == "j")
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM job_results WHERE job_id = 'k'")).scalar() == 6
+        cp = conn.execute(select(migrator.migration_checkpoints)).mappings().one()
+    assert cp["last_key"] == "6" and not cp["done"]
+
+    lines = []
+    ctx = migrator.MigrationContext(eng, "9999", progress=lines.append, batch_size=3, sleep=0)
+    assert ctx.backfill("9999.job_results", "job_results", {"job_id": "k"}, where=lambda t: t.c.job_id == "j") == 4
+    assert lines[0].startswith("[migrate] 9999.job_results: scanned 9/10")
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM job_results WHERE job_id = 'k'")).scalar() == 10
+    assert ctx.backfill("9999.job_results", "job_results", {"job_id": "x"}, where=lambda t: t.c.job_id == "k") == 0
+
+
+def test_startup_check_mode_refuses_pending(tmp_path, monkeypatch):
+    eng = _engine(tmp_path, "check.db")
+    monkeypatch.setattr(migrator, "MIGRATE_ON_STARTUP", "check")
+    with pytest.raises(migrator.MigrationPending):
+        migrator.on_startup(eng)
+    assert inspect(eng).get_table_names() == []  # 检查模式不建任何表
+    assert migrator.pending(eng) == [m.version for m in MIGRATIONS]
+    migrator.upgrade(eng, progress=lambda _: None)
+    assert migrator.on_startup(eng) == []
+
+
+def test_startup_reports_progress_through_logs(tmp_path, monkeypatch, capsys):
+    eng = _engine(tmp_path, "startup.db")
+    events = []
+    monkeypatch.setattr(migrator, "MIGRATE_ON_STARTUP", "upgrade")
+    monkeypatch.setattr(migrator, "emit", lambda event, **kw: events.append((event, kw)))
+    assert migrator.on_startup(eng) == [m.version for m in MIGRATIONS]
+    assert "[migrate]" not in capsys.readouterr().out
+    assert any(e == "migrate_progress" and "0001 baseline" in kw["message"] for e, kw in events)
+
+
+def test_bookkeeping_tables_are_created_under_the_lock(tmp_path, monkeypatch):
+    eng = _engine(tmp_path, "lock.db")
+    seen = []
+    real_lock = migrator._lock
+
+    @contextmanager
+    def _spy(engine):
+        with real_lock(engine):
+            seen.append(inspect(engine).has_table("schema_migrations"))
+            yield
+
+    monkeypatch.setattr(migrator, "_lock", _spy)
+    migrator.upgrade(eng, progress=lambda _: None)
+    assert seen == [False]  # 拿锁之前什么都没建
+    assert migrator.upgrade(eng, progress=lambda _: None) == [] and seen == [False]  # 无待执行：不拿锁
@@ -0,0 +1,95 @@
+# tests/test_priority_lanes.py
+# 优先级通道：按命令形态取默认、批量按角色封顶；Worker 严格优先出队且低优先级不会饿死；按通道的等待指标
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from rq import SimpleWorker
+
+from app.main import app
+from app.core.models import Job
+from app.infra.db import SessionLocal
+from app.services.accounts import create_account
+from app.workers import lanes, queue as queue_mod
+
+client = TestClient(app)
+
+
+class _LaneWorker(lanes.LanePriorityMixin, SimpleWorker):
+    starvation_every = 2
+
+    def execute_job(self, job, queue):
+        self.order.append(lanes.lane_of(queue.name))
+        return super().execute_job(job, queue)
+
+
+@pytest.fixture
+def env(users, demo_account, fake_redis):
+    with SessionLocal() as db:
+        create_account(db, users["admin"]["id"], "example", demo_account, {"password": "pw"})
+    return {"headers": {n: u["headers"] for n, u in users.items()}, "account": demo_account,
+            "demo_id": users["demo"]["id"], "conn": fake_redis}
+
+
+def _post(env, who, **extra):
+    body = {"type": "example.fetch_profile", "idempotency_key": f"lane-{uuid.uuid4()}",
+            "account_selector": {"site": "example", "account_name": env["account"]}, "payload": {"uid": "1"}}
+    body.update(extra)
+    r = client.post("/api/commands", headers=env["headers"][who], json=body)
+    assert r.status_code == 200, r.text
+    return r.json()["job_id"]
+
+
+def _lane_counts():
+    return {lane: queue_mod._get_queue(lane).count for lane in lanes.LANES}
+
+
+def test_resolve_defaults_and_role_caps():
+    assert lanes.resolve(None, "user", bulk=False) == "high"
+    assert lanes.resolve(None, "user", bulk=True) == "normal"
+    assert lanes.resolve("high", "user", bulk=True) == "normal"
+    assert lanes.resolve("high", "admin", bulk=True) == "high"
+    assert lanes.resolve("low", "user", bulk=False) == "low"
+    assert lanes.resolve("high", "unknown-role", bulk=True) == "normal"
+
+
+def test_commands_land_in_lane_queues(env):
+    _post(env, "demo")
+    _post(env, "demo", items=[{"uid": "1"}], priority="high")  # 批量：user 封顶到 normal
+    _post(env, "demo", items=[{"uid": "1"}], priority="low")
+    _post(env, "admin", items=[{"uid": "1"}], priority="high")
+    assert _lane_counts() == {"high": 2, "normal": 1, "low": 1}
+
+
+def _enqueue(env, lane, n):
+    for i in range(n):
+        job_id = str(uuid.uuid4())
+        with SessionLocal() as db:
+            Job.create_pending(db, job_id=job_id, user_id=env["demo_id"], job_type="example.fetch_profile")
+        queue_mod.enqueue(job_id, env["demo_id"], "example.fetch_profile",
+                          {"site": "example", "account_name": env["account"]}, {"uid": str(i)}, priority=lane)
+
+
+def test_worker_strict_priority_with_starvation_guard(env):
+    _enqueue(env, "low", 1)
+    _enqueue(env, "normal", 2)
+    _enqueue(env, "high", 4)
+    queues = [queue_mod._get_queue(lane) for lane in lanes.LANES]
+    w = _LaneWorker(queues, connection=env["conn"])
+    w.order = []
+    w.work(burst=True)
+    # high 连出 2 个后，被跳过 2 次的 low / normal 依次各出一个，然后回到严格优先
+    assert w.order == ["high", "high", "low", "normal", "high", "high", "normal"]
+
+    def waits(lane):
+        return REGISTRY.get_sample_value("job_lane_wait_seconds_count", {"lane": lane}) or 0
+
+    before = waits("high")
+    _enqueue(env, "high", 1)
+    w2 = _LaneWorker(queues, connection=env["conn"])
+    w2.order = []
+    w2.work(burst=True)
+    assert waits("high") == before + 1
@@ -0,0 +1,67 @@
+# tests/test_profiler.py
+# 采样分析：admin 端点返回 collapsed / speedscope（异步等待，不占线程池）；Worker 慢作业落盘 profile 并发事件
+import os, json
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.infra.db import init_db
+from app.workers import dispatcher
+from scripts.migrate_step5 import run as migrate_users
+from scripts.seed_step5 import run as seed_users
+
+client = TestClient(app)
+
+
+def _auth(username: str) -> dict:
+    migrate_users(); seed_users()
+    r = client.post("/api/login", json={"username": username, "password": username})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_admin_profile_formats():
+    admin = _auth("admin")
+    r = client.get("/api/admin/profile?seconds=0.2&interval_ms=2", headers=admin)
+    assert r.status_code == 200, r.text
+    lines = [ln for ln in r.text.splitlines() if ln]
+    assert lines and all(ln.rsplit(" ", 1)[1].isdigit() for ln in lines)
+
+    r = client.get("/api/admin/profile?seconds=0.2&format=speedscope", headers=admin)
+    doc = r.json()
+    prof = doc["profiles"][0]
+    assert prof["type"] == "sampled" and len(prof["samples"]) == len(prof["weights"]) > 0
+    assert max(i for s in prof["samples"] for i in s) < len(doc["shared"]["frames"])
+
+    assert client.get("/api/admin/profile?seconds=0.1", headers=_auth("demo")).status_code == 403
+
+
+def test_admin_profile_does_not_hold_a_threadpool_thread(monkeypatch):
+    from anyio import to_thread
+    admin = _auth("admin")
+    calls = []
+    real = to_thread.run_sync
+
+    async def _spy(func, *args, **kwargs):
+        calls.append(repr(func))
+        return await real(func, *args, **kwargs)
+
+    monkeypatch.setattr(to_thread, "run_sync", _spy)
+    assert client.get("/api/admin/profile?seconds=0.2", headers=admin).status_code == 200
+    assert not any("profile_process" in c for c in calls)  # 端点在事件循环上 await，不在线程池里 sleep
+
+
+def test_slow_job_writes_profile(tmp_path, monkeypatch):
+    init_db()
+    monkeypatch.setenv("JOB_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("JOB_PROFILE_THRESHOLD_MS", "0")
+    events = []
+    monkeypatch.setattr(dispatcher, "emit", lambda ev, **kw: events.append((ev, kw)))
+
+    dispatcher.run_job(job_id="prof-job", user_id="nobody", site="example", action="fetch_profile",
+                       account_selector={"site": "example", "account_name": "missing"}, payload={})
+
+    saved = [kw for ev, kw in events if ev == "job_profile_saved"]
+    assert saved and saved[0]["job_id"] == "prof-job"
+    assert json.loads(open(saved[0]["profile"]).read())["profiles"][0]["type"] == "sampled"
@@ -0,0 +1,85 @@
+# tests/test_queue_stats.py
+# 队列信号：深度 / 最老等待 / 入队出队速率 / 站点积压来自 Redis 批量读取；admin 端点；本机扩缩容决策
+import os, time, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.models import Job
+from app.infra.db import SessionLocal
+from app.services import queue_stats
+from app.workers import autoscaler, queue as queue_mod
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis):
+    return {"user_id": demo["id"], "account": demo_account, "queue": queue_mod._get_queue()}
+
+
+def _enqueue(env, n):
+    for i in range(n):
+        job_id = str(uuid.uuid4())
+        with SessionLocal() as db:
+            Job.create_pending(db, job_id=job_id, user_id=env["user_id"], job_type="example.fetch_profile")
+        queue_mod.enqueue(job_id, env["user_id"], "example.fetch_profile",
+                          {"site": "example", "account_name": env["account"]}, {"uid": str(i)})
+
+
+def _auth(username: str) -> dict:
+    r = client.post("/api/login", json={"username": username, "password": username})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_snapshot_depth_age_rates_and_sites(env):
+    from rq import SimpleWorker
+    _enqueue(env, 3)
+    q = env["queue"]
+    SimpleWorker([q], connection=q.connection).work(burst=True, max_jobs=1)
+
+    row, = queue_stats.snapshot(q.connection, now=time.time() + 10)
+    assert row["queue"] == q.name
+    assert (row["depth"], row["started"], row["workers"]) == (2, 0, 0)
+    assert 9 <= row["oldest_age_s"] < 60
+    assert row["enqueue_rate"] > row["dequeue_rate"] > 0
+    assert row["sites"]["example"]["backlog"] == 2
+
+    q.empty()
+    row, = queue_stats.snapshot(q.connection)
+    assert (row["depth"], row["oldest_age_s"]) == (0, 0.0)
+
+
+def test_admin_queues_endpoint(env):
+    _enqueue(env, 2)
+    admin = _auth("admin")
+    r = client.get("/api/admin/queues?window=120", headers=admin)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["window_s"] == 120
+    assert body["queues"][0]["depth"] == 2
+    assert client.get("/api/admin/queues", headers=_auth("demo")).status_code == 403
+
+
+def test_autoscaler_decisions(monkeypatch):
+    d = autoscaler.decide
+    assert d(0, {"depth": 5, "oldest_age_s": 1}, 30, 0, 8) == 1
+    assert d(2, {"depth": 50, "oldest_age_s": 90}, 30, 1, 8) == 6
+    assert d(6, {"depth": 500, "oldest_age_s": 900}, 30, 1, 8) == 8
+    assert d(4, {"depth": 10, "oldest_age_s": 20}, 30, 1, 8) == 4
+    assert d(4, {"depth": 0, "oldest_age_s": 0.0}, 30, 1, 8) == 3
+    assert d(1, {"depth": 0, "oldest_age_s": 0.0}, 30, 1, 8) == 1
+
+    scaler = autoscaler.LocalScaler("default", "redis://x", [], 30, 1, 4)
+    monkeypatch.setattr(scaler, "_start_one", lambda: scaler.procs.append(object()))
+    monkeypatch.setattr(scaler, "_stop_one", lambda: scaler.procs.pop())
+    monkeypatch.setattr(scaler, "_reap", lambda: None)
+    hot, idle = {"depth": 100, "oldest_age_s": 120}, {"depth": 0, "oldest_age_s": 0.0}
+    assert scaler.tick(hot, now=1000) == 1
+    assert scaler.tick(hot, now=1001) == 1  # 扩容冷却中
+    assert scaler.tick(hot, now=1000 + autoscaler.AUTOSCALE_UP_COOLDOWN_SECONDS) == 4
+    assert scaler.tick(idle, now=1020) == 4  # 缩容冷却中
+    assert scaler.tick(idle, now=1100) == 3
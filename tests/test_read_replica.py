@@ -0,0 +1,85 @@
+# tests/test_read_replica.py
+# 读写分离：两个 SQLite 文件分别充当主库 / 从库；只读路由默认读从库，写请求后的窗口内读主库（Cookie 或请求头）
+import os, time, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+
+from app.main import app
+from app.core.models import Account, Base, Job
+from app.infra import db as db_mod
+from app.infra.db import SessionLocal
+
+
+@pytest.fixture
+def env(demo, fake_redis, tmp_path):
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica = create_engine(replica_url)
+    Base.metadata.create_all(bind=replica)
+    old_url = db_mod.set_read_database_url(replica_url)
+    with SessionLocal() as db:
+        job_id = str(uuid.uuid4())
+        db.add(Job(id=job_id, user_id=demo["id"], type="example.fetch_profile", status="PENDING"))
+        db.commit()
+    yield {"headers": demo["headers"], "job_id": job_id, "demo_id": demo["id"], "replica": replica}
+    db_mod.set_read_database_url(old_url)
+    replica.dispose()
+
+
+def _replicate(replica, model, where):
+    """模拟复制追上：把主库里的行抄到从库。"""
+    with SessionLocal() as db:
+        rows = [dict(r._mapping) for r in db.execute(select(model.__table__).where(where))]
+    with replica.begin() as conn:
+        conn.execute(insert(model.__table__), rows)
+
+
+def test_reads_go_to_replica_until_a_write(env):
+    client = TestClient(app)
+    h, job_id = env["headers"], env["job_id"]
+    assert db_mod.has_replica()
+
+    # 从库还没同步到这个作业：没写过的客户端读从库，看不到
+    assert client.get(f"/api/jobs/{job_id}", headers=h).status_code == 404
+    assert client.get("/api/accounts", headers=h, params={"site": "rr"}).json() == []
+
+    site = f"rr{uuid.uuid4().hex[:6]}"
+    r = client.post("/api/accounts", headers=h, json={"site": site, "account_name": "a", "secrets": {"password": "p"}})
+    assert r.status_code == 200
+    until = r.headers[db_mod.PRIMARY_UNTIL_HEADER]
+    assert float(until) > time.time() and client.cookies.get(db_mod.PRIMARY_UNTIL_COOKIE) == until
+
+    # 写后窗口内（Cookie 自动带回）：读主库，读得到刚写的
+    assert client.get(f"/api/jobs/{job_id}", headers=h).status_code == 200
+    assert [a["account_name"] for a in client.get("/api/accounts", headers=h, params={"site": site}).json()] == ["a"]
+    assert client.get("/api/accounts/export", headers=h, params={"site": site}).json()[0]["account_name"] == "a"
+
+    # 不用 Cookie 的客户端：把响应头原样带回也行；过期的值不算
+    other = TestClient(app)
+    assert other.get(f"/api/jobs/{job_id}", headers={**h, db_mod.PRIMARY_UNTIL_HEADER: until}).status_code == 200
+    stale = f"{time.time() - 1:.3f}"
+    assert other.get(f"/api/jobs/{job_id}", headers={**h, db_mod.PRIMARY_UNTIL_HEADER: stale}).status_code == 404
+    assert db_mod.PRIMARY_UNTIL_HEADER not in other.get("/api/me", headers=h).headers  # 读请求不续期
+
+    # 复制追上之后，从库就能答
+    _replicate(env["replica"], Job, Job.id == job_id)
+    _replicate(env["replica"], Account, Account.user_id == env["demo_id"])
+    assert other.get(f"/api/jobs/{job_id}", headers=h).json()["job_id"] == job_id
+    assert [a["account_name"] for a in other.get("/api/accounts", headers=h, params={"site": site}).json()] == ["a"]
+
+
+def test_failed_writes_and_no_replica_do_not_pin_primary(env):
+    client = TestClient(app)
+    r = client.patch(f"/api/accounts/{uuid.uuid4()}", headers=env["headers"], json={"secrets": {"password": "x"}})
+    assert r.status_code == 404 and db_mod.PRIMARY_UNTIL_HEADER not in r.headers
+    assert client.get(f"/api/jobs/{env['job_id']}", headers=env["headers"]).status_code == 404
+
+    db_mod.set_read_database_url(None)
+    assert not db_mod.has_replica() and db_mod.read_engine is db_mod.engine
+    r = client.post("/api/accounts", headers=env["headers"],
+                    json={"site": f"rr{uuid.uuid4().hex[:6]}", "account_name": "b", "secrets": {"password": "p"}})
+    assert r.status_code == 200 and db_mod.PRIMARY_UNTIL_HEADER not in r.headers
+    assert client.get(f"/api/jobs/{env['job_id']}", headers=env["headers"]).status_code == 200
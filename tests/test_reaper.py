@@ -0,0 +1,121 @@
+# tests/test_reaper.py
+# 心跳与回收：Worker 死亡（心跳过期）的 RUNNING 作业按重试次数重新入队或置 FAILED，清理作业锁；
+# Worker 仍在心跳的作业不误伤；作业锁防止同一作业并发执行
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.core.models import Job, JobResult
+from app.infra.db import SessionLocal
+from app.services.job_progress import append_results
+from app.workers import heartbeat, reaper, queue as queue_mod
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis):
+    return {"user_id": demo["id"], "account": demo_account, "queue": queue_mod._get_queue(), "redis": fake_redis}
+
+
+def _running_job(env, attempts=1, worker="dead-worker", age=600, parent_id=None):
+    """一个入过队、被 Worker 领走后 Worker 死掉的作业：RUNNING、心跳停在 age 秒前。"""
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Job(id=job_id, user_id=env["user_id"], type="example.fetch_profile", status="PENDING",
+                   parent_id=parent_id))
+        db.commit()
+    queue_mod.enqueue(job_id, env["user_id"], "example.fetch_profile",
+                      {"site": "example", "account_name": env["account"]}, {"uid": "1"})
+    env["queue"].remove(job_id)  # 模拟被 Worker 领走
+    with SessionLocal() as db:
+        db.execute(update(Job.__table__).where(Job.id == job_id).values(
+            status="RUNNING", worker_id=worker, attempts=attempts,
+            last_heartbeat=datetime.now(timezone.utc) - timedelta(seconds=age)))
+        db.commit()
+    env["redis"].set(heartbeat.job_lock_key(job_id), worker)
+    return job_id
+
+
+def _job(job_id):
+    with SessionLocal() as db:
+        j = db.get(Job, job_id)
+        return {"status": j.status, "error": j.error, "attempts": j.attempts}
+
+
+def test_dead_worker_job_is_requeued_then_failed(env):
+    job_id = _running_job(env, attempts=1)
+    append_results(job_id, [{"index": 0}])
+
+    reaper.reap_once(conn=env["redis"])
+    assert _job(job_id)["status"] == "PENDING"
+    assert env["queue"].job_ids == [job_id]
+    assert not env["redis"].exists(heartbeat.job_lock_key(job_id))
+    with SessionLocal() as db:
+        assert db.query(JobResult).filter(JobResult.job_id == job_id).count() == 0
+
+    # 重新执行一次成功：attempts 累加，结果正常
+    env["queue"].jobs[0].perform()
+    assert _job(job_id) == {"status": "SUCCEEDED", "error": "", "attempts": 2}
+
+    # 用完重试次数后再卡死：置 FAILED
+    job2 = _running_job(env, attempts=reaper.JOB_MAX_ATTEMPTS)
+    reaper.reap_once(conn=env["redis"])
+    state = _job(job2)
+    assert state["status"] == "FAILED" and state["error"].startswith("worker lost")
+    assert not env["redis"].exists(heartbeat.job_lock_key(job2))
+
+
+def test_live_worker_is_left_alone_until_stale(env):
+    beat = heartbeat.WorkerHeartbeat(env["redis"], "live-worker", interval=60)
+    beat.beat()
+    job_id = _running_job(env, worker="live-worker", age=heartbeat.JOB_HEARTBEAT_SECONDS * 3)
+    reaper.reap_once(conn=env["redis"])
+    assert _job(job_id)["status"] == "RUNNING"
+
+    # Worker 还在，但这个作业的心跳已超过 JOB_STALE_SECONDS（作业线程卡死）：照样回收
+    later = datetime.now(timezone.utc) + timedelta(seconds=heartbeat.JOB_STALE_SECONDS)
+    reaper.reap_once(now=later, conn=env["redis"])
+    assert _job(job_id)["status"] == "PENDING"
+    beat.stop()
+    assert not heartbeat.worker_alive(env["redis"], "live-worker")
+
+
+def test_failed_child_rolls_up_to_parent(env):
+    parent_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        db.add(Job(id=parent_id, user_id=env["user_id"], type="example.fetch_profile", status="RUNNING",
+                   children_total=1))
+        db.commit()
+    child = _running_job(env, attempts=reaper.JOB_MAX_ATTEMPTS, parent_id=parent_id)
+    reaper.reap_once(conn=env["redis"])
+    assert _job(child)["status"] == "FAILED"
+    assert _job(parent_id)["status"] == "FAILED"
+
+
+def test_lost_pending_job_failed(env):
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=env["user_id"], job_type="example.fetch_profile")
+    later = datetime.now(timezone.utc) + timedelta(seconds=reaper.JOB_PENDING_STALE_SECONDS + 60)
+    reaper.reap_once(now=later, conn=env["redis"])
+    assert _job(job_id)["status"] == "FAILED"
+
+
+def test_job_lock_prevents_double_run(env):
+    job_id = str(uuid.uuid4())
+    with SessionLocal() as db:
+        Job.create_pending(db, job_id=job_id, user_id=env["user_id"], job_type="example.fetch_profile")
+    queue_mod.enqueue(job_id, env["user_id"], "example.fetch_profile",
+                      {"site": "example", "account_name": env["account"]}, {"uid": "1"})
+    env["redis"].set(heartbeat.job_lock_key(job_id), "other-worker")
+    rq_job = env["queue"].jobs[0]
+    assert rq_job.perform() == {"ok": False, "error": "job is already running"}
+    assert _job(job_id)["status"] == "PENDING"
+
+    env["redis"].delete(heartbeat.job_lock_key(job_id))
+    assert rq_job.perform()["ok"]
+    assert not env["redis"].exists(heartbeat.job_lock_key(job_id))  # 结束后释放
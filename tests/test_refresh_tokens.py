@@ -0,0 +1,57 @@
+# tests/test_refresh_tokens.py
+# 刷新令牌：轮换换发、重放旧令牌吊销整条链、显式吊销
+import os
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.main import app
+from app.infra.db import engine
+from scripts.migrate_step5 import run as migrate_users
+from scripts.seed_step5 import run as seed_users
+
+client = TestClient(app)
+
+
+def _login() -> dict:
+    migrate_users(); seed_users()
+    r = client.post("/api/login", json={"username": "demo", "password": "demo"})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["access_token"] and body["refresh_token"]
+    return body
+
+
+def test_refresh_rotates_and_detects_reuse():
+    first = _login()
+
+    r = client.post("/api/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert r.status_code == 200, r.text
+    second = r.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    me = client.get("/api/me", headers={"Authorization": f"Bearer {second['access_token']}"})
+    assert me.status_code == 200 and me.json()["user"] == "demo"
+
+    # 库里只存摘要，不存明文
+    with engine.begin() as conn:
+        hits = conn.execute(text("select count(*) from refresh_tokens where token_hash=:t"),
+                            {"t": second["refresh_token"]}).scalar()
+    assert hits == 0
+
+    # 重放已轮换的旧令牌 → 401，且整条链被吊销
+    r = client.post("/api/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert r.status_code == 401
+    r = client.post("/api/token/refresh", json={"refresh_token": second["refresh_token"]})
+    assert r.status_code == 401
+
+
+def test_revoke_logs_out():
+    tokens = _login()
+    r = client.post("/api/token/revoke", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 200
+    r = client.post("/api/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert r.status_code == 401
+    r = client.post("/api/token/refresh", json={"refresh_token": "garbage"})
+    assert r.status_code == 401
@@ -0,0 +1,151 @@
+# tests/test_schedules.py
+# 定时命令：cron 解析与下次时间、窗口内抖动、经幂等路径触发（重放同一窗口不重复建作业）、单主锁；
+# 创建时校验命令；提交失败时窗口不推进，下一轮重放
+import os
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.models import Job, Schedule
+from app.infra.db import SessionLocal
+from app.services import commands as cmd_svc, schedules as sched_svc
+from app.workers import lanes, queue as queue_mod, scheduler
+
+client = TestClient(app)
+UTC = timezone.utc
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis):
+    return {"headers": demo["headers"], "account": demo_account, "demo_id": demo["id"], "conn": fake_redis}
+
+
+def _cron_next(expr, after):
+    return sched_svc.next_slot(Schedule(cron=expr), after)
+
+
+def test_cron_next_and_jitter():
+    t = datetime(2026, 1, 1, 10, 7, 30, tzinfo=UTC)  # 周四
+    assert _cron_next("*/15 * * * *", t) == datetime(2026, 1, 1, 10, 15, tzinfo=UTC)
+    assert _cron_next("0 9 * * *", t) == datetime(2026, 1, 2, 9, 0, tzinfo=UTC)
+    assert _cron_next("30 8 * * 1-5", t) == datetime(2026, 1, 2, 8, 30, tzinfo=UTC)
+    assert _cron_next("0 0 * * 0", t) == datetime(2026, 1, 4, 0, 0, tzinfo=UTC)
+    assert _cron_next("0 0 * * 7", t) == datetime(2026, 1, 4, 0, 0, tzinfo=UTC)
+    assert _cron_next("0 0 1 */3 *", t) == datetime(2026, 4, 1, 0, 0, tzinfo=UTC)
+    assert _cron_next("0 12 15 * 1", t) == datetime(2026, 1, 5, 12, 0, tzinfo=UTC)  # 日 / 周任一满足
+    for bad in ("* * * *", "60 * * * *", "* * 0 * *", "a * * * *", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            sched_svc.parse_cron(bad)
+    assert sched_svc.next_slot(Schedule(interval_seconds=300), t) == datetime(2026, 1, 1, 10, 10, tzinfo=UTC)
+
+    slot = datetime(2026, 1, 1, 10, 0, tzinfo=UTC)
+    js = [sched_svc.jitter_for(str(i), slot, 300, None) for i in range(200)]
+    assert all(0 <= j < 60 for j in js) and max(js) - min(js) > 30  # 均匀摊开
+    assert sched_svc.jitter_for("x", slot, 300, None) == sched_svc.jitter_for("x", slot, 300, None)
+    assert sched_svc.jitter_for("x", slot, 20, 600) < 20  # 不超过窗口
+    assert sched_svc.jitter_for("x", slot, 300, 0) == 0
+
+
+def test_schedule_fires_once_per_window(env):
+    command = {"type": "example.fetch_profile", "payload": {"uid": "1"},
+               "account_selector": {"site": "example", "account_name": env["account"]}}
+    r = client.post("/api/schedules", headers=env["headers"], json={"name": "hourly", "command": command})
+    assert r.status_code == 400  # cron / interval 缺一不可
+    r = client.post("/api/schedules", headers=env["headers"],
+                    json={"name": "hourly", "command": command, "cron": "0 * * * *", "jitter_seconds": 120})
+    assert r.status_code == 200, r.text
+    sid = r.json()["id"]
+    assert "idempotency_key" not in r.json()["command"]
+
+    with SessionLocal() as db:
+        row = db.get(Schedule, sid)
+        slot = sched_svc._utc(row.slot_at)
+        first = sched_svc._utc(row.next_run_at)
+        assert slot.minute == 0 and slot <= first < slot + timedelta(seconds=120)
+        snapshot = Schedule(id=row.id, user_id=row.user_id, command=row.command, cron=row.cron,
+                            jitter_seconds=row.jitter_seconds, slot_at=row.slot_at, next_run_at=row.next_run_at)
+
+    assert scheduler.run_once(now=first - timedelta(seconds=1))["fired"] == 0
+    stats = scheduler.run_once(now=first + timedelta(seconds=5))
+    assert stats["fired"] == 1
+    with SessionLocal() as db:
+        row = db.get(Schedule, sid)
+        job_id = row.last_job_id
+        assert job_id and row.last_error is None
+        assert sched_svc._utc(row.slot_at) == slot + timedelta(hours=1)
+        assert db.get(Job, job_id).user_id == env["demo_id"]
+        # 切主重叠：另一个调度器拿着旧行再触发一次，条件 UPDATE 失败，不重复
+        assert sched_svc.fire(db, snapshot, first + timedelta(seconds=6)) is None
+        # 即便抢占绕过（行被回滚等），同一窗口的幂等键也只返回原作业
+        db.query(Schedule).filter(Schedule.id == sid).update(
+            {"slot_at": snapshot.slot_at, "next_run_at": snapshot.next_run_at})
+        db.commit()
+    assert scheduler.run_once(now=first + timedelta(seconds=7))["fired"] == 1
+    with SessionLocal() as db:
+        assert db.get(Schedule, sid).last_job_id == job_id
+    assert queue_mod._get_queue(lanes.resolve(None, "user", bulk=False)).count == 1
+
+    listed = client.get("/api/schedules", headers=env["headers"]).json()
+    assert [s["id"] for s in listed if s["id"] == sid] == [sid]
+    assert client.patch(f"/api/schedules/{sid}", headers=env["headers"], json={"enabled": False}).json()["enabled"] is False
+    with SessionLocal() as db:
+        assert sid not in {s.id for s in sched_svc.due(db, first + timedelta(days=2), 1000)}
+    assert client.delete(f"/api/schedules/{sid}", headers=env["headers"]).status_code == 200
+    assert client.delete(f"/api/schedules/{sid}", headers=env["headers"]).status_code == 404
+
+
+def test_invalid_command_is_rejected_at_creation(env):
+    bad = [{"type": "NOPE"},
+           {"type": "example.fetch_profile", "payload": {"uid": "1"}},
+           {"type": "IMPORT_CUSTOMERS", "payload": {"file_url": "file:///etc/passwd"}}]
+    for command in bad:
+        r = client.post("/api/schedules", headers=env["headers"],
+                        json={"command": command, "interval_seconds": 3600})
+        assert r.status_code == 400, command
+    with SessionLocal() as db:
+        assert db.query(Schedule).filter(Schedule.user_id == env["demo_id"]).count() == 0
+
+
+def test_failed_submit_keeps_window_for_next_pass(env, monkeypatch):
+    command = {"type": "example.fetch_profile", "payload": {"uid": "1"},
+               "account_selector": {"site": "example", "account_name": env["account"]}}
+    r = client.post("/api/schedules", headers=env["headers"],
+                    json={"command": command, "interval_seconds": 3600, "jitter_seconds": 0})
+    sid = r.json()["id"]
+    with SessionLocal() as db:
+        first = sched_svc._utc(db.get(Schedule, sid).next_run_at)
+
+    real_submit = cmd_svc.submit
+
+    def crash(*a, **kw):
+        real_submit(*a, **kw)  # 命令已提交，推进窗口之前进程挂掉
+        raise RuntimeError("crashed")
+
+    monkeypatch.setattr(cmd_svc, "submit", crash)
+    assert scheduler.run_once(now=first + timedelta(seconds=1))["errors"] == 1
+    with SessionLocal() as db:
+        assert sched_svc._utc(db.get(Schedule, sid).next_run_at) == first
+    monkeypatch.setattr(cmd_svc, "submit", real_submit)
+    assert scheduler.run_once(now=first + timedelta(seconds=2))["fired"] == 1
+    with SessionLocal() as db:
+        row = db.get(Schedule, sid)
+        assert sched_svc._utc(row.next_run_at) == first + timedelta(hours=1)
+        assert db.query(Job).filter(Job.id == row.last_job_id).count() == 1
+    assert queue_mod._get_queue(lanes.resolve(None, "user", bulk=False)).count == 1
+    client.delete(f"/api/schedules/{sid}", headers=env["headers"])
+
+
+def test_leader_lock_is_exclusive(env):
+    conn = env["conn"]
+    assert scheduler.acquire_leader(conn, "a", ttl=5)
+    assert not scheduler.acquire_leader(conn, "b", ttl=5)
+    assert scheduler.acquire_leader(conn, "a", ttl=5)  # 续期
+    scheduler.release_leader(conn, "b")  # 不是自己的锁，不动
+    assert not scheduler.acquire_leader(conn, "b", ttl=5)
+    scheduler.release_leader(conn, "a")
+    assert scheduler.acquire_leader(conn, "b", ttl=5)
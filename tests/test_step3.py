@@ -26,9 +26,14 @@ def test_login_and_me(client: TestClient):
     assert r.status_code == 200
     assert r.json()["user_id"] == "demo"
 
-def test_command_idempotency_and_job_flow(client: TestClient):
+def test_command_idempotency_and_job_flow(client: TestClient, tmp_path, monkeypatch):
+    from app.services import commands, customer_import
+    monkeypatch.setattr(customer_import, "IMPORT_UPLOAD_DIR", str(tmp_path))  # 本地文件只能来自上传目录
+    monkeypatch.setattr(commands, "IMPORT_CUSTOMERS_RUNNER", "background")  # Step3 兼容模式：API 进程内执行
     token = login(client)
-    body = {"type": "IMPORT_CUSTOMERS", "payload": {"file_url": "x"}, "idempotency_key": "pytest-1"}
+    csv_file = tmp_path / "customers.csv"
+    csv_file.write_text("external_id,name,email\nc1,Alice,a@example.com\nc2,Bob,b@example.com\n")
+    body = {"type": "IMPORT_CUSTOMERS", "payload": {"file_url": str(csv_file)}, "idempotency_key": "pytest-1"}
 
     r1 = client.post("/api/commands", headers={"Authorization": f"Bearer {token}"}, json=body)
     assert r1.status_code == 200
@@ -0,0 +1,65 @@
+# tests/test_tracing.py
+# 追踪上下文：接受上游 traceparent；HTTP → submit_command 同一 trace；enqueue → run_job 经 job.meta 接续
+import os, time
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.infra import tracing
+from app.workers import dispatcher
+from scripts.migrate_step5 import run as migrate_users
+from scripts.seed_step5 import run as seed_users
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    out = []
+    monkeypatch.setattr(tracing, "TRACE_EXPORTER", "memory")
+    monkeypatch.setattr(tracing, "_export", out.append)
+    return out
+
+
+def test_http_span_continues_upstream_trace(spans):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    r = client.get("/health", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+    assert r.status_code == 200
+    assert r.headers["x-trace-id"] == trace_id
+    root = [s for s in spans if s["kind"] == "server"][-1]
+    assert root["trace_id"] == trace_id and root["parent_span_id"] == "00f067aa0ba902b7"
+    assert root["name"] == "GET /health"
+
+
+def test_submit_command_span_is_child_of_request(spans):
+    migrate_users(); seed_users()
+    token = client.post("/api/login", json={"username": "demo", "password": "demo"}).json()["access_token"]
+    r = client.post("/api/commands", headers={"Authorization": f"Bearer {token}"},
+                    json={"type": "FOO", "payload": {}, "idempotency_key": f"trace-{time.time()}"})
+    assert r.status_code == 400
+    trace_id = r.headers["x-trace-id"]
+    names = {s["name"] for s in spans if s["trace_id"] == trace_id}
+    assert {"POST /api/commands", "submit_command"} <= names
+
+
+def test_run_job_continues_trace_from_job_meta(spans, monkeypatch):
+    with tracing.start_span("rq.enqueue", kind="producer") as producer:
+        rid_token = tracing.set_request_id("req-123")
+        carrier = tracing.inject()
+        tracing.reset_request_id(rid_token)
+    monkeypatch.setattr(dispatcher, "_trace_carrier", lambda: carrier)
+
+    events = []
+    monkeypatch.setattr(dispatcher, "emit", lambda ev, **kw: events.append((ev, tracing.current_ids())))
+    dispatcher.run_job(job_id="trace-job", user_id="nobody", site="example", action="fetch_profile",
+                       account_selector={"site": "example", "account_name": "missing"}, payload={},
+                       enqueued_at=time.time() - 1)
+
+    run = [s for s in spans if s["name"] == "run_job"][-1]
+    assert run["trace_id"] == producer.trace_id
+    assert run["parent_span_id"] == producer.span_id
+    assert run["attributes"]["queue_wait_ms"] >= 1000
+    assert events and all(ids == (producer.trace_id, "req-123") for _, ids in events)
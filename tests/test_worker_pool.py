@@ -0,0 +1,59 @@
+# tests/test_worker_pool.py
+# 池模式子进程里的 PoolWorker：作业在本进程执行（不 fork）、进程内缓存跨作业保留；满 max_jobs 或 RSS 超限后回收
+import os, uuid
+os.environ.setdefault("LOG_TO_FILE", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+
+from app.core.models import Job
+from app.infra.db import SessionLocal
+from app.services import secrets as sec_svc
+from app.workers import pool, queue as queue_mod
+
+
+@pytest.fixture
+def env(demo, demo_account, fake_redis):
+    return {"user_id": demo["id"], "account": demo_account, "queue": queue_mod._get_queue()}
+
+
+def _enqueue(env, n):
+    ids = []
+    for i in range(n):
+        job_id = str(uuid.uuid4())
+        with SessionLocal() as db:
+            Job.create_pending(db, job_id=job_id, user_id=env["user_id"], job_type="example.fetch_profile")
+        queue_mod.enqueue(job_id, env["user_id"], "example.fetch_profile",
+                          {"site": "example", "account_name": env["account"]}, {"uid": str(i)})
+        ids.append(job_id)
+    return ids
+
+
+def _statuses(ids):
+    with SessionLocal() as db:
+        return [db.get(Job, i).status for i in ids]
+
+
+def test_pool_worker_recycles_after_max_jobs(env):
+    ids = _enqueue(env, 3)
+    sec_svc._fernet_for.cache_clear()
+    w = pool.PoolWorker([env["queue"]], connection=env["queue"].connection, max_jobs=2)
+    w.work(burst=True)
+    assert (w.jobs_done, w.recycle_reason) == (2, "max_jobs")
+    assert _statuses(ids) == ["SUCCEEDED", "SUCCEEDED", "PENDING"]
+    # 同一进程内跨作业复用 Fernet（解密账号 / 会话共用一个实例）
+    assert sec_svc._fernet_for.cache_info().misses == 1
+
+    w2 = pool.PoolWorker([env["queue"]], connection=env["queue"].connection, max_jobs=2)
+    w2.work(burst=True)
+    assert (w2.jobs_done, w2.recycle_reason) == (1, None)
+    assert _statuses(ids) == ["SUCCEEDED"] * 3
+
+
+def test_pool_worker_recycles_on_memory(env):
+    ids = _enqueue(env, 2)
+    w = pool.PoolWorker([env["queue"]], connection=env["queue"].connection, max_rss_mb=1)
+    w.work(burst=True)
+    assert (w.jobs_done, w.recycle_reason) == (1, "memory")
+    assert _statuses(ids) == ["SUCCEEDED", "PENDING"]
+    assert pool.rss_mb() > 1